@@ -0,0 +1,71 @@
+import json
+import os
+import random
+
+from config.settings import BAD_WORDS_FILE, load_bad_words
+
+CORPUS_DIR = os.path.join(os.path.dirname(__file__), "corpus")
+SAMPLE_CORPUS = os.path.join(CORPUS_DIR, "sample_chat.txt")
+
+# Словарь обычной переписки в чате: из него собираются «чистые» сообщения
+VOCABULARY = (
+    "привет всем как дела сегодня завтра вчера служба храм батюшка молитва праздник пост "
+    "спасибо пожалуйста вопрос ответ книга читать слушать говорить думаю кажется конечно "
+    "может быть хорошо отлично давайте встретимся после литургии вечером утром братья сестры "
+    "помогите подскажите кто знает где купить свечи икона расписание благословите радость "
+    "мир вам господи помилуй аминь евангелие апостол псалтирь канон акафист исповедь причастие"
+).split()
+
+# Способы обхода фильтра, которые встречаются в живых чатах
+OBFUSCATIONS = (
+    lambda word: word.upper(),
+    lambda word: ".".join(word),
+    lambda word: "*".join(word),
+    lambda word: word[0] * 3 + word[1:],
+    lambda word: word.replace("о", "o").replace("а", "a").replace("е", "e"),
+)
+
+
+def synthetic_corpus(count: int, bad_words: list[str], density: float = 0.05,
+                     obfuscation: float = 0.3, seed: int = 0) -> list[str]:
+    """
+    count сообщений по 3-25 слов; доля density содержит запрещённое слово,
+    из них доля obfuscation — в обфусцированном виде
+    """
+    rng = random.Random(seed)
+    messages = []
+    for _ in range(count):
+        words = rng.choices(VOCABULARY, k=rng.randint(3, 25))
+        if bad_words and rng.random() < density:
+            word = rng.choice(bad_words)
+            if rng.random() < obfuscation:
+                word = rng.choice(OBFUSCATIONS)(word)
+            words.insert(rng.randrange(len(words) + 1), word)
+        text = " ".join(words)
+        messages.append(text[0].upper() + text[1:] + rng.choice((".", "!", "?", "", ")")))
+    return messages
+
+
+def load_corpus(path: str) -> list[str]:
+    """
+    Записанный корпус: .jsonl с полем text (выгрузка апдейтов) или .txt — сообщение на строку
+    """
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            messages = []
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    text = record.get("text") or record.get("message", {}).get("text")
+                    if text:
+                        messages.append(text)
+            return messages
+        return [line.rstrip("\n") for line in f if line.strip()]
+
+
+def build_corpus(count: int, density: float, path: str | None = None, seed: int = 0) -> list[str]:
+    """Записанный корпус (повторяется до count сообщений) или синтетический"""
+    if path:
+        recorded = load_corpus(path)
+        return [recorded[i % len(recorded)] for i in range(count)]
+    return synthetic_corpus(count, sorted(load_bad_words(BAD_WORDS_FILE)), density, seed=seed)
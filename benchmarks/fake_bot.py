@@ -0,0 +1,71 @@
+import itertools
+import time
+from datetime import datetime
+from typing import Any, AsyncGenerator
+
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import (
+    GetChatAdministrators, GetChatMember, GetMe, SendMessage, TelegramMethod
+)
+from aiogram.types import Chat, ChatMemberAdministrator, ChatMemberMember, ChatMemberOwner, Message, User
+
+FAKE_TOKEN = "123456:BENCHMARK"
+OWNER_ID = 1
+
+
+class RecordingSession(BaseSession):
+    """Сессия без сети: запоминает каждый вызов Bot API и возвращает правдоподобный ответ"""
+
+    def __init__(self):
+        super().__init__()
+        self.calls: list[tuple[float, str, dict[str, Any]]] = []
+        self._message_ids = itertools.count(1_000_000)
+
+    async def close(self):
+        pass
+
+    async def stream_content(self, url: str, headers=None, timeout: int = 30,
+                             chunk_size: int = 65536, raise_for_status: bool = True) -> AsyncGenerator[bytes, None]:
+        yield b""
+
+    async def make_request(self, bot: Bot, method: TelegramMethod, timeout: int | None = None):
+        self.calls.append((time.perf_counter(), type(method).__name__, method.model_dump(exclude_none=True)))
+        if isinstance(method, GetMe):
+            return User(id=bot.id, is_bot=True, first_name="Bench", username="bench_bot")
+        if isinstance(method, SendMessage):
+            return Message(
+                message_id=next(self._message_ids),
+                date=datetime.now(),
+                chat=Chat(id=method.chat_id, type="supergroup"),
+                text=method.text,
+            )
+        if isinstance(method, GetChatAdministrators):
+            return [
+                ChatMemberOwner(user=User(id=OWNER_ID, is_bot=False, first_name="Owner"), is_anonymous=False),
+                bot_member(bot),
+            ]
+        if isinstance(method, GetChatMember):
+            if method.user_id == bot.id:
+                return bot_member(bot)
+            return ChatMemberMember(user=User(id=method.user_id, is_bot=False, first_name="User"))
+        # delete/ban/unban и прочие методы, возвращающие True
+        return True
+
+    def count(self, method_name: str) -> int:
+        return sum(1 for _, name, _ in self.calls if name == method_name)
+
+
+def bot_member(bot: Bot) -> ChatMemberAdministrator:
+    return ChatMemberAdministrator(
+        user=User(id=bot.id, is_bot=True, first_name="Bench"),
+        can_be_edited=False, is_anonymous=False, can_manage_chat=True, can_delete_messages=True,
+        can_manage_video_chats=False, can_restrict_members=True, can_promote_members=False,
+        can_change_info=False, can_invite_users=True, can_post_stories=False,
+        can_edit_stories=False, can_delete_stories=False,
+    )
+
+
+def create_fake_bot() -> tuple[Bot, RecordingSession]:
+    session = RecordingSession()
+    return Bot(token=FAKE_TOKEN, session=session), session
@@ -0,0 +1,203 @@
+import asyncio
+import json
+import random
+import time
+
+from aiohttp import web
+
+FAKE_TOKEN = "123456:LOADTEST"
+OWNER_ID = 1
+# Методы, которые Telegram ограничивает по чату: только в них подмешиваем 429
+THROTTLED_PREFIXES = ("send", "delete", "ban", "unban", "restrict", "edit")
+
+
+class FakeTelegramServer:
+    """
+    Заглушка Bot API на aiohttp: отдаёт апдейты через getUpdates, отвечает на вызовы бота
+    правдоподобными объектами и записывает каждый вызов.
+    Бот подключается к ней через TELEGRAM_API_URL, как к локальному telegram-bot-api
+    """
+
+    def __init__(self, token: str = FAKE_TOKEN, rate_limit_ratio: float = 0.0, retry_after: int = 1,
+                 missing_ratio: float = 0.0, seed: int = 0):
+        self.token = token
+        self.bot_id = int(token.split(":")[0])
+        self.rate_limit_ratio = rate_limit_ratio
+        self.retry_after = retry_after
+        self.missing_ratio = missing_ratio
+        self._rng = random.Random(seed)
+
+        self.calls: list[tuple[float, str, dict]] = []
+        self.injected_429 = 0
+        self.injected_missing = 0
+        # (chat_id, message_id) -> время публикации / удаления (time.perf_counter)
+        self.posted: dict[tuple[int, int], float] = {}
+        self.deleted: dict[tuple[int, int], float] = {}
+        self.ready = asyncio.Event()
+
+        self._updates: list[dict] = []
+        self._update_id = 0
+        self._message_ids: dict[int, int] = {}
+        self._new_updates = asyncio.Condition()
+        self._runner: web.AppRunner | None = None
+
+    # ==================== SIMULATION ====================
+
+    def _next_message_id(self, chat_id: int) -> int:
+        self._message_ids[chat_id] = self._message_ids.get(chat_id, 0) + 1
+        return self._message_ids[chat_id]
+
+    def _chat(self, chat_id: int) -> dict:
+        return {"id": chat_id, "type": "supergroup", "title": f"Нагрузка {chat_id}"}
+
+    def _user(self, user_id: int) -> dict:
+        if user_id == self.bot_id:
+            return {"id": user_id, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        return {"id": user_id, "is_bot": False, "first_name": "Пользователь", "last_name": str(user_id),
+                "username": f"user{user_id}"}
+
+    def _message(self, chat_id: int, user_id: int, text: str) -> dict:
+        message_id = self._next_message_id(chat_id)
+        self.posted[(chat_id, message_id)] = time.perf_counter()
+        return {
+            "message_id": message_id,
+            "date": int(time.time()),
+            "chat": self._chat(chat_id),
+            "from": self._user(user_id),
+            "text": text,
+        }
+
+    async def post_message(self, chat_id: int, user_id: int, text: str) -> tuple[int, int]:
+        """Пользователь пишет в чат: апдейт становится доступен через getUpdates"""
+        message = self._message(chat_id, user_id, text)
+        self._update_id += 1
+        self._updates.append({"update_id": self._update_id, "message": message})
+        async with self._new_updates:
+            self._new_updates.notify_all()
+        return chat_id, message["message_id"]
+
+    def _admin_member(self) -> dict:
+        return {
+            "status": "administrator", "user": self._user(self.bot_id), "can_be_edited": False,
+            "is_anonymous": False, "can_manage_chat": True, "can_delete_messages": True,
+            "can_manage_video_chats": False, "can_restrict_members": True, "can_promote_members": False,
+            "can_change_info": False, "can_invite_users": True, "can_post_stories": False,
+            "can_edit_stories": False, "can_delete_stories": False,
+        }
+
+    def count(self, method: str) -> int:
+        return sum(1 for _, name, _ in self.calls if name == method)
+
+    # ==================== BOT API ====================
+
+    async def _get_updates(self, params: dict):
+        offset = int(params.get("offset", 0))
+        limit = int(params.get("limit", 100))
+        timeout = float(params.get("timeout", 0))
+        self.ready.set()
+        self._updates = [update for update in self._updates if update["update_id"] >= offset]
+        if not self._updates and timeout:
+            async with self._new_updates:
+                try:
+                    await asyncio.wait_for(self._new_updates.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        return self._updates[:limit]
+
+    async def _send_message(self, params: dict):
+        return self._message(int(params["chat_id"]), self.bot_id, params.get("text", ""))
+
+    async def _delete_message(self, params: dict):
+        key = (int(params["chat_id"]), int(params["message_id"]))
+        if key not in self.posted or key in self.deleted:
+            raise BotAPIError(400, "Bad Request: message to delete not found")
+        self.deleted[key] = time.perf_counter()
+        if self._rng.random() < self.missing_ratio:
+            # Гонка с другим админом: сообщения уже нет, бот получает ошибку
+            self.injected_missing += 1
+            raise BotAPIError(400, "Bad Request: message to delete not found")
+        return True
+
+    async def _delete_messages(self, params: dict):
+        chat_id = int(params["chat_id"])
+        now = time.perf_counter()
+        for message_id in json.loads(params["message_ids"]):
+            key = (chat_id, message_id)
+            if key in self.posted:
+                self.deleted.setdefault(key, now)
+        return True
+
+    async def _get_chat_administrators(self, params: dict):
+        owner = {"status": "creator", "user": self._user(OWNER_ID), "is_anonymous": False}
+        return [owner, self._admin_member()]
+
+    async def _get_chat_member(self, params: dict):
+        user_id = int(params["user_id"])
+        if user_id == self.bot_id:
+            return self._admin_member()
+        if user_id == OWNER_ID:
+            return {"status": "creator", "user": self._user(OWNER_ID), "is_anonymous": False}
+        return {"status": "member", "user": self._user(user_id)}
+
+    async def _get_me(self, params: dict):
+        return {**self._user(self.bot_id), "can_join_groups": True, "can_read_all_group_messages": True,
+                "supports_inline_queries": False}
+
+    async def _ok(self, params: dict):
+        # deleteWebhook, banChatMember и прочие методы, возвращающие True
+        return True
+
+    METHODS = {
+        "getupdates": _get_updates,
+        "sendmessage": _send_message,
+        "deletemessage": _delete_message,
+        "deletemessages": _delete_messages,
+        "getchatadministrators": _get_chat_administrators,
+        "getchatmember": _get_chat_member,
+        "getme": _get_me,
+    }
+
+    async def handle(self, request: web.Request) -> web.Response:
+        if request.match_info["token"] != self.token:
+            return web.json_response({"ok": False, "error_code": 401, "description": "Unauthorized"}, status=401)
+        method = request.match_info["method"].lower()
+        params = dict(await request.post())
+        params.update(request.query)
+        self.calls.append((time.perf_counter(), method, params))
+
+        if "chat_id" in params and method.startswith(THROTTLED_PREFIXES) \
+                and self._rng.random() < self.rate_limit_ratio:
+            self.injected_429 += 1
+            return web.json_response({
+                "ok": False, "error_code": 429,
+                "description": f"Too Many Requests: retry after {self.retry_after}",
+                "parameters": {"retry_after": self.retry_after},
+            }, status=429)
+        try:
+            result = await self.METHODS.get(method, FakeTelegramServer._ok)(self, params)
+        except BotAPIError as e:
+            return web.json_response({"ok": False, "error_code": e.code, "description": e.description},
+                                     status=e.code)
+        return web.json_response({"ok": True, "result": result})
+
+    # ==================== SERVER ====================
+
+    async def start(self, host: str = "127.0.0.1", port: int = 8081) -> str:
+        app = web.Application()
+        app.router.add_route("*", "/bot{token}/{method}", self.handle)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        return f"http://{host}:{port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+class BotAPIError(Exception):
+    def __init__(self, code: int, description: str):
+        super().__init__(description)
+        self.code = code
+        self.description = description
@@ -0,0 +1,197 @@
+"""
+Сквозной нагрузочный тест: фейковый Bot API + настоящий bot.py в режиме поллинга.
+Драйвер пишет сообщения в чаты с заданной частотой и меряет задержку модерации —
+от публикации сообщения до его удаления ботом.
+
+    python -m benchmarks.load --rate 50 --duration 30 --density 0.1
+    python -m benchmarks.load --rate 20 --rate-limit 0.05 --missing 0.02
+    python -m benchmarks.load --external   # только сервер, бот запускается вручную
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import signal
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.corpus import build_corpus
+from benchmarks.fake_server import OWNER_ID, FakeTelegramServer
+from benchmarks.run import git_commit, percentile
+from config.settings import BAD_WORDS_FILE, load_bad_words
+from services.matcher import WordMatcher
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results", "load.json")
+
+
+def latency_stats(latencies: list[float]) -> dict:
+    values = sorted(latencies)
+    return {
+        "count": len(values),
+        "p50_ms": round(percentile(values, 50) * 1000, 1),
+        "p90_ms": round(percentile(values, 90) * 1000, 1),
+        "p99_ms": round(percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+    }
+
+
+async def spawn_bot(api_url: str, token: str, workdir: str) -> asyncio.subprocess.Process:
+    """bot.py в отдельном процессе со своей БД во временном каталоге"""
+    shutil.copy(os.path.join(REPO_DIR, BAD_WORDS_FILE), workdir)
+    env = {**os.environ, "API_TOKEN": token, "TELEGRAM_API_URL": api_url, "BOT_MODE": "polling"}
+    log = open(os.path.join(workdir, "bot.log"), "wb")
+    return await asyncio.create_subprocess_exec(
+        sys.executable, os.path.join(REPO_DIR, "bot.py"), cwd=workdir, env=env, stdout=log, stderr=log
+    )
+
+
+async def stop_bot(process: asyncio.subprocess.Process, timeout: float = 20):
+    if process.returncode is not None:
+        return
+    process.send_signal(signal.SIGINT)
+    try:
+        await asyncio.wait_for(process.wait(), timeout=timeout)
+    except asyncio.TimeoutError:
+        process.kill()
+        await process.wait()
+
+
+async def drive(server: FakeTelegramServer, corpus: list[str], rate: float, duration: float,
+                chats: int, users: int, admin_share: float, seed: int) -> tuple[set, set]:
+    """Публиковать сообщения с частотой rate; вернуть ключи сообщений с запрещёнными словами и всех"""
+    matcher = WordMatcher(load_bad_words(os.path.join(REPO_DIR, BAD_WORDS_FILE)))
+    rng = random.Random(seed)
+    flagged, posted = set(), set()
+    started = time.perf_counter()
+    sent = 0
+    while True:
+        elapsed = time.perf_counter() - started
+        if elapsed >= duration:
+            break
+        # Догоняем расписание пачкой, если цикл отстал от заданной частоты
+        due = int(elapsed * rate) + 1
+        while sent < due:
+            text = corpus[sent % len(corpus)]
+            chat_id = -1000000000000 - rng.randrange(chats)
+            user_id = OWNER_ID if rng.random() < admin_share else 10_000 + rng.randrange(users)
+            key = await server.post_message(chat_id, user_id, text)
+            posted.add(key)
+            if matcher.search(text):
+                flagged.add(key)
+            sent += 1
+        await asyncio.sleep(max(0.0, sent / rate - (time.perf_counter() - started)))
+    return flagged, posted
+
+
+async def wait_drained(server: FakeTelegramServer, flagged: set, timeout: float):
+    """Дождаться удаления всех сообщений с нарушениями (или таймаута)"""
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline and not flagged <= server.deleted.keys():
+        await asyncio.sleep(0.2)
+
+
+def build_report(server: FakeTelegramServer, flagged: set, posted: set, elapsed: float) -> dict:
+    latencies = [server.deleted[key] - server.posted[key] for key in flagged if key in server.deleted]
+    calls = {}
+    for _, method, _ in server.calls:
+        calls[method] = calls.get(method, 0) + 1
+    return {
+        "posted": len(posted),
+        "posted_per_sec": round(len(posted) / elapsed, 1) if elapsed else 0.0,
+        "flagged": len(flagged),
+        "deleted": len(latencies),
+        "missed": len(flagged) - len(latencies),
+        # Удалённые сообщения без запрещённых слов — ложные срабатывания
+        "false_deletions": len((posted - flagged) & server.deleted.keys()),
+        "moderation_latency": latency_stats(latencies),
+        "injected_429": server.injected_429,
+        "injected_missing": server.injected_missing,
+        "api_calls": dict(sorted(calls.items())),
+    }
+
+
+async def run(args) -> dict:
+    server = FakeTelegramServer(rate_limit_ratio=args.rate_limit, retry_after=args.retry_after,
+                                missing_ratio=args.missing, seed=args.seed)
+    api_url = await server.start(port=args.port)
+    print(f"🌐 Фейковый Bot API: {api_url}, токен {server.token}")
+    corpus = build_corpus(max(1, int(args.rate * args.duration)), args.density, args.corpus, seed=args.seed)
+
+    process = None
+    with tempfile.TemporaryDirectory() as workdir:
+        try:
+            if not args.external:
+                process = await spawn_bot(api_url, server.token, workdir)
+            await asyncio.wait_for(server.ready.wait(), timeout=args.startup_timeout)
+            print(f"🚀 Бот начал поллинг, нагрузка {args.rate} сообщ./с в течение {args.duration} с")
+            started = time.perf_counter()
+            flagged, posted = await drive(server, corpus, args.rate, args.duration,
+                                          args.chats, args.users, args.admin_share, args.seed)
+            elapsed = time.perf_counter() - started
+            await wait_drained(server, flagged, args.drain)
+            return build_report(server, flagged, posted, elapsed)
+        finally:
+            if process is not None:
+                await stop_bot(process)
+                if args.bot_log:
+                    shutil.copy(os.path.join(workdir, "bot.log"), args.bot_log)
+            await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сквозной нагрузочный тест бота на фейковом Bot API")
+    parser.add_argument("--rate", type=float, default=20, help="сообщений в секунду")
+    parser.add_argument("--duration", type=float, default=20, help="длительность нагрузки, секунды")
+    parser.add_argument("--density", type=float, default=0.1, help="доля сообщений с запрещённым словом")
+    parser.add_argument("--corpus", help="записанный корпус (.txt или .jsonl) вместо синтетического")
+    parser.add_argument("--chats", type=int, default=50)
+    parser.add_argument("--users", type=int, default=5000)
+    parser.add_argument("--admin-share", type=float, default=0.01, help="доля сообщений от админа чата")
+    parser.add_argument("--rate-limit", type=float, default=0.0, help="доля запросов, получающих 429")
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--missing", type=float, default=0.0,
+                        help="доля удалений, получающих «message to delete not found»")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--external", action="store_true", help="не запускать bot.py, ждать внешнего бота")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--drain", type=float, default=30, help="сколько ждать удаления после нагрузки")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--bot-log", help="сохранить лог бота в этот файл")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="куда сохранить результаты (JSON)")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "params": {key: value for key, value in vars(args).items() if key not in ("output", "bot_log")},
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    latency = results["moderation_latency"]
+    print(f"📨 Опубликовано: {results['posted']} ({results['posted_per_sec']} сообщ./с), "
+          f"с нарушениями: {results['flagged']}")
+    print(f"🗑 Удалено: {results['deleted']}, пропущено: {results['missed']}, "
+          f"ложных удалений: {results['false_deletions']}")
+    print(f"⏱ Задержка модерации: p50={latency['p50_ms']} мс, p90={latency['p90_ms']} мс, "
+          f"p99={latency['p99_ms']} мс, max={latency['max_ms']} мс")
+    print(f"⚠️ Подмешано 429: {results['injected_429']}, «not found»: {results['injected_missing']}")
+    print(f"💾 Результаты сохранены: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
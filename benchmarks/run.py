@@ -0,0 +1,257 @@
+"""
+Офлайн-бенчмарки фильтра: поиск слов, полный обработчик filter_messages и операции AsyncDatabase.
+Сеть не нужна — запросы к Bot API перехватывает RecordingSession.
+
+    python -m benchmarks.run
+    python -m benchmarks.run --messages 20000 --density 0.1 --output after.json --compare before.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from aiogram.types import Chat, Message, User
+
+from benchmarks.corpus import build_corpus
+from benchmarks.fake_bot import create_fake_bot
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(__file__), "results", "latest.json")
+# Метрики, по которым сравниваются два прогона: (ключ, больше — лучше)
+COMPARED_METRICS = (("msgs_per_sec", True), ("p50_us", False), ("p99_us", False))
+
+
+def percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, round(q / 100 * (len(sorted_values) - 1)))
+    return sorted_values[index]
+
+
+def summarize(latencies_ns: list[int], elapsed: float) -> dict:
+    values = sorted(latencies_ns)
+    return {
+        "count": len(values),
+        "msgs_per_sec": round(len(values) / elapsed, 1) if elapsed else 0.0,
+        "p50_us": round(percentile(values, 50) / 1000, 2),
+        "p99_us": round(percentile(values, 99) / 1000, 2),
+        "max_us": round(values[-1] / 1000, 2) if values else 0.0,
+    }
+
+
+async def measure(operation, items) -> dict:
+    """Выполнить await operation(item) для каждого элемента по очереди и замерить каждый вызов"""
+    latencies = []
+    clock = time.perf_counter_ns
+    started = time.perf_counter()
+    for item in items:
+        begin = clock()
+        await operation(item)
+        latencies.append(clock() - begin)
+    return summarize(latencies, time.perf_counter() - started)
+
+
+# ==================== BENCHMARKS ====================
+
+async def bench_matcher(corpus: list[str]) -> dict:
+    from handlers.helpers import bad_words, contains_bad_word
+
+    matcher = bad_words.matcher
+
+    async def check(text: str):
+        contains_bad_word(text, matcher)
+
+    result = await measure(check, corpus)
+    result["dictionary_words"] = len(matcher)
+    result["matched"] = sum(1 for text in corpus if matcher.search(text))
+    return result
+
+
+def make_messages(bot, corpus: list[str], chats: int, users: int) -> list[Message]:
+    messages = []
+    for index, text in enumerate(corpus):
+        chat_id = -1000000000000 - index % chats
+        user_id = 10_000 + index * 7919 % users
+        messages.append(Message(
+            message_id=index + 1,
+            date=datetime.now(timezone.utc),
+            chat=Chat(id=chat_id, type="supergroup", title=f"Бенчмарк {index % chats}"),
+            from_user=User(id=user_id, is_bot=False, first_name="Пользователь", last_name=str(user_id)),
+            text=text,
+        ).as_(bot))
+    return messages
+
+
+async def bench_handler(corpus: list[str], workdir: str, chats: int, users: int) -> dict:
+    """Полный путь сообщения через filter_messages с настоящей БД во временном файле"""
+    from handlers.filter import filter_messages
+    from handlers.moderation import db
+
+    bot, session = create_fake_bot()
+    db.db_name = os.path.join(workdir, "handler.db")
+    await db.init_db()
+    try:
+        messages = make_messages(bot, corpus, chats, users)
+        result = await measure(filter_messages, messages)
+        await db.flush()
+    finally:
+        await db.close()
+    result["api_calls"] = {
+        name: session.count(name) for name in sorted({name for _, name, _ in session.calls})
+    }
+    return result
+
+
+async def bench_database(operations: int, workdir: str, users: int) -> dict:
+    from handlers.moderation import AsyncDatabase
+
+    database = AsyncDatabase(os.path.join(workdir, "database.db"))
+    await database.init_db()
+    keys = [(-1000000000000 - i % 10, 10_000 + i * 7919 % users) for i in range(operations)]
+    results = {}
+    try:
+        async def add_violation(key):
+            await database.add_violation(*key, "bench", "Бенчмарк", "текст нарушения")
+
+        async def get_violation_count(key):
+            await database.get_violation_count(*key)
+
+        async def get_violations(key):
+            await database.get_violations(*key)
+
+        async def is_banned(key):
+            await database.is_banned(*key)
+
+        async def add_ban(key):
+            await database.add_ban(*key, 1, "бенчмарк", 3600)
+
+        async def reset_violations(key):
+            await database.reset_violations(*key)
+
+        for operation in (add_violation, get_violation_count, get_violations, is_banned):
+            results[operation.__name__] = await measure(operation, keys)
+        # Бан и сброс сбрасывают очередь записи — их заметно меньше в реальном потоке
+        sample = keys[:max(1, operations // 10)]
+        for operation in (add_ban, reset_violations):
+            results[operation.__name__] = await measure(operation, sample)
+        results["counter_cache"] = database.counts.stats()
+    finally:
+        await database.close()
+    return results
+
+
+# ==================== REPORT ====================
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def flatten(results: dict, prefix: str = "") -> dict[str, dict]:
+    """{"database": {"add_ban": {...}}} -> {"database.add_ban": {...}} для замеров с msgs_per_sec"""
+    flat = {}
+    for name, value in results.items():
+        if isinstance(value, dict):
+            if "msgs_per_sec" in value:
+                flat[prefix + name] = value
+            else:
+                flat.update(flatten(value, f"{prefix}{name}."))
+    return flat
+
+
+def print_report(results: dict):
+    print(f"{'бенчмарк':<36}{'msg/s':>12}{'p50, мкс':>12}{'p99, мкс':>12}")
+    for name, value in flatten(results).items():
+        print(f"{name:<36}{value['msgs_per_sec']:>12}{value['p50_us']:>12}{value['p99_us']:>12}")
+
+
+def compare(current: dict, baseline_path: str, threshold: float) -> list[str]:
+    """Сравнить с сохранённым прогоном; вернуть список регрессий хуже порога"""
+    with open(baseline_path, "r", encoding="utf-8") as f:
+        baseline = json.load(f)
+    before, after = flatten(baseline["results"]), flatten(current)
+    print(f"\nСравнение с {baseline_path} (коммит {baseline['meta'].get('commit')}):")
+    regressions = []
+    for name in sorted(after.keys() & before.keys()):
+        for metric, higher_is_better in COMPARED_METRICS:
+            old, new = before[name][metric], after[name][metric]
+            if not old:
+                continue
+            change = (new - old) / old
+            worse = -change if higher_is_better else change
+            mark = "❌" if worse > threshold else "✅"
+            print(f"{mark} {name}.{metric}: {old} → {new} ({change:+.1%})")
+            if worse > threshold:
+                regressions.append(f"{name}.{metric}")
+    return regressions
+
+
+async def run(args) -> dict:
+    corpus = build_corpus(args.messages, args.density, args.corpus, seed=args.seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        if "matcher" in args.only:
+            results["matcher"] = await bench_matcher(corpus)
+        if "handler" in args.only:
+            results["handler"] = await bench_handler(corpus, workdir, args.chats, args.users)
+        if "database" in args.only:
+            results["database"] = await bench_database(args.db_operations, workdir, args.users)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарки фильтра сообщений")
+    parser.add_argument("--messages", type=int, default=5000, help="размер корпуса")
+    parser.add_argument("--density", type=float, default=0.05, help="доля сообщений с запрещённым словом")
+    parser.add_argument("--corpus", help="записанный корпус (.txt или .jsonl) вместо синтетического")
+    parser.add_argument("--chats", type=int, default=20)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--db-operations", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="+", default=["matcher", "handler", "database"],
+                        choices=["matcher", "handler", "database"])
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="куда сохранить результаты (JSON)")
+    parser.add_argument("--compare", help="JSON предыдущего прогона для сравнения")
+    parser.add_argument("--threshold", type=float, default=0.10, help="допустимое ухудшение метрики")
+    args = parser.parse_args()
+
+    # Логи обработчиков в бенчмарке только мешают замерам
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": {
+                "messages": args.messages, "density": args.density, "corpus": args.corpus,
+                "chats": args.chats, "users": args.users, "db_operations": args.db_operations,
+                "seed": args.seed,
+            },
+        },
+        "results": results,
+    }
+    os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print_report(results)
+    print(f"\n💾 Результаты сохранены: {args.output}")
+    if args.compare and compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
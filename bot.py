@@ -1,38 +1,179 @@
 import logging
 import asyncio
+import signal
 
 from aiogram import Bot, Dispatcher
+from aiogram.client.session.aiohttp import AiohttpSession
+from aiogram.client.telegram import TelegramAPIServer
 
 
 from handlers.filter import filter_router
 from handlers.admin import admin_router
-from handlers.moderation import db
+from handlers.members import members_router
+from handlers.moderation import AsyncDatabase, db
+from handlers.helpers import (
+    admin_log, admin_roster, bad_words, bot_permissions, jobs, join_warnings, outbound, profiles, retention
+)
+from services.executor import UpdateExecutor
+from services.logs import queue_handler, setup_logging
+from services.metrics import ApiMetrics, HandlerMetrics, registry, serve_metrics
+from services.webhook import consume_updates, queue_source, run_in_process, run_sharded
 
-from config.config import API_TOKEN
+from config.config import (
+    API_TOKEN, TELEGRAM_API_URL, BOT_MODE, WEBHOOK_URL, WEBHOOK_PATH, WEBHOOK_SECRET, WEBHOOK_HOST, WEBHOOK_PORT, WEBHOOK_WORKERS,
+    METRICS_HOST, METRICS_PORT, LOG_LEVEL, LOG_FORMAT
+)
+from config.settings import (
+    BAD_WORDS_RELOAD_INTERVAL, OUTBOUND_GLOBAL_RATE, UPDATE_CONCURRENCY, UPDATE_MAX_PENDING, UPDATE_CHAT_CONCURRENCY,
+    WEBHOOK_QUEUE_SIZE, LOG_QUEUE_SIZE, LOG_SAMPLING, DB_ENABLE_INCREMENTAL_VACUUM
+)
 
 # ==================== LOGGING ====================
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
+# Вывод логов — в фоновом потоке; обработчики только кладут записи в очередь
+setup_logging(LOG_LEVEL, json_output=LOG_FORMAT == "json", queue_size=LOG_QUEUE_SIZE, sampling=LOG_SAMPLING)
 
 # ==================== BOT INIT ====================
-bot = Bot(token=API_TOKEN)
+if TELEGRAM_API_URL:
+    bot = Bot(token=API_TOKEN, session=AiohttpSession(api=TelegramAPIServer.from_base(TELEGRAM_API_URL)))
+else:
+    bot = Bot(token=API_TOKEN)
+bot.session.middleware(outbound)
+# После планировщика: меряется сам запрос к API, каждая повторная попытка отдельно
+bot.session.middleware(ApiMetrics())
 dp = Dispatcher()
+executor = UpdateExecutor(UPDATE_CONCURRENCY, UPDATE_MAX_PENDING, UPDATE_CHAT_CONCURRENCY, router=dp)
+dp.update.outer_middleware(executor)
+handler_metrics = HandlerMetrics()
+for observer in (dp.message, dp.chat_member, dp.my_chat_member):
+    observer.middleware(handler_metrics)
 
+dp.include_router(members_router)
 dp.include_router(admin_router)
 dp.include_router(filter_router)
 
-# ==================== MAIN ====================
-async def main():
+WEBHOOK_OPTIONS = dict(
+    host=WEBHOOK_HOST, port=WEBHOOK_PORT, url=WEBHOOK_URL, path=WEBHOOK_PATH, secret=WEBHOOK_SECRET
+)
+
+
+# ==================== METRICS ====================
+registry.gauge("bot_queue_depth", "Глубина внутренних очередей", lambda: {
+    "executor": executor.depth,
+    "outbound": outbound.depth,
+    "admin_log": admin_log.depth,
+    "jobs": jobs.depth,
+    "db_writes": db.depth,
+}, labels=("queue",))
+registry.counter_func("bot_admin_log_dropped_total", "События админ-лога, не поместившиеся в очередь",
+                      lambda: admin_log.dropped_total)
+registry.counter_func("bot_log_dropped_total", "Записи лога, не поместившиеся в очередь вывода",
+                      lambda: queue_handler().dropped)
+registry.counter_func("bot_cache_hits_total", "Попадания в кэши", lambda: {
+    "violation_counts": db.counts.hits,
+    "admins": admin_roster.hits,
+    "bot_rights": bot_permissions.hits,
+}, labels=("cache",))
+registry.counter_func("bot_cache_misses_total", "Промахи кэшей", lambda: {
+    "violation_counts": db.counts.misses,
+    "admins": admin_roster.misses,
+    "bot_rights": bot_permissions.misses,
+}, labels=("cache",))
+registry.gauge("bot_cache_entries", "Записей в кэшах", lambda: {
+    "violation_counts": len(db.counts),
+    "admins": len(admin_roster),
+    "bot_rights": len(bot_permissions),
+}, labels=("cache",))
+registry.gauge("bot_dictionary_words", "Слов в общем словаре", lambda: len(bad_words))
+registry.gauge("bot_chat_matchers", "Собранных словарей чатов", lambda: len(profiles.registry))
+
+
+# ==================== LIFECYCLE ====================
+background_tasks: list[asyncio.Task] = []
+metrics_server = None
+
+
+async def prepare_database():
+    """
+    Миграции схемы и перевод базы в incremental auto_vacuum (по настройке) —
+    один раз в главном процессе, до запуска воркеров вебхука
+    """
+    database = AsyncDatabase(db.db_name)
+    await database.init_db()
+    try:
+        if DB_ENABLE_INCREMENTAL_VACUUM:
+            await database.enable_incremental_vacuum()
+    finally:
+        await database.close()
+
+
+async def on_startup(shard: tuple[int, int] | None = None):
+    global metrics_server
+    if METRICS_PORT:
+        metrics_server = await serve_metrics(METRICS_HOST, METRICS_PORT + (shard[0] if shard else 0))
+    bad_words.load()
     logging.info("🛠️ Инициализация БД...")
     await db.init_db()
-    logging.info("🚀 Старт поллинга...")
+    admin_log.start(bot)
+    await jobs.start(bot, shard=shard)
+    # База общая для всех воркеров — обслуживает её только первый
+    if shard is None or shard[0] == 0:
+        retention.start()
+    background_tasks.append(asyncio.create_task(bad_words.watch(BAD_WORDS_RELOAD_INTERVAL)))
+
+
+async def on_shutdown():
+    for task in background_tasks:
+        task.cancel()
+    await executor.join()
+    # Предупреждения ставят задачи удаления — до остановки планировщика
+    await join_warnings()
+    await jobs.stop()
+    await retention.stop()
+    await admin_log.stop()
+    await db.close()
+    await bot.session.close()
+    if metrics_server is not None:
+        await metrics_server.cleanup()
+
+
+# ==================== WEBHOOK WORKERS ====================
+def run_worker(index: int, workers: int, queue):
+    """Процесс-обработчик вебхука: свой Bot и своё соединение с общей БД"""
+    # Остановкой управляет главный процесс через None в очереди
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    # Чаты поделены между воркерами, а общий лимит API и админ-канал — нет
+    outbound.set_global_rate(OUTBOUND_GLOBAL_RATE / workers)
+    admin_log.min_interval *= workers
+    asyncio.run(worker_main(index, workers, queue))
 
+
+async def worker_main(index: int, workers: int, queue):
+    await on_startup(shard=(index, workers))
+    logging.info(f"👷 Воркер {index + 1}/{workers} запущен")
+    try:
+        await consume_updates(queue_source(queue), bot, dp)
+    finally:
+        await on_shutdown()
+
+
+# ==================== MAIN ====================
+async def main():
+    await on_startup()
     try:
-        await dp.start_polling(bot)
+        if BOT_MODE == "webhook":
+            await run_in_process(bot, dp, queue_size=WEBHOOK_QUEUE_SIZE, **WEBHOOK_OPTIONS)
+        else:
+            logging.info("🚀 Старт поллинга...")
+            await bot.delete_webhook()
+            # Апдейты уходят в executor; поллинг ждёт его, когда очередь переполнена
+            await dp.start_polling(bot, handle_as_tasks=False)
     finally:
-        await bot.session.close()
+        await on_shutdown()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    asyncio.run(prepare_database())
+    if BOT_MODE == "webhook" and WEBHOOK_WORKERS > 1:
+        run_sharded(bot, dp, run_worker, WEBHOOK_WORKERS, queue_size=WEBHOOK_QUEUE_SIZE, **WEBHOOK_OPTIONS)
+    else:
+        asyncio.run(main())
@@ -1,8 +1,107 @@
 def load_bad_words(filename="bad_words.txt") -> set[str]:
     with open(filename, "r", encoding="utf-8") as f:
         return {line.strip().lower() for line in f if line.strip()}
-    
-BAD_WORDS = load_bad_words()
+
+BAD_WORDS_FILE = "bad_words.txt"
+# Скомпилированный автомат словаря; пересобирается, только если изменился словарь
+MATCHER_CACHE_PATH = ".cache/bad_words.matcher"
+# Как часто проверять bad_words.txt на изменения (секунды)
+BAD_WORDS_RELOAD_INTERVAL = 30
 MAX_VIOLATIONS = 3
 BAN_DURATION = 86400 
-ADMIN_LOG_CHAT_ID = -1003450027830
\ No newline at end of file
+ADMIN_LOG_CHAT_ID = -1003450027830
+# Через сколько секунд удалять предупреждение бота
+WARNING_TTL = 10
+# Сколько неотправленных предупреждений держать на чат: при рейде лишние не отправляются
+WARNING_BACKLOG = 3
+
+# Отложенная запись в БД: пачка коммитится раз в DB_FLUSH_INTERVAL секунд или по DB_FLUSH_BATCH записей
+DB_FLUSH_INTERVAL = 0.2
+DB_FLUSH_BATCH = 200
+
+# Сколько счётчиков нарушений (chat_id, user_id) держать в памяти
+COUNTER_CACHE_SIZE = 50_000
+
+# Затухающий счёт нарушений: бакеты по VIOLATION_BUCKET_SECONDS, вес нарушения
+# падает вдвое за VIOLATION_HALF_LIFE, учитываются последние VIOLATION_WINDOW_BUCKETS бакетов
+VIOLATION_BUCKET_SECONDS = 86400
+VIOLATION_HALF_LIFE = 7 * 86400
+VIOLATION_WINDOW_BUCKETS = 30
+
+# Антиспам до проверки словаря: флуд — больше SPAM_FLOOD_MESSAGES сообщений пользователя
+# за SPAM_FLOOD_WINDOW секунд; волна повторов — SPAM_DUPLICATE_COUNT почти одинаковых сообщений
+# (сходство шинглов от SPAM_SIMILARITY) в чате за SPAM_DUPLICATE_WINDOW секунд, с любых аккаунтов.
+# Сообщения короче SPAM_MIN_LENGTH символов на повторы не проверяются.
+# Порог повторов высокий: одинаковые поздравления от разных людей — норма,
+# рейд — это десятки копий за секунды. До порога ничего не удаляется
+SPAM_FLOOD_MESSAGES = 6
+SPAM_FLOOD_WINDOW = 5
+SPAM_DUPLICATE_COUNT = 10
+SPAM_DUPLICATE_WINDOW = 30
+SPAM_SIMILARITY = 0.8
+SPAM_MIN_LENGTH = 30
+# Сколько недавних сообщений одного чата держать в индексе повторов
+SPAM_INDEX_SIZE = 2000
+
+# /stats: за сколько дней показывать разбивку по дням и сколько строк в топах;
+# /export: сколько строк читать из БД за раз
+STATS_DAYS = 7
+STATS_TOP = 5
+EXPORT_CHUNK = 500
+
+# Сколько секунд доверять закэшированному списку администраторов чата
+ADMIN_CACHE_TTL = 600
+
+# Логи в админ-канал копятся ADMIN_LOG_FLUSH_INTERVAL секунд и уходят одним дайджестом
+ADMIN_LOG_FLUSH_INTERVAL = 3.0
+ADMIN_LOG_QUEUE_SIZE = 1000
+
+# Исходящие запросы к Bot API: глобальный лимит и лимит на чат (запросов в секунду).
+# Сообщения в группу Telegram пропускает примерно 20 в минуту — для них отдельный, более строгий
+# лимит; удаления и баны идут по OUTBOUND_CHAT_RATE
+OUTBOUND_GLOBAL_RATE = 30
+OUTBOUND_CHAT_RATE = 1.0
+OUTBOUND_CHAT_BURST = 5
+OUTBOUND_CHAT_SEND_RATE = 0.33
+OUTBOUND_CHAT_SEND_BURST = 3
+
+# Обработка апдейтов: сколько обработчиков одновременно и сколько апдейтов держать в очереди
+UPDATE_CONCURRENCY = 64
+UPDATE_MAX_PENDING = 1000
+# Сколько обработчиков одного чата могут работать одновременно: рейд в чате не занимает все слоты
+UPDATE_CHAT_CONCURRENCY = 16
+# Сколько принятых вебхуком апдейтов держать до передачи обработчику (на процесс-обработчик):
+# когда очередь полна, вебхук не отвечает Telegram, пока не освободится место
+WEBHOOK_QUEUE_SIZE = 1000
+
+# Хранение истории: строки старше срока (дней, 0 — хранить всегда) уходят в сжатые архивы ARCHIVE_DIR
+RETENTION_DAYS = {
+    "violations": 90,
+    "bans": 365,
+}
+ARCHIVE_DIR = "archive"
+# Архивация раз в MAINTENANCE_INTERVAL секунд; сжатие базы — после MAINTENANCE_IDLE секунд без записей
+MAINTENANCE_INTERVAL = 3600
+MAINTENANCE_BATCH = 1000
+MAINTENANCE_IDLE = 5.0
+VACUUM_PAGES = 500
+# Новые базы создаются с incremental auto_vacuum; существующую перевести в этот режим
+# (полный VACUUM с блокировкой записи, один раз при старте до запуска воркеров)
+DB_ENABLE_INCREMENTAL_VACUUM = False
+
+# Логи: размер очереди до фонового потока вывода и прореживание частых событий.
+# Ключ — «модуль.функция» или «модуль», значение — (писать каждую N-ю запись, не больше M в секунду);
+# WARNING и выше не прореживаются
+LOG_QUEUE_SIZE = 10_000
+LOG_SAMPLING = {
+    "helpers.is_admin": (20, 5),
+    "helpers.bot_can_delete": (20, 5),
+    "helpers.bot_can_restrict": (20, 5),
+    "helpers.contains_bad_word": (1, 20),
+    "helpers.check_spam": (1, 20),
+    "moderation": (1, 20),
+    # «Удалено сообщение …» на каждое нарушение
+    "filter": (1, 20),
+    # aiogram: «Update id=... is handled» на каждый апдейт
+    "dispatcher": (10, 10),
+}
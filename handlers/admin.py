@@ -1,11 +1,20 @@
+import asyncio
+import csv
+import html
 import logging
+import os
+import tempfile
 from aiogram import Router
-from aiogram.filters import Command
-from aiogram.types import Message
+from aiogram.exceptions import TelegramForbiddenError
+from aiogram.filters import Command, CommandObject
+from aiogram.types import FSInputFile, Message
 
-from handlers.helpers import is_admin, log_to_admins
+from handlers.helpers import bad_words, bot_can_restrict, is_admin, log_to_admins, profiles
 from handlers.moderation import db
-from config.settings import BAD_WORDS, MAX_VIOLATIONS, BAN_DURATION
+from config.config import BOT_MODE, WEBHOOK_WORKERS
+from config.settings import ADMIN_LOG_CHAT_ID, EXPORT_CHUNK, STATS_DAYS, STATS_TOP
+from services.logs import set_level
+from services.violations import format_score
 
 admin_router = Router()
 
@@ -13,8 +22,8 @@ admin_router = Router()
 @admin_router.message(Command("testlog"))
 async def cmd_testlog(message: Message):
     logging.info("⚡ cmd_testlog вызван")
-    await log_to_admins(message.bot, "📝 Тестовое сообщение: логирование работает!")
-    await message.answer("Сообщение отправлено в канал логов ✅")
+    log_to_admins("📝 Тестовое сообщение: логирование работает!")
+    await message.answer("Сообщение поставлено в очередь канала логов ✅ Уйдёт со следующим дайджестом")
 
 
 # ==================== ADMIN COMMANDS ====================
@@ -42,23 +51,24 @@ async def cmd_warn(message: Message):
         await message.reply("❌ Нельзя выдать предупреждение администратору!")
         return
 
-    count = await db.add_violation(
+    score = await db.add_violation(
         message.chat.id, target_user.id,
         target_user.username or "unknown",
         target_user.full_name,
         "Предупреждение от администратора"
     )
 
+    profile = await profiles.get(message.chat.id)
+    name, title = html.escape(target_user.full_name), html.escape(message.chat.title or "")
     await message.answer(
-        f"⚠️ <b>{target_user.full_name}</b> получил предупреждение!\n"
-        f"📊 Всего нарушений: {count}/{MAX_VIOLATIONS}",
+        f"⚠️ <b>{name}</b> получил предупреждение!\n"
+        f"📊 Счёт нарушений: {format_score(score)}/{profile.max_violations}",
         parse_mode="HTML"
     )
 
-    logging.info(f"✅ Предупреждение выдано: {target_user.full_name} ({target_user.id}), count={count}")
-    await log_to_admins(
-        message.bot,
-        f"⚙️ Админ {message.from_user.full_name} выдал предупреждение пользователю {target_user.full_name} в чате {message.chat.title}"
+    logging.info(f"✅ Предупреждение выдано: {target_user.full_name} ({target_user.id}), score={score:.2f}")
+    log_to_admins(
+        f"⚙️ Админ {html.escape(message.from_user.full_name)} выдал предупреждение пользователю {name} в чате {title}"
     )
 
 
@@ -81,7 +91,7 @@ async def cmd_unwarn(message: Message):
     await db.reset_violations(message.chat.id, target_user.id)
 
     await message.answer(
-        f"✅ Все предупреждения сняты с <b>{target_user.full_name}</b>",
+        f"✅ Все предупреждения сняты с <b>{html.escape(target_user.full_name)}</b>",
         parse_mode="HTML"
     )
     logging.info(f"✅ Предупреждения сняты: {target_user.full_name} ({target_user.id})")
@@ -94,14 +104,19 @@ async def cmd_warns(message: Message):
         return
 
     target_user = message.reply_to_message.from_user if message.reply_to_message else message.from_user
+    score = await db.get_violation_score(message.chat.id, target_user.id)
     count = await db.get_violation_count(message.chat.id, target_user.id)
+    profile = await profiles.get(message.chat.id)
+    window_days = db.decay.bucket_seconds * db.decay.max_buckets // 86400
 
     await message.answer(
-        f"📊 <b>{target_user.full_name}</b>\n"
-        f"Предупреждений: {count}/{MAX_VIOLATIONS}",
+        f"📊 <b>{html.escape(target_user.full_name)}</b>\n"
+        f"Счёт нарушений: {format_score(score)}/{profile.max_violations}\n"
+        f"Нарушений за {window_days:g} дн.: {count}\n"
+        f"ℹ️ Старые нарушения весят меньше: вес падает вдвое за {db.decay.half_life / 86400:g} дн.",
         parse_mode="HTML"
     )
-    logging.info(f"ℹ️ Проверка предупреждений: {target_user.full_name} ({target_user.id}), count={count}")
+    logging.info(f"ℹ️ Проверка предупреждений: {target_user.full_name} ({target_user.id}), score={score:.2f}")
 
 
 @admin_router.message(Command("ban"))
@@ -119,6 +134,10 @@ async def cmd_ban(message: Message):
         await message.reply("↩️ Ответьте на сообщение пользователя командой /ban")
         return
 
+    if not await bot_can_restrict(message.bot, message.chat.id):
+        await message.reply("❌ Бот не имеет прав на блокировку пользователей!")
+        return
+
     target_user = message.reply_to_message.from_user
     if await is_admin(message.bot, message.chat.id, target_user.id):
         logging.warning(f"Попытка забанить администратора {target_user.id}")
@@ -131,14 +150,14 @@ async def cmd_ban(message: Message):
             message.chat.id, target_user.id,
             message.from_user.id, "Бан от администратора", 0
         )
+        name, title = html.escape(target_user.full_name), html.escape(message.chat.title or "")
         await message.answer(
-            f"🚫 <b>{target_user.full_name}</b> заблокирован",
+            f"🚫 <b>{name}</b> заблокирован",
             parse_mode="HTML"
         )
         logging.info(f"✅ Пользователь забанен: {target_user.full_name} ({target_user.id})")
-        await log_to_admins(
-            message.bot,
-            f"🚫 Админ <b>{message.from_user.full_name}</b> забанил пользователя <b>{target_user.full_name}</b> в чате <b>{message.chat.title}</b>"
+        log_to_admins(
+            f"🚫 Админ <b>{html.escape(message.from_user.full_name)}</b> забанил пользователя <b>{name}</b> в чате <b>{title}</b>"
         )
     except Exception as e:
         logging.error(f"❌ Ошибка при бане: {e}")
@@ -160,26 +179,247 @@ async def cmd_unban(message: Message):
         await message.reply("↩️ Ответьте на сообщение пользователя командой /unban")
         return
 
+    if not await bot_can_restrict(message.bot, message.chat.id):
+        await message.reply("❌ Бот не имеет прав на блокировку пользователей!")
+        return
+
     target_user = message.reply_to_message.from_user
     try:
         await message.bot.unban_chat_member(message.chat.id, target_user.id)
+        db.remove_ban(message.chat.id, target_user.id)
+        name, title = html.escape(target_user.full_name), html.escape(message.chat.title or "")
         await message.answer(
-            f"✅ <b>{target_user.full_name}</b> разблокирован",
+            f"✅ <b>{name}</b> разблокирован",
             parse_mode="HTML"
         )
         logging.info(f"✅ Пользователь разбанен: {target_user.full_name} ({target_user.id})")
-        await log_to_admins(
-            message.bot,
-            f"✅ Админ <b>{message.from_user.full_name}</b> разбанил пользователя <b>{target_user.full_name}</b> в чате <b>{message.chat.title}</b>"
+        log_to_admins(
+            f"✅ Админ <b>{html.escape(message.from_user.full_name)}</b> разбанил пользователя <b>{name}</b> в чате <b>{title}</b>"
         )
     except Exception as e:
         logging.error(f"❌ Ошибка при разбане: {e}")
         await message.reply(f"❌ Ошибка: {e}")
 
 
+@admin_router.message(Command("reload"))
+async def cmd_reload(message: Message):
+    logging.info("⚡ cmd_reload вызван")
+    if message.chat.type not in ["group", "supergroup"]:
+        return
+
+    if not await is_admin(message.bot, message.chat.id, message.from_user.id):
+        logging.warning(f"Пользователь {message.from_user.id} не админ, отказано в /reload")
+        await message.reply("❌ Эта команда доступна только администраторам!")
+        return
+
+    try:
+        changed = await bad_words.reload()
+    except Exception as e:
+        logging.error(f"❌ Ошибка при перезагрузке словаря: {e}")
+        await message.reply(f"❌ Ошибка: {e}")
+        return
+
+    if changed:
+        await message.answer(f"📖 Словарь обновлён, запрещённых слов: {len(bad_words)}")
+        log_to_admins(f"📖 Админ <b>{html.escape(message.from_user.full_name)}</b> перезагрузил словарь ({len(bad_words)} слов)")
+    else:
+        await message.answer("📖 Словарь не изменился")
+    logging.info(f"✅ Словарь перезагружен: changed={changed}")
+
+
+# ==================== CHAT SETTINGS ====================
+
+async def _check_settings_access(message: Message, command: str) -> bool:
+    if message.chat.type not in ["group", "supergroup"]:
+        return False
+    if not await is_admin(message.bot, message.chat.id, message.from_user.id):
+        logging.warning(f"Пользователь {message.from_user.id} не админ, отказано в /{command}")
+        await message.reply("❌ Эта команда доступна только администраторам!")
+        return False
+    return True
+
+
+@admin_router.message(Command("setlimit"))
+async def cmd_setlimit(message: Message, command: CommandObject):
+    logging.info("⚡ cmd_setlimit вызван")
+    if not await _check_settings_access(message, "setlimit"):
+        return
+
+    if not command.args or not command.args.strip().isdigit() or int(command.args) < 1:
+        await message.reply("↩️ Укажите число нарушений до бана: /setlimit 3")
+        return
+
+    value = int(command.args)
+    await profiles.set_max_violations(message.chat.id, value)
+    await message.answer(f"⚙️ Максимум нарушений в этом чате: {value}")
+    logging.info(f"✅ Лимит нарушений изменён: chat={message.chat.id}, max_violations={value}")
+
+
+@admin_router.message(Command("setban"))
+async def cmd_setban(message: Message, command: CommandObject):
+    logging.info("⚡ cmd_setban вызван")
+    if not await _check_settings_access(message, "setban"):
+        return
+
+    if not command.args or not command.args.strip().isdigit():
+        await message.reply("↩️ Укажите длительность бана в часах (0 — навсегда): /setban 24")
+        return
+
+    hours = int(command.args)
+    await profiles.set_ban_duration(message.chat.id, hours * 3600)
+    await message.answer(f"⚙️ Длительность бана в этом чате: {f'{hours} ч.' if hours else 'навсегда'}")
+    logging.info(f"✅ Длительность бана изменена: chat={message.chat.id}, hours={hours}")
+
+
+@admin_router.message(Command("addword"))
+async def cmd_addword(message: Message, command: CommandObject):
+    logging.info("⚡ cmd_addword вызван")
+    if not await _check_settings_access(message, "addword"):
+        return
+
+    if not command.args:
+        await message.reply("↩️ Укажите слово: /addword слово")
+        return
+
+    word = command.args.strip().lower()
+    await profiles.ban_word(message.chat.id, word)
+    await message.answer(f"🚫 Слово <code>{html.escape(word)}</code> запрещено в этом чате", parse_mode="HTML")
+    logging.info(f"✅ Слово запрещено: chat={message.chat.id}, word={word}")
+
+
+@admin_router.message(Command("allowword"))
+async def cmd_allowword(message: Message, command: CommandObject):
+    logging.info("⚡ cmd_allowword вызван")
+    if not await _check_settings_access(message, "allowword"):
+        return
+
+    if not command.args:
+        await message.reply("↩️ Укажите слово: /allowword слово")
+        return
+
+    word = command.args.strip().lower()
+    if not await profiles.allow_word(message.chat.id, word):
+        await message.reply(f"🤷 Слова <code>{html.escape(word)}</code> нет в словаре этого чата", parse_mode="HTML")
+        return
+    await message.answer(f"✅ Слово <code>{html.escape(word)}</code> разрешено в этом чате", parse_mode="HTML")
+    logging.info(f"✅ Слово разрешено: chat={message.chat.id}, word={word}")
+
+
+# ==================== STATISTICS ====================
+
+@admin_router.message(Command("stats"))
+async def cmd_stats(message: Message, command: CommandObject):
+    logging.info("⚡ cmd_stats вызван")
+    if not await _check_settings_access(message, "stats"):
+        return
+
+    days = STATS_DAYS
+    if command.args:
+        if not command.args.strip().isdigit() or not 1 <= int(command.args) <= 365:
+            await message.reply("↩️ Укажите число дней от 1 до 365: /stats 30")
+            return
+        days = int(command.args)
+
+    stats = await db.get_chat_stats(message.chat.id, days, STATS_TOP)
+    violations = sum(row[1] for row in stats.daily)
+    bans = sum(row[2] for row in stats.daily)
+    lines = [
+        f"📊 <b>Статистика чата за {days} дн.</b>",
+        f"Нарушений: {violations}, банов: {bans}",
+    ]
+    if stats.daily:
+        lines.append("\n📅 <b>По дням:</b>")
+        lines.extend(f"{day}: {day_violations} наруш., {day_bans} бан." for day, day_violations, day_bans in stats.daily)
+    if stats.offenders:
+        lines.append("\n👤 <b>Чаще всех нарушают (за всё время):</b>")
+        for place, (user_id, username, full_name, count) in enumerate(stats.offenders, 1):
+            name = html.escape(full_name or str(user_id))
+            mention = f" (@{html.escape(username)})" if username and username != "unknown" else ""
+            lines.append(f"{place}. {name}{mention} — {count}")
+    if stats.words:
+        lines.append("\n🚫 <b>Частые причины (за всё время):</b>")
+        lines.extend(
+            f"{place}. <code>{html.escape(word)}</code> — {hits}" for place, (word, hits) in enumerate(stats.words, 1)
+        )
+
+    await message.answer("\n".join(lines), parse_mode="HTML")
+    logging.info(f"✅ Статистика отправлена: chat={message.chat.id}, days={days}")
+
+
+@admin_router.message(Command("export"))
+async def cmd_export(message: Message):
+    logging.info("⚡ cmd_export вызван")
+    if not await _check_settings_access(message, "export"):
+        return
+
+    chat_id = message.chat.id
+    # История пишется во временный файл пачками — в памяти не больше EXPORT_CHUNK строк
+    fd, path = tempfile.mkstemp(prefix="violations_", suffix=".csv")
+    try:
+        total = 0
+        # utf-8-sig — чтобы Excel сразу узнал кириллицу
+        with open(fd, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.writer(f)
+            async for columns, rows in db.iter_violations(chat_id, EXPORT_CHUNK):
+                if not total:
+                    writer.writerow(columns)
+                await asyncio.to_thread(writer.writerows, rows)
+                total += len(rows)
+
+        if not total:
+            await message.reply("📭 Нарушений в этом чате нет")
+            return
+
+        # Тексты нарушений уходят админу в личку, а не в общий чат
+        try:
+            await message.bot.send_document(
+                message.from_user.id,
+                FSInputFile(path, filename=f"violations_{abs(chat_id)}.csv"),
+                caption=f"📤 История нарушений чата {message.chat.title or chat_id}: {total} строк",
+            )
+        except TelegramForbiddenError:
+            await message.reply("✉️ Начните личный диалог с ботом, чтобы получить выгрузку")
+            return
+        await message.reply(f"📤 Выгрузка отправлена в личные сообщения ({total} строк)")
+        logging.info(f"✅ Выгрузка отправлена: chat={chat_id}, rows={total}")
+    except Exception as e:
+        logging.error(f"❌ Ошибка выгрузки: {e}")
+        await message.reply(f"❌ Ошибка: {e}")
+    finally:
+        os.remove(path)
+
+
+@admin_router.message(Command("loglevel"))
+async def cmd_loglevel(message: Message, command: CommandObject):
+    logging.info("⚡ cmd_loglevel вызван")
+    # Уровень общий для всего процесса, поэтому менять его могут только админы канала логов
+    if not await is_admin(message.bot, ADMIN_LOG_CHAT_ID, message.from_user.id):
+        logging.warning(f"Пользователь {message.from_user.id} не админ канала логов, отказано в /loglevel")
+        await message.reply("❌ Эта команда доступна только администраторам канала логов!")
+        return
+
+    current = logging.getLevelName(logging.getLogger().level)
+    if not command.args:
+        await message.reply(f"📜 Уровень логов: {current}\nИзменить: /loglevel DEBUG|INFO|WARNING|ERROR")
+        return
+
+    if not set_level(command.args.strip()):
+        await message.reply("↩️ Неизвестный уровень. Допустимо: DEBUG, INFO, WARNING, ERROR")
+        return
+    level = logging.getLevelName(logging.getLogger().level)
+    # Уровень хранится в памяти процесса: воркеры вебхука меняют его каждый сам по себе
+    scope = ""
+    if BOT_MODE == "webhook" and WEBHOOK_WORKERS > 1:
+        scope = "\n⚠️ Только в воркере, обработавшем команду; для всех воркеров — LOG_LEVEL и перезапуск"
+    await message.reply(f"📜 Уровень логов изменён: {current} → {level}{scope}")
+    logging.warning(f"📜 Уровень логов изменён: {current} → {level}, by={message.from_user.id}")
+
+
 @admin_router.message(Command("help"))
 async def cmd_help(message: Message):
     logging.info("⚡ cmd_help вызван")
+    profile = await profiles.get(message.chat.id)
+    ban_text = f"{profile.ban_duration // 3600} ч." if profile.ban_duration > 0 else "навсегда"
     help_text = f"""
 🤖 <b>Команды модерационного бота</b>
 
@@ -192,11 +432,19 @@ async def cmd_help(message: Message):
 /unwarn — снять предупреждения (ответить на сообщение)
 /ban — забанить пользователя (ответить на сообщение)
 /unban — разбанить пользователя (ответить на сообщение)
+/reload — перечитать список запрещённых слов
+/setlimit N — максимум нарушений до бана в этом чате
+/setban N — длительность бана в часах (0 — навсегда)
+/addword слово — запретить слово в этом чате
+/allowword слово — разрешить слово в этом чате
+/stats [N] — статистика чата за N дней
+/export — история нарушений в CSV (в личные сообщения)
+/loglevel LEVEL — уровень логов бота (админы канала логов; при нескольких воркерах — только у одного)
 
 ⚙️ <b>Настройки:</b>
-• Максимум нарушений: {MAX_VIOLATIONS}
-• Длительность бана: {BAN_DURATION // 3600} ч. если BAN_DURATION > 0 else "навсегда"
-• Запрещённых слов: {len(BAD_WORDS)}
+• Максимум нарушений: {profile.max_violations}
+• Длительность бана: {ban_text}
+• Запрещённых слов: {profiles.word_count(profile)}
 """
     await message.answer(help_text, parse_mode="HTML")
     logging.info("✅ Справка отправлена")
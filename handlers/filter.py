@@ -1,112 +1,166 @@
 import asyncio
+import html
 import logging
 from datetime import datetime, timedelta
 
 from aiogram import F, Router
 from aiogram.types import Message
 
-from config.settings import MAX_VIOLATIONS, BAN_DURATION
-from handlers.helpers import bot_can_restrict, contains_bad_word, delete_warning, is_admin, log_to_admins
+from handlers.helpers import (
+    bot_can_delete, bot_can_restrict, check_spam, contains_bad_word, is_admin, jobs, log_to_admins,
+    profiles, send_warning
+)
 from handlers.moderation import db
+from services.spam import SpamVerdict
+from services.violations import format_score, reaches_limit
 
 
 filter_router = Router()
 
+# Как виды спама выглядят в сводке слов /stats
+SPAM_STATS_LABELS = {"flood": "[флуд]", "duplicate": "[повтор]"}
+
+
+def spam_reason(verdict: SpamVerdict) -> str:
+    if verdict.kind == "flood":
+        return f"флуд ({verdict.count} сообщений подряд)"
+    return f"повторяющееся сообщение ({verdict.count} копий)"
+
+
+async def delete_copies(message: Message, verdict: SpamVerdict):
+    """Удалить более ранние копии волны повторов; удаления одного чата склеивает outbound"""
+    results = await asyncio.gather(
+        *(message.bot.delete_message(message.chat.id, message_id) for _, message_id in verdict.earlier),
+        return_exceptions=True
+    )
+    failed = sum(isinstance(result, Exception) for result in results)
+    if failed:
+        logging.warning(f"Не удалось удалить копий спама: {failed} из {len(results)}")
+
 
 @filter_router.message(F.chat.type.in_({"group", "supergroup"}))
 async def filter_messages(message: Message):
     if not message.text:
         return
 
-    has_bad_word, found_word = contains_bad_word(message.text)
-    if not has_bad_word:
-        return
-
-    user_id = message.from_user.id
     chat_id = message.chat.id
+    user_id = message.from_user.id
+    verdict = check_spam(message)
+    # Админам можно повторять объявления и писать подряд — для них действует только словарь
+    if verdict is not None and await is_admin(message.bot, chat_id, user_id):
+        verdict = None
+
+    if verdict is None:
+        has_bad_word, found_word = contains_bad_word(message.text, await profiles.matcher(chat_id))
+        if not has_bad_word:
+            return
+        reason = f"запрещённое слово <code>{html.escape(found_word)}</code>"
+    else:
+        found_word = ""
+        reason = spam_reason(verdict)
+
+    # Имя, название чата и слово из /addword могут содержать < и & — в HTML они экранируются
+    name, title = html.escape(message.from_user.full_name), html.escape(message.chat.title or "")
+    profile = await profiles.get(chat_id)
+    max_violations, ban_duration = profile.max_violations, profile.ban_duration
+    # Права бота берутся из кэша — без прав на удаление не тратим запросы впустую
+    can_delete = await bot_can_delete(message.bot, chat_id)
 
     # Если админ нарушил
-    if await is_admin(message.bot, chat_id, user_id):
+    if verdict is None and await is_admin(message.bot, chat_id, user_id):
+        if not can_delete:
+            logging.warning(f"Нет прав на удаление сообщения админа в чате {chat_id}")
+            return
         try:
             await message.delete()
             logging.info(f"Удалено сообщение админа {message.from_user.full_name} со словом '{found_word}'")
-            await log_to_admins(
-                message.bot,
-                f"⚠️ Админ <b>{message.from_user.full_name}</b> написал запрещённое слово <code>{found_word}</code> в чате <b>{message.chat.title}</b>"
+            log_to_admins(
+                f"⚠️ Админ <b>{name}</b> написал запрещённое слово <code>{html.escape(found_word)}</code> в чате <b>{title}</b>"
             )
         except Exception as e:
             logging.warning(f"Не удалось удалить сообщение админа: {e}")
         return
 
     # Удаляем сообщение обычного пользователя
-    try:
-        await message.delete()
-        logging.info(f"Удалено сообщение пользователя {message.from_user.full_name} со словом '{found_word}'")
-    except Exception as e:
-        logging.warning(f"Не удалось удалить сообщение: {e}")
+    if can_delete:
+        try:
+            await message.delete()
+            logging.info(f"Удалено сообщение пользователя {message.from_user.full_name}: {found_word or verdict.kind}")
+        except Exception as e:
+            logging.warning(f"Не удалось удалить сообщение: {e}")
+        if verdict is not None and verdict.earlier:
+            await delete_copies(message, verdict)
+    else:
+        logging.warning(f"Нет прав на удаление сообщений в чате {chat_id}")
+
+    # Волна флуда засчитывается одним нарушением, остальные сообщения только удаляются
+    if verdict is not None and not verdict.first:
+        return
 
-    count = await db.add_violation(
+    score = await db.add_violation(
         chat_id, user_id,
         message.from_user.username or "unknown",
         message.from_user.full_name,
-        message.text[:200]
+        message.text[:200],
+        word=found_word or SPAM_STATS_LABELS[verdict.kind]
     )
 
-    warning_msg = await message.answer(
-        f"⚠️ <b>{message.from_user.full_name}</b>, нарушение #{count}!\n"
-        f"📝 Найдено запрещённое слово: <code>{found_word}</code>\n"
-        f"🚫 После {MAX_VIOLATIONS} нарушений последует бан.",
-        parse_mode="HTML"
+    # Ответ уходит в фоне: ожидание лимита чата не держит дорожку исполнителя
+    send_warning(
+        message,
+        f"⚠️ <b>{name}</b>, нарушение! Счёт: {format_score(score)}/{max_violations}\n"
+        f"📝 Причина: {reason}\n"
+        f"🚫 После {max_violations} нарушений последует бан."
     )
 
-    asyncio.create_task(delete_warning(warning_msg))
-
     # Логируем нарушение
-    await log_to_admins(
-        message.bot,
-        f"⚠️ Нарушение в чате <b>{message.chat.title}</b>\n"
-        f"👤 Пользователь: <b>{message.from_user.full_name}</b> (@{message.from_user.username or 'нет'})\n"
-        f"📝 Сообщение: <code>{message.text[:200]}</code>\n"
-        f"🚫 Найдено слово: <code>{found_word}</code>\n"
-        f"📊 Нарушений: {count}/{MAX_VIOLATIONS}"
+    log_to_admins(
+        f"⚠️ Нарушение в чате <b>{title}</b>\n"
+        f"👤 Пользователь: <b>{name}</b> (@{message.from_user.username or 'нет'})\n"
+        f"📝 Сообщение: <code>{html.escape(message.text[:200])}</code>\n"
+        f"🚫 Причина: {reason}\n"
+        f"📊 Счёт нарушений: {format_score(score)}/{max_violations}"
     )
 
-    # Бан при превышении лимита
-    if count >= MAX_VIOLATIONS:
+    # Бан, когда затухающий счёт дошёл до лимита: старые нарушения весят меньше свежих
+    if reaches_limit(score, max_violations):
         if not await bot_can_restrict(message.bot, chat_id):
-            await message.answer("❌ Бот не имеет прав на блокировку пользователей!")
+            send_warning(message, "❌ Бот не имеет прав на блокировку пользователей!")
             return
         try:
-            if BAN_DURATION > 0:
-                until_date = datetime.now() + timedelta(seconds=BAN_DURATION)
+            if ban_duration > 0:
+                until_date = datetime.now() + timedelta(seconds=ban_duration)
                 await message.bot.ban_chat_member(chat_id, user_id, until_date=until_date)
-                ban_text = f"на {BAN_DURATION // 3600} ч."
+                ban_text = f"на {ban_duration // 3600} ч."
             else:
                 await message.bot.ban_chat_member(chat_id, user_id)
                 ban_text = "навсегда"
 
             await db.add_ban(
                 chat_id, user_id, message.bot.id,
-                f"Превышен лимит нарушений ({MAX_VIOLATIONS})",
-                BAN_DURATION
+                f"Превышен лимит нарушений ({max_violations})",
+                ban_duration
             )
+            if ban_duration > 0:
+                jobs.schedule("ban_expired", ban_duration, chat_id, user_id=user_id)
             await db.reset_violations(chat_id, user_id)
 
-            await message.answer(
-                f"🚫 <b>{message.from_user.full_name}</b> заблокирован {ban_text}\n"
-                f"Причина: превышен лимит нарушений ({MAX_VIOLATIONS})",
-                parse_mode="HTML"
+            # Объявление о бане тоже уходит в фоне и остаётся в чате
+            send_warning(
+                message,
+                f"🚫 <b>{name}</b> заблокирован {ban_text}\n"
+                f"Причина: превышен лимит нарушений ({max_violations})",
+                delete=False
             )
 
             # Логируем успешный бан
-            await log_to_admins(
-                message.bot,
-                f"🚫 Пользователь <b>{message.from_user.full_name}</b> заблокирован {ban_text}\n"
-                f"Причина: превышен лимит нарушений ({MAX_VIOLATIONS})\n"
-                f"Чат: <b>{message.chat.title}</b>"
+            log_to_admins(
+                f"🚫 Пользователь <b>{name}</b> заблокирован {ban_text}\n"
+                f"Причина: превышен лимит нарушений ({max_violations})\n"
+                f"Чат: <b>{title}</b>"
             )
         except Exception as e:
             logging.error(f"Не удалось забанить пользователя: {e}")
-            await message.answer(f"❌ Ошибка при попытке блокировки: {e}")
+            send_warning(message, f"❌ Ошибка при попытке блокировки: {html.escape(str(e))}")
 
 
@@ -1,19 +1,61 @@
 import asyncio
 import logging
-import re
+import time
 
 from aiogram import Bot
 from aiogram.types import Message
 
-from config.settings import BAD_WORDS, ADMIN_LOG_CHAT_ID
+from config.settings import (
+    BAD_WORDS_FILE, MATCHER_CACHE_PATH, ADMIN_LOG_CHAT_ID, ADMIN_CACHE_TTL, ADMIN_LOG_FLUSH_INTERVAL, ADMIN_LOG_QUEUE_SIZE,
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST, OUTBOUND_CHAT_SEND_RATE, OUTBOUND_CHAT_SEND_BURST,
+    WARNING_TTL, WARNING_BACKLOG, MAX_VIOLATIONS, BAN_DURATION,
+    ARCHIVE_DIR, RETENTION_DAYS, MAINTENANCE_INTERVAL, MAINTENANCE_BATCH, MAINTENANCE_IDLE, VACUUM_PAGES,
+    SPAM_FLOOD_MESSAGES, SPAM_FLOOD_WINDOW, SPAM_DUPLICATE_COUNT, SPAM_DUPLICATE_WINDOW, SPAM_SIMILARITY,
+    SPAM_MIN_LENGTH, SPAM_INDEX_SIZE
+)
+from handlers.moderation import db
+from services.admin_log import AdminLogDispatcher
+from services.admins import AdminRoster, BotPermissions
+from services.dictionary import BadWordDictionary
+from services.jobs import JobScheduler
+from services.matcher import WordMatch, WordMatcher
+from services.metrics import MATCHER_SECONDS, SPAM_DETECTED
+from services.outbound import OutboundScheduler
+from services.profiles import ChatProfiles
+from services.retention import RetentionService
+from services.spam import SpamDetector, SpamVerdict
+
+# Автомат берётся из кэш-файла или собирается в on_startup (не при импорте: логи ещё не настроены);
+# дальше перезагружается на лету
+bad_words = BadWordDictionary(BAD_WORDS_FILE, MATCHER_CACHE_PATH)
+admin_roster = AdminRoster(ADMIN_CACHE_TTL)
+bot_permissions = BotPermissions()
+# Подключается к сессии бота в bot.py: все запросы к чатам идут через него
+outbound = OutboundScheduler(
+    OUTBOUND_GLOBAL_RATE, OUTBOUND_CHAT_RATE, OUTBOUND_CHAT_BURST,
+    send_rate=OUTBOUND_CHAT_SEND_RATE, send_burst=OUTBOUND_CHAT_SEND_BURST, log_chat_id=ADMIN_LOG_CHAT_ID
+)
+admin_log = AdminLogDispatcher(
+    ADMIN_LOG_CHAT_ID, queue_size=ADMIN_LOG_QUEUE_SIZE, flush_interval=ADMIN_LOG_FLUSH_INTERVAL
+)
+jobs = JobScheduler(db)
+profiles = ChatProfiles(db, bad_words, MAX_VIOLATIONS, BAN_DURATION)
+spam = SpamDetector(
+    SPAM_FLOOD_MESSAGES, SPAM_FLOOD_WINDOW, SPAM_DUPLICATE_COUNT, SPAM_DUPLICATE_WINDOW,
+    min_length=SPAM_MIN_LENGTH, threshold=SPAM_SIMILARITY, max_entries=SPAM_INDEX_SIZE
+)
+retention = RetentionService(
+    db, ARCHIVE_DIR, RETENTION_DAYS, interval=MAINTENANCE_INTERVAL, batch_size=MAINTENANCE_BATCH,
+    idle_after=MAINTENANCE_IDLE, vacuum_pages=VACUUM_PAGES
+)
 
 
 async def is_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
     """Проверка, является ли пользователь администратором"""
     try:
-        member = await bot.get_chat_member(chat_id, user_id)
-        logging.info(f"🔎 Проверка is_admin: user={user_id}, status={member.status}")
-        return member.status in ["creator", "administrator"]
+        result = await admin_roster.is_admin(bot, chat_id, user_id)
+        logging.info(f"🔎 Проверка is_admin: user={user_id}, admin={result}")
+        return result
     except Exception as e:
         logging.error(f"Ошибка проверки прав: {e}")
         return False
@@ -22,42 +64,119 @@ async def is_admin(bot: Bot, chat_id: int, user_id: int) -> bool:
 async def bot_can_restrict(bot: Bot, chat_id: int) -> bool:
     """Проверка прав бота на ограничение пользователей"""
     try:
-        bot_member = await bot.get_chat_member(chat_id, bot.id)
-        can_restrict = getattr(bot_member, "can_restrict_members", False)
-        logging.info(f"🔎 Проверка прав бота: status={bot_member.status}, restrict={can_restrict}")
-        return can_restrict
+        rights = await bot_permissions.get(bot, chat_id)
+        logging.info(f"🔎 Проверка прав бота: restrict={rights.can_restrict_members}")
+        return rights.can_restrict_members
+    except Exception as e:
+        logging.error(f"Ошибка проверки прав бота: {e}")
+        return False
+
+
+async def bot_can_delete(bot: Bot, chat_id: int) -> bool:
+    """Проверка прав бота на удаление сообщений"""
+    try:
+        rights = await bot_permissions.get(bot, chat_id)
+        logging.info(f"🔎 Проверка прав бота: delete={rights.can_delete_messages}")
+        return rights.can_delete_messages
     except Exception as e:
         logging.error(f"Ошибка проверки прав бота: {e}")
         return False
 
 
-def contains_bad_word(text: str) -> tuple[bool, str]:
+def contains_bad_word(text: str, matcher: WordMatcher | None = None) -> tuple[bool, str]:
+    """matcher — словарь чата из profiles.matcher(); по умолчанию общий словарь"""
     if not text:
         return False, ""
-    text_lower = text.lower()
-    for word in BAD_WORDS:
-        pattern = r"\b" + re.escape(word) + r"\b"
-        if re.search(pattern, text_lower):
-            logging.info(f"🚫 Найдено запрещённое слово: {word}")
-            return True, word
+    started = time.perf_counter()
+    match = (matcher or bad_words.matcher).search(text)
+    MATCHER_SECONDS.observe(time.perf_counter() - started)
+    if match:
+        logging.info(f"🚫 Найдено запрещённое слово: {match.word}")
+        return True, match.word
     return False, ""
 
 
-async def delete_warning(msg: Message):
-    await asyncio.sleep(10)
-    try:
-        await msg.delete()
-        logging.info("✅ Предупреждение удалено")
-    except Exception as e:
-        logging.warning(f"Не удалось удалить предупреждение: {e}")
+def check_spam(message: Message) -> SpamVerdict | None:
+    """Флуд и волны повторов; вызывается до поиска запрещённых слов"""
+    verdict = spam.check(message.chat.id, message.from_user.id, message.message_id, message.text, time.monotonic())
+    if verdict is not None:
+        SPAM_DETECTED.inc(verdict.kind)
+        logging.info(f"🌊 Спам ({verdict.kind}): chat={message.chat.id}, user={message.from_user.id}, {verdict.count}")
+    return verdict
+
+
+def find_bad_words(text: str, matcher: WordMatcher | None = None) -> list[WordMatch]:
+    """Все запрещённые слова в тексте вместе с их позициями"""
+    if not text:
+        return []
+    started = time.perf_counter()
+    matches = (matcher or bad_words.matcher).find_all(text)
+    MATCHER_SECONDS.observe(time.perf_counter() - started)
+    return matches
 
 
-async def log_to_admins(bot: Bot, text: str, chat_id: int = None, user_id: int = None):
-    """Отправка лога в админ-канал"""
+# Предупреждения, ещё ждущие отправки: chat_id -> сколько
+_pending_warnings: dict[int, int] = {}
+_warning_tasks: set[asyncio.Task] = set()
+
+
+def send_warning(message: Message, text: str, delete: bool = True):
+    """
+    Отправить предупреждение в фоне и удалить его через WARNING_TTL
+    (delete=False — сообщение остаётся в чате, как объявление о бане).
+    Обработчик не ждёт токен лимита чата; при рейде, когда в чате копится
+    WARNING_BACKLOG неотправленных предупреждений, новые не ставятся
+    """
+    chat_id = message.chat.id
+    if _pending_warnings.get(chat_id, 0) >= WARNING_BACKLOG:
+        logging.info(f"🔇 Предупреждение пропущено: в чате {chat_id} очередь предупреждений")
+        return
+    _pending_warnings[chat_id] = _pending_warnings.get(chat_id, 0) + 1
+    task = asyncio.create_task(_send_warning(message, text, delete))
+    _warning_tasks.add(task)
+    task.add_done_callback(_warning_tasks.discard)
+
+
+async def _send_warning(message: Message, text: str, delete: bool):
+    chat_id = message.chat.id
     try:
-        await bot.send_message(ADMIN_LOG_CHAT_ID, text, parse_mode="HTML")
-        logging.info(f"✅ Лог отправлен в админ-канал: {text}")
+        warning_msg = await message.answer(text, parse_mode="HTML")
+        if delete:
+            delete_later(warning_msg)
     except Exception as e:
-        logging.error(f"❌ Ошибка при отправке лога: {e}")
+        logging.warning(f"Не удалось отправить предупреждение: {e}")
+    finally:
+        _pending_warnings[chat_id] -= 1
+        if not _pending_warnings[chat_id]:
+            del _pending_warnings[chat_id]
+
+
+async def join_warnings():
+    """Дождаться отправки фоновых предупреждений (при остановке бота)"""
+    if _warning_tasks:
+        await asyncio.gather(*_warning_tasks, return_exceptions=True)
+
+
+def delete_later(msg: Message, delay: float = WARNING_TTL):
+    """Удалить сообщение бота через delay секунд (переживает перезапуск)"""
+    jobs.schedule("delete_message", delay, msg.chat.id, message_id=msg.message_id)
+
+
+@jobs.handler("delete_message")
+async def job_delete_message(bot: Bot, chat_id: int, message_id: int):
+    await bot.delete_message(chat_id, message_id)
+    logging.info("✅ Предупреждение удалено")
+
+
+@jobs.handler("ban_expired")
+async def job_ban_expired(bot: Bot, chat_id: int, user_id: int):
+    if not await db.expire_ban(chat_id, user_id):
+        logging.info(f"⌛ Бан уже снят или продлён: chat={chat_id}, user={user_id}")
+        return
+    logging.info(f"⌛ Истёк срок бана: chat={chat_id}, user={user_id}")
+    log_to_admins(f"⌛ Истёк срок бана пользователя <code>{user_id}</code> в чате <code>{chat_id}</code>")
 
 
+def log_to_admins(text: str):
+    """Поставить лог в очередь админ-канала, отправка идёт в фоне"""
+    admin_log.log(text)
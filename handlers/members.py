@@ -0,0 +1,30 @@
+import logging
+
+from aiogram import Router
+from aiogram.types import ChatMemberUpdated
+
+from handlers.helpers import admin_roster, bot_permissions
+
+members_router = Router()
+
+
+@members_router.chat_member()
+async def on_chat_member(event: ChatMemberUpdated):
+    """Повышение/понижение/выход участника — сразу обновляем список админов"""
+    status = event.new_chat_member.status
+    admin_roster.update(event.chat.id, event.new_chat_member.user.id, status)
+    logging.info(
+        f"👥 Изменён статус участника: chat={event.chat.id}, "
+        f"user={event.new_chat_member.user.id}, status={status}"
+    )
+
+
+@members_router.my_chat_member()
+async def on_my_chat_member(event: ChatMemberUpdated):
+    """Боту выдали или отозвали права — кэш прав меняется без запроса к API"""
+    member = event.new_chat_member
+    bot_permissions.update(event.chat.id, member)
+    admin_roster.update(event.chat.id, member.user.id, member.status)
+    if member.status in ("left", "kicked"):
+        admin_roster.invalidate(event.chat.id)
+    logging.info(f"🤖 Изменён статус бота: chat={event.chat.id}, status={member.status}")
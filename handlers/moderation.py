@@ -1,14 +1,215 @@
+import asyncio
 import aiosqlite
 import logging
-from datetime import datetime, timedelta
+import time
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, NamedTuple
+
+from config.settings import (
+    DB_FLUSH_INTERVAL, DB_FLUSH_BATCH, COUNTER_CACHE_SIZE,
+    VIOLATION_BUCKET_SECONDS, VIOLATION_HALF_LIFE, VIOLATION_WINDOW_BUCKETS
+)
+from services.metrics import DB_SECONDS, timed
+from services.violations import Buckets, DecayPolicy, ViolationCounterCache, decode_buckets, encode_buckets
+
+# Настройки соединения: WAL позволяет читать во время записи,
+# synchronous=NORMAL в режиме WAL не делает fsync на каждый коммит
+PRAGMAS = (
+    # До journal_mode: новая база сразу создаётся с incremental auto_vacuum,
+    # существующая переводится только явно (enable_incremental_vacuum)
+    "PRAGMA auto_vacuum=INCREMENTAL",
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA cache_size=-8000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA busy_timeout=5000",
+)
+CACHED_STATEMENTS = 128
+# Версия схемы (PRAGMA user_version): миграции выполняются один раз при init_db
+SCHEMA_VERSION = 3
+
+SQL_UPSERT_COUNT = """
+    INSERT INTO violation_counts (chat_id, user_id, count, last_violation, buckets)
+    VALUES (?, ?, ?, ?, ?)
+    ON CONFLICT(chat_id, user_id) DO UPDATE SET
+        count = excluded.count,
+        last_violation = excluded.last_violation,
+        buckets = excluded.buckets
+"""
+SQL_INSERT_VIOLATION = """
+    INSERT INTO violations (chat_id, user_id, username, full_name, violation_text, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+# Сводки для /stats: приращения за пачку, пишутся в той же транзакции, что и сырые строки
+SQL_ROLLUP_DAILY = """
+    INSERT INTO stats_daily (chat_id, day, violations, bans) VALUES (?, ?, ?, ?)
+    ON CONFLICT(chat_id, day) DO UPDATE SET
+        violations = violations + excluded.violations,
+        bans = bans + excluded.bans
+"""
+SQL_ROLLUP_USER = """
+    INSERT INTO stats_users (chat_id, user_id, username, full_name, violations, last_violation)
+    VALUES (?, ?, ?, ?, ?, ?)
+    ON CONFLICT(chat_id, user_id) DO UPDATE SET
+        username = excluded.username,
+        full_name = excluded.full_name,
+        violations = violations + excluded.violations,
+        last_violation = excluded.last_violation
+"""
+SQL_ROLLUP_WORD = """
+    INSERT INTO stats_words (chat_id, word, hits) VALUES (?, ?, ?)
+    ON CONFLICT(chat_id, word) DO UPDATE SET hits = hits + excluded.hits
+"""
+SQL_DELETE_COUNT = "DELETE FROM violation_counts WHERE chat_id = ? AND user_id = ?"
+SQL_DELETE_VIOLATIONS = "DELETE FROM violations WHERE chat_id = ? AND user_id = ?"
+SQL_INSERT_JOB = """
+    INSERT OR REPLACE INTO scheduled_jobs (id, chat_id, run_at, kind, payload)
+    VALUES (?, ?, ?, ?, ?)
+"""
+SQL_DELETE_JOB = "DELETE FROM scheduled_jobs WHERE id = ?"
+SQL_UPSERT_PROFILE = """
+    INSERT INTO chat_profiles (chat_id, max_violations, ban_duration)
+    VALUES (?, ?, ?)
+    ON CONFLICT(chat_id) DO UPDATE SET
+        max_violations = excluded.max_violations,
+        ban_duration = excluded.ban_duration
+"""
+SQL_UPSERT_CHAT_WORD = """
+    INSERT INTO chat_words (chat_id, word, allowed) VALUES (?, ?, ?)
+    ON CONFLICT(chat_id, word) DO UPDATE SET allowed = excluded.allowed
+"""
+SQL_DELETE_CHAT_WORD = "DELETE FROM chat_words WHERE chat_id = ? AND word = ?"
+SQL_INSERT_BAN = """
+    INSERT INTO bans (chat_id, user_id, banned_by, reason, banned_at, ban_until)
+    VALUES (?, ?, ?, ?, ?, ?)
+"""
+SQL_UPSERT_ACTIVE_BAN = """
+    INSERT INTO active_bans (chat_id, user_id, ban_until) VALUES (?, ?, ?)
+    ON CONFLICT(chat_id, user_id) DO UPDATE SET ban_until = excluded.ban_until
+"""
+SQL_DELETE_ACTIVE_BAN = "DELETE FROM active_bans WHERE chat_id = ? AND user_id = ?"
+# Снимается только истёкший бан: если пользователя успели забанить снова, запись остаётся
+SQL_EXPIRE_ACTIVE_BAN = """
+    DELETE FROM active_bans
+    WHERE chat_id = ? AND user_id = ? AND ban_until IS NOT NULL AND ban_until <= ?
+"""
+
+
+class ChatStats(NamedTuple):
+    daily: list[tuple]  # [(день, нарушений, банов)] от новых к старым
+    offenders: list[tuple]  # [(user_id, username, full_name, нарушений)]
+    words: list[tuple]  # [(слово, срабатываний)]
+
+
+class StatsRollup:
+    """
+    Приращения сводок между сбросами: сколько бы нарушений ни пришло в пачке,
+    на каждый ключ (чат и день, пользователь, слово) приходится один upsert
+    """
+
+    def __init__(self):
+        self.daily: dict[tuple[int, str], list[int]] = {}
+        self.users: dict[tuple[int, int], list] = {}
+        self.words: dict[tuple[int, str], int] = {}
+
+    def add_violation(self, chat_id: int, user_id: int, username: str, full_name: str,
+                      timestamp: str, word: str | None):
+        self.daily.setdefault((chat_id, timestamp[:10]), [0, 0])[0] += 1
+        user = self.users.get((chat_id, user_id))
+        if user is None:
+            self.users[(chat_id, user_id)] = [username, full_name, 1, timestamp]
+        else:
+            user[0], user[1], user[3] = username, full_name, timestamp
+            user[2] += 1
+        if word:
+            self.words[(chat_id, word)] = self.words.get((chat_id, word), 0) + 1
+
+    def add_ban(self, chat_id: int, timestamp: str):
+        self.daily.setdefault((chat_id, timestamp[:10]), [0, 0])[1] += 1
+
+    def take(self) -> list[tuple[str, tuple]]:
+        """Забрать накопленное в виде операций для пачки записи"""
+        ops = [(SQL_ROLLUP_DAILY, (*key, *counts)) for key, counts in self.daily.items()]
+        ops += [(SQL_ROLLUP_USER, (*key, *user)) for key, user in self.users.items()]
+        ops += [(SQL_ROLLUP_WORD, (*key, hits)) for key, hits in self.words.items()]
+        self.daily, self.users, self.words = {}, {}, {}
+        return ops
+
+
+def _timestamp() -> str:
+    """Время события в формате CURRENT_TIMESTAMP (UTC), фиксируется до отложенной записи"""
+    return datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
 
 
 class AsyncDatabase:
-    def __init__(self, db_name="moderation.db"):
+    def __init__(self, db_name="moderation.db",
+                 flush_interval: float = DB_FLUSH_INTERVAL, flush_batch: int = DB_FLUSH_BATCH,
+                 counter_cache_size: int = COUNTER_CACHE_SIZE, decay: DecayPolicy | None = None):
         self.db_name = db_name
+        self.flush_interval = flush_interval
+        self.flush_batch = flush_batch
+        self._conn: aiosqlite.Connection | None = None
+        # Одно соединение на процесс, записи идут строго по одной транзакции за раз
+        self._write_lock = asyncio.Lock()
+
+        # Очередь отложенной записи: (sql, params) в порядке поступления
+        self._pending: list[tuple[str, tuple]] = []
+        # Процесс — единственный писатель violation_counts, поэтому счётчики живут в памяти
+        self.counts = ViolationCounterCache(counter_cache_size)
+        self.decay = decay or DecayPolicy(VIOLATION_BUCKET_SECONDS, VIOLATION_HALF_LIFE, VIOLATION_WINDOW_BUCKETS)
+        self.rollup = StatsRollup()
+        # Копия active_bans в памяти: (chat_id, user_id) -> ban_until (None — навсегда).
+        # Таблица маленькая, а процесс — единственный писатель банов своих чатов,
+        # поэтому is_banned не ходит в БД и видит ещё не записанные баны
+        self._bans: dict[tuple[int, int], float | None] = {}
+        self._flush_event = asyncio.Event()
+        self._flush_task: asyncio.Task | None = None
+        self._closing = False
+        self._last_write = time.monotonic()
+
+    @property
+    def depth(self) -> int:
+        """Записи, ожидающие сброса в БД"""
+        return len(self._pending)
+
+    @property
+    def idle_for(self) -> float:
+        """Сколько секунд не было новых записей"""
+        return time.monotonic() - self._last_write
+
+    @property
+    def conn(self) -> aiosqlite.Connection:
+        if self._conn is None:
+            raise RuntimeError("База данных не открыта: сначала вызовите init_db()")
+        return self._conn
+
+    async def connect(self):
+        if self._conn is not None:
+            return
+        self._conn = await aiosqlite.connect(self.db_name, cached_statements=CACHED_STATEMENTS)
+        for pragma in PRAGMAS:
+            await self._conn.execute(pragma)
+        logging.info(f"🔌 Соединение с БД открыто: {self.db_name}")
+
+    async def close(self):
+        if self._conn is None:
+            return
+        if self._flush_task is not None:
+            # Не отменяем задачу посреди транзакции, а просим её завершиться
+            self._closing = True
+            self._flush_event.set()
+            await self._flush_task
+            self._flush_task = None
+        await self.flush()
+        async with self._write_lock:
+            await self._conn.close()
+            self._conn = None
+        logging.info("🔌 Соединение с БД закрыто")
 
     async def init_db(self):
-        async with aiosqlite.connect(self.db_name) as conn:
+        await self.connect()
+        conn = self.conn
+        async with self._write_lock:
             await conn.execute("""
                 CREATE TABLE IF NOT EXISTS violations (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -26,6 +227,7 @@ class AsyncDatabase:
                     user_id INTEGER NOT NULL,
                     count INTEGER DEFAULT 0,
                     last_violation DATETIME,
+                    buckets TEXT,
                     PRIMARY KEY (chat_id, user_id)
                 )
             """)
@@ -40,97 +242,469 @@ class AsyncDatabase:
                     ban_until DATETIME
                 )
             """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS scheduled_jobs (
+                    id TEXT PRIMARY KEY,
+                    chat_id INTEGER NOT NULL,
+                    run_at REAL NOT NULL,
+                    kind TEXT NOT NULL,
+                    payload TEXT
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_profiles (
+                    chat_id INTEGER PRIMARY KEY,
+                    max_violations INTEGER,
+                    ban_duration INTEGER
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS chat_words (
+                    chat_id INTEGER NOT NULL,
+                    word TEXT NOT NULL,
+                    allowed INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (chat_id, word)
+                )
+            """)
+            # Действующие баны: одна строка на пользователя, ban_until — unix-время (NULL — навсегда)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS active_bans (
+                    chat_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    ban_until REAL,
+                    PRIMARY KEY (chat_id, user_id)
+                )
+            """)
+            # Сводки статистики: /stats читает только их, не трогая violations
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats_daily (
+                    chat_id INTEGER NOT NULL,
+                    day TEXT NOT NULL,
+                    violations INTEGER NOT NULL DEFAULT 0,
+                    bans INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (chat_id, day)
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats_users (
+                    chat_id INTEGER NOT NULL,
+                    user_id INTEGER NOT NULL,
+                    username TEXT,
+                    full_name TEXT,
+                    violations INTEGER NOT NULL DEFAULT 0,
+                    last_violation DATETIME,
+                    PRIMARY KEY (chat_id, user_id)
+                )
+            """)
+            await conn.execute("""
+                CREATE TABLE IF NOT EXISTS stats_words (
+                    chat_id INTEGER NOT NULL,
+                    word TEXT NOT NULL,
+                    hits INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (chat_id, word)
+                )
+            """)
             # Индексы для ускорения поиска
             await conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_chat_user ON violations(chat_id, user_id)")
             await conn.execute("CREATE INDEX IF NOT EXISTS idx_bans_chat_user ON bans(chat_id, user_id)")
+            # По времени выбираются строки для архивации
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_violations_timestamp ON violations(timestamp)")
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_bans_banned_at ON bans(banned_at)")
+            # Топы /stats берутся из индекса без сортировки
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_users_top ON stats_users(chat_id, violations)")
+            await conn.execute("CREATE INDEX IF NOT EXISTS idx_stats_words_top ON stats_words(chat_id, hits)")
             await conn.commit()
+            await self._migrate()
+            async with conn.execute("SELECT chat_id, user_id, ban_until FROM active_bans") as cursor:
+                self._bans = {(chat_id, user_id): ban_until async for chat_id, user_id, ban_until in cursor}
             logging.info("✅ База данных инициализирована")
+        if self._flush_task is None:
+            self._closing = False
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def _migrate(self):
+        async with self.conn.execute("PRAGMA user_version") as cursor:
+            version = (await cursor.fetchone())[0]
+        if version >= SCHEMA_VERSION:
+            return
+        if version < 1:
+            await self._migrate_active_bans()
+        if version < 2:
+            # Бакеты затухающего счёта; старые счётчики переводятся в бакеты при первой загрузке
+            async with self.conn.execute("PRAGMA table_info(violation_counts)") as cursor:
+                columns = [row[1] for row in await cursor.fetchall()]
+            if "buckets" not in columns:
+                await self.conn.execute("ALTER TABLE violation_counts ADD COLUMN buckets TEXT")
+                await self.conn.commit()
+        if version < 3:
+            await self._migrate_rollups()
+        await self.conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+        logging.info(f"🧱 Схема БД обновлена до версии {SCHEMA_VERSION}")
+
+    async def _migrate_active_bans(self):
+        # Заполняем active_bans последним баном каждого пользователя, если он ещё действует
+        # (ban_until в bans хранится в локальном времени)
+        await self.conn.execute("""
+            INSERT OR IGNORE INTO active_bans (chat_id, user_id, ban_until)
+            SELECT chat_id, user_id, CAST(strftime('%s', ban_until, 'utc') AS REAL)
+            FROM bans
+            WHERE id IN (SELECT MAX(id) FROM bans GROUP BY chat_id, user_id)
+              AND (ban_until IS NULL OR ban_until > datetime('now', 'localtime'))
+        """)
+        await self.conn.commit()
 
+    async def _migrate_rollups(self):
+        # Однократно заполняем сводки из накопленной истории; слова в violations не хранились
+        await self.conn.execute("""
+            INSERT OR IGNORE INTO stats_daily (chat_id, day, violations, bans)
+            SELECT chat_id, date(timestamp), COUNT(*), 0 FROM violations GROUP BY chat_id, date(timestamp)
+        """)
+        await self.conn.execute("""
+            INSERT INTO stats_daily (chat_id, day, violations, bans)
+            SELECT chat_id, date(banned_at), 0, COUNT(*) FROM bans WHERE true GROUP BY chat_id, date(banned_at)
+            ON CONFLICT(chat_id, day) DO UPDATE SET bans = excluded.bans
+        """)
+        await self.conn.execute("""
+            INSERT OR IGNORE INTO stats_users (chat_id, user_id, username, full_name, violations, last_violation)
+            SELECT chat_id, user_id, username, full_name, COUNT(*), MAX(timestamp)
+            FROM violations GROUP BY chat_id, user_id
+        """)
+        await self.conn.commit()
+
+    # ==================== WRITE-BEHIND ====================
+
+    def _enqueue(self, sql: str, params: tuple):
+        self._last_write = time.monotonic()
+        self._pending.append((sql, params))
+        if len(self._pending) >= self.flush_batch:
+            self._flush_event.set()
+
+    async def _flush_loop(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._flush_event.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_event.clear()
+            await self.flush()
+
+    @timed(DB_SECONDS)
+    async def flush(self):
+        """Записать накопленные изменения одной транзакцией"""
+        if not self._pending:
+            return
+        async with self._write_lock:
+            ops, self._pending = self._pending, []
+            ops += self.rollup.take()
+            flushed_counts = self.counts.dirty_snapshot()
+            if not ops:
+                return
+            conn = self.conn
+            try:
+                # Подряд идущие одинаковые запросы отправляем одним executemany
+                start = 0
+                while start < len(ops):
+                    sql = ops[start][0]
+                    end = start + 1
+                    while end < len(ops) and ops[end][0] == sql:
+                        end += 1
+                    await conn.executemany(sql, [params for _, params in ops[start:end]])
+                    start = end
+                await conn.commit()
+            except Exception as e:
+                logging.error(f"❌ Ошибка записи пачки в БД ({len(ops)} операций): {e}")
+                await conn.rollback()
+                self._pending[:0] = ops
+                return
+            self.counts.mark_clean(flushed_counts)
+            logging.info(f"💾 Записано в БД одной транзакцией: {len(ops)} операций")
+
+    async def _load_buckets(self, chat_id: int, user_id: int) -> Buckets:
+        async with self.conn.execute("""
+            SELECT count, last_violation, buckets FROM violation_counts WHERE chat_id = ? AND user_id = ?
+        """, (chat_id, user_id)) as cursor:
+            row = await cursor.fetchone()
+        if not row:
+            return ()
+        count, last_violation, buckets = row
+        if buckets is not None or not count:
+            return decode_buckets(buckets, self.decay.bucket_seconds)
+        # Счётчик из версии без бакетов: все нарушения относим ко времени последнего
+        try:
+            moment = datetime.strptime(last_violation, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc)
+            at = moment.timestamp()
+        except (TypeError, ValueError):
+            at = time.time()
+        return ((self.decay.bucket(at), count, round(at)),)
+
+    async def _get_buckets(self, chat_id: int, user_id: int) -> Buckets:
+        key = (chat_id, user_id)
+        buckets = self.counts.get(key)
+        if buckets is None:
+            # Под блокировкой записи пачка не может закоммититься между чтением и обновлением
+            async with self._write_lock:
+                buckets = self.counts.get(key)
+                if buckets is None:
+                    buckets = self.counts.setdefault(key, await self._load_buckets(chat_id, user_id))
+        return buckets
+
+    @timed(DB_SECONDS)
     async def add_violation(self, chat_id: int, user_id: int, username: str,
-                            full_name: str, text: str) -> int:
-        async with aiosqlite.connect(self.db_name) as conn:
-            await conn.execute("""
-                INSERT INTO violation_counts (chat_id, user_id, count, last_violation)
-                VALUES (?, ?, 1, CURRENT_TIMESTAMP)
-                ON CONFLICT(chat_id, user_id) DO UPDATE SET
-                    count = count + 1,
-                    last_violation = CURRENT_TIMESTAMP
-            """, (chat_id, user_id))
-            await conn.execute("""
-                INSERT INTO violations (chat_id, user_id, username, full_name, violation_text)
-                VALUES (?, ?, ?, ?, ?)
-            """, (chat_id, user_id, username, full_name, text))
-            async with conn.execute("""
-                SELECT count FROM violation_counts WHERE chat_id = ? AND user_id = ?
-            """, (chat_id, user_id)) as cursor:
-                row = await cursor.fetchone()
-            await conn.commit()
-            count = row[0] if row else 1
-            logging.info(f"⚠️ Нарушение добавлено: chat={chat_id}, user={user_id}, count={count}")
-            return count
+                            full_name: str, text: str, word: str | None = None) -> float:
+        """
+        Записать нарушение; возвращает затухающий счёт пользователя с учётом нового нарушения.
+        word — найденное слово или вид спама, попадает в сводку stats_words
+        """
+        now = time.time()
+        buckets = self.decay.add(await self._get_buckets(chat_id, user_id), now)
+        self.counts.set((chat_id, user_id), buckets)
+
+        timestamp = _timestamp()
+        total = self.decay.total(buckets, now)
+        self._enqueue(SQL_UPSERT_COUNT, (chat_id, user_id, total, timestamp, encode_buckets(buckets)))
+        self._enqueue(SQL_INSERT_VIOLATION, (chat_id, user_id, username, full_name, text, timestamp))
+        self.rollup.add_violation(chat_id, user_id, username, full_name, timestamp, word)
+        score = self.decay.score(buckets, now)
+        logging.info(f"⚠️ Нарушение добавлено: chat={chat_id}, user={user_id}, score={score:.2f}")
+        return score
 
+    @timed(DB_SECONDS)
+    async def get_violation_score(self, chat_id: int, user_id: int) -> float:
+        """Затухающий счёт: свежие нарушения весят 1, старые — всё меньше"""
+        score = self.decay.score(await self._get_buckets(chat_id, user_id), time.time())
+        logging.info(f"ℹ️ Получен счёт нарушений: chat={chat_id}, user={user_id}, score={score:.2f}")
+        return score
+
+    @timed(DB_SECONDS)
     async def get_violation_count(self, chat_id: int, user_id: int) -> int:
-        async with aiosqlite.connect(self.db_name) as conn:
-            async with conn.execute("""
-                SELECT count FROM violation_counts WHERE chat_id = ? AND user_id = ?
-            """, (chat_id, user_id)) as cursor:
-                row = await cursor.fetchone()
-                count = row[0] if row else 0
-                logging.info(f"ℹ️ Получено количество нарушений: chat={chat_id}, user={user_id}, count={count}")
-                return count
+        """Число нарушений в окне хранения бакетов, без затухания"""
+        count = self.decay.total(await self._get_buckets(chat_id, user_id), time.time())
+        logging.info(f"ℹ️ Получено количество нарушений: chat={chat_id}, user={user_id}, count={count}")
+        return count
 
+    @timed(DB_SECONDS)
     async def reset_violations(self, chat_id: int, user_id: int):
-        async with aiosqlite.connect(self.db_name) as conn:
-            await conn.execute("DELETE FROM violation_counts WHERE chat_id = ? AND user_id = ?", (chat_id, user_id))
-            await conn.execute("DELETE FROM violations WHERE chat_id = ? AND user_id = ?", (chat_id, user_id))
-            await conn.commit()
-            logging.info(f"✅ Нарушения сброшены: chat={chat_id}, user={user_id}")
+        self.counts.set((chat_id, user_id), ())
+        self._enqueue(SQL_DELETE_COUNT, (chat_id, user_id))
+        self._enqueue(SQL_DELETE_VIOLATIONS, (chat_id, user_id))
+        logging.info(f"✅ Нарушения сброшены: chat={chat_id}, user={user_id}")
 
+    @timed(DB_SECONDS)
     async def add_ban(self, chat_id: int, user_id: int, banned_by: int,
                       reason: str, duration: int = 0):
-        async with aiosqlite.connect(self.db_name) as conn:
-            ban_until = None
-            if duration > 0:
-                ban_until = datetime.now() + timedelta(seconds=duration)
-            await conn.execute("""
-                INSERT INTO bans (chat_id, user_id, banned_by, reason, ban_until)
-                VALUES (?, ?, ?, ?, ?)
-            """, (chat_id, user_id, banned_by, reason, ban_until))
-            await conn.commit()
-            logging.info(f"🚫 Бан добавлен: chat={chat_id}, user={user_id}, by={banned_by}, duration={duration}")
+        ban_until = None
+        if duration > 0:
+            ban_until = datetime.now() + timedelta(seconds=duration)
+        timestamp = _timestamp()
+        self._enqueue(SQL_INSERT_BAN, (chat_id, user_id, banned_by, reason, timestamp, ban_until))
+        self.rollup.add_ban(chat_id, timestamp)
+        until = ban_until.timestamp() if ban_until else None
+        self._enqueue(SQL_UPSERT_ACTIVE_BAN, (chat_id, user_id, until))
+        self._bans[(chat_id, user_id)] = until
+        # Бан важнее прочих записей — не ждём таймера
+        self._flush_event.set()
+        logging.info(f"🚫 Бан добавлен: chat={chat_id}, user={user_id}, by={banned_by}, duration={duration}")
+
+    def remove_ban(self, chat_id: int, user_id: int):
+        """Снять действующий бан (разбан администратором)"""
+        self._enqueue(SQL_DELETE_ACTIVE_BAN, (chat_id, user_id))
+        self._bans.pop((chat_id, user_id), None)
+
+    @timed(DB_SECONDS)
+    async def expire_ban(self, chat_id: int, user_id: int) -> int:
+        """Снять бан, срок которого истёк; 0 — бан уже снят админом или продлён новым баном"""
+        await self.flush()
+        async with self._write_lock:
+            cursor = await self.conn.execute(SQL_EXPIRE_ACTIVE_BAN, (chat_id, user_id, time.time()))
+            await self.conn.commit()
+        if cursor.rowcount:
+            self._bans.pop((chat_id, user_id), None)
+        return cursor.rowcount
+
+    def add_job(self, job_id: str, chat_id: int, run_at: float, kind: str, payload: str):
+        self._enqueue(SQL_INSERT_JOB, (job_id, chat_id, run_at, kind, payload))
+
+    def delete_jobs(self, job_ids: list[str]):
+        for job_id in job_ids:
+            self._enqueue(SQL_DELETE_JOB, (job_id,))
+
+    @timed(DB_SECONDS)
+    async def load_jobs(self) -> list[tuple]:
+        """Отложенные задачи, пережившие перезапуск"""
+        await self.flush()
+        async with self.conn.execute("""
+            SELECT id, chat_id, run_at, kind, payload FROM scheduled_jobs ORDER BY run_at
+        """) as cursor:
+            return await cursor.fetchall()
+
+    @timed(DB_SECONDS)
+    async def load_chat_profile(self, chat_id: int) -> tuple[tuple | None, list[tuple]]:
+        """Настройки чата и его поправки к словарю: (max_violations, ban_duration), [(word, allowed)]"""
+        async with self.conn.execute("""
+            SELECT max_violations, ban_duration FROM chat_profiles WHERE chat_id = ?
+        """, (chat_id,)) as cursor:
+            row = await cursor.fetchone()
+        async with self.conn.execute("""
+            SELECT word, allowed FROM chat_words WHERE chat_id = ?
+        """, (chat_id,)) as cursor:
+            words = await cursor.fetchall()
+        return row, words
+
+    def save_chat_profile(self, chat_id: int, max_violations: int, ban_duration: int):
+        self._enqueue(SQL_UPSERT_PROFILE, (chat_id, max_violations, ban_duration))
 
+    def save_chat_word(self, chat_id: int, word: str, allowed: bool):
+        self._enqueue(SQL_UPSERT_CHAT_WORD, (chat_id, word, int(allowed)))
+
+    def delete_chat_word(self, chat_id: int, word: str):
+        self._enqueue(SQL_DELETE_CHAT_WORD, (chat_id, word))
+
+    @timed(DB_SECONDS)
     async def get_violations(self, chat_id: int, user_id: int, limit: int = 10):
         """Получить историю нарушений"""
-        async with aiosqlite.connect(self.db_name) as conn:
-            async with conn.execute("""
+        # Ещё не записанные нарушения берём из очереди: сбрасывать её ради чтения — лишний коммит
+        pending, cleared = [], False
+        for sql, params in self._pending:
+            if params[:2] != (chat_id, user_id):
+                continue
+            if sql == SQL_INSERT_VIOLATION:
+                pending.append((params[4], params[5]))
+            elif sql == SQL_DELETE_VIOLATIONS:
+                pending, cleared = [], True
+        rows = pending[::-1][:limit]
+        if not cleared and len(rows) < limit:
+            async with self.conn.execute("""
                 SELECT violation_text, timestamp
                 FROM violations
                 WHERE chat_id = ? AND user_id = ?
                 ORDER BY timestamp DESC
                 LIMIT ?
-            """, (chat_id, user_id, limit)) as cursor:
-                rows = await cursor.fetchall()
-                logging.info(f"ℹ️ Получена история нарушений: chat={chat_id}, user={user_id}, count={len(rows)}")
-                return rows
+            """, (chat_id, user_id, limit - len(rows))) as cursor:
+                rows += await cursor.fetchall()
+        logging.info(f"ℹ️ Получена история нарушений: chat={chat_id}, user={user_id}, count={len(rows)}")
+        return rows
+
+    @timed(DB_SECONDS)
+    async def get_chat_stats(self, chat_id: int, days: int, top: int) -> ChatStats:
+        """Статистика чата только из сводок: по дням за days дней и топы за всё время"""
+        await self.flush()
+        since = (datetime.now(timezone.utc) - timedelta(days=days - 1)).strftime("%Y-%m-%d")
+        async with self.conn.execute("""
+            SELECT day, violations, bans FROM stats_daily
+            WHERE chat_id = ? AND day >= ?
+            ORDER BY day DESC
+        """, (chat_id, since)) as cursor:
+            daily = await cursor.fetchall()
+        async with self.conn.execute("""
+            SELECT user_id, username, full_name, violations FROM stats_users
+            WHERE chat_id = ?
+            ORDER BY violations DESC
+            LIMIT ?
+        """, (chat_id, top)) as cursor:
+            offenders = await cursor.fetchall()
+        async with self.conn.execute("""
+            SELECT word, hits FROM stats_words
+            WHERE chat_id = ?
+            ORDER BY hits DESC
+            LIMIT ?
+        """, (chat_id, top)) as cursor:
+            words = await cursor.fetchall()
+        logging.info(f"ℹ️ Получена статистика чата: chat={chat_id}, days={len(daily)}")
+        return ChatStats(daily, offenders, words)
 
+    async def iter_violations(self, chat_id: int, chunk: int) -> AsyncIterator[tuple[list[str], list[tuple]]]:
+        """
+        История нарушений чата пачками по chunk строк: (имена колонок, строки).
+        Порядок совпадает с индексом (chat_id, user_id), поэтому SQLite не сортирует всю выборку в памяти
+        """
+        await self.flush()
+        async with self.conn.execute("""
+            SELECT id, user_id, username, full_name, violation_text, timestamp
+            FROM violations
+            WHERE chat_id = ?
+            ORDER BY user_id, id
+        """, (chat_id,)) as cursor:
+            columns = [description[0] for description in cursor.description]
+            while rows := await cursor.fetchmany(chunk):
+                yield columns, rows
+
+    @timed(DB_SECONDS)
     async def is_banned(self, chat_id: int, user_id: int) -> bool:
         """Проверка, есть ли активный бан"""
-        async with aiosqlite.connect(self.db_name) as conn:
-            async with conn.execute("""
-                SELECT ban_until FROM bans
-                WHERE chat_id = ? AND user_id = ?
-                ORDER BY banned_at DESC LIMIT 1
-            """, (chat_id, user_id)) as cursor:
-                row = await cursor.fetchone()
-                if not row:
-                    return False
-                if row[0] is None:
-                    logging.info(f"🚫 Пользователь {user_id} забанен навсегда")
-                    return True
-                active = datetime.now() < datetime.fromisoformat(row[0])
-                logging.info(f"🚫 Проверка бана: user={user_id}, active={active}")
-                return active
+        key = (chat_id, user_id)
+        if key not in self._bans:
+            return False
+        ban_until = self._bans[key]
+        if ban_until is None:
+            logging.info(f"🚫 Пользователь {user_id} забанен навсегда")
+            return True
+        active = time.time() < ban_until
+        logging.info(f"🚫 Проверка бана: user={user_id}, active={active}")
+        return active
 
+    # ==================== MAINTENANCE ====================
 
-db = AsyncDatabase()
+    @timed(DB_SECONDS)
+    async def fetch_older_than(self, table: str, column: str, cutoff: str,
+                               limit: int) -> tuple[list[str], list[tuple]]:
+        """
+        Самые старые строки таблицы, у которых column < cutoff: (имена колонок, строки).
+        Очередь не сбрасываем: в ней только свежие строки, они моложе любого cutoff
+        """
+        async with self.conn.execute(
+            f"SELECT * FROM {table} WHERE {column} < ? ORDER BY id LIMIT ?", (cutoff, limit)
+        ) as cursor:
+            columns = [description[0] for description in cursor.description]
+            return columns, await cursor.fetchall()
 
+    @timed(DB_SECONDS)
+    async def delete_ids(self, table: str, ids: list[int]):
+        async with self._write_lock:
+            await self.conn.executemany(f"DELETE FROM {table} WHERE id = ?", [(row_id,) for row_id in ids])
+            await self.conn.commit()
+
+    @timed(DB_SECONDS)
+    async def prune_active_bans(self) -> int:
+        """Удалить истёкшие баны, для которых не сработала задача ban_expired"""
+        await self.flush()
+        now = time.time()
+        async with self._write_lock:
+            cursor = await self.conn.execute(
+                "DELETE FROM active_bans WHERE ban_until IS NOT NULL AND ban_until <= ?", (now,)
+            )
+            await self.conn.commit()
+        self._bans = {key: until for key, until in self._bans.items() if until is None or until > now}
+        return cursor.rowcount
+
+    async def enable_incremental_vacuum(self) -> bool:
+        """
+        Перевести существующую базу в режим incremental auto_vacuum, без которого compact()
+        не возвращает свободные страницы. Это полный VACUUM под блокировкой записи, поэтому
+        он выполняется только по настройке и один раз до запуска воркеров. False — уже переведена
+        """
+        async with self.conn.execute("PRAGMA auto_vacuum") as cursor:
+            if (await cursor.fetchone())[0] == 2:
+                return False
+        await self.flush()
+        async with self._write_lock:
+            await self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+            await self.conn.execute("VACUUM")
+        logging.info("🧽 База переведена в режим incremental auto_vacuum")
+        return True
+
+    @timed(DB_SECONDS)
+    async def compact(self, pages: int) -> tuple[int, int]:
+        """
+        Шаг обслуживания в простое: вернуть до pages свободных страниц
+        и перенести WAL в основной файл. Возвращает (свободных страниц осталось, страниц WAL)
+        """
+        async with self._write_lock:
+            # Через execute() модуль sqlite3 освобождает лишь одну страницу, executescript — все pages
+            await self.conn.executescript(f"PRAGMA incremental_vacuum({pages});")
+            async with self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)") as cursor:
+                _, wal_pages, _ = await cursor.fetchone()
+            async with self.conn.execute("PRAGMA freelist_count") as cursor:
+                free_pages = (await cursor.fetchone())[0]
+        return free_pages, wal_pages
+
+db = AsyncDatabase()
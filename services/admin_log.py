@@ -0,0 +1,126 @@
+import asyncio
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+
+MESSAGE_LIMIT = 4096
+SEPARATOR = "\n\n"
+
+
+class AdminLogDispatcher:
+    """
+    Фоновая отправка логов в админ-канал.
+    Обработчики только кладут событие в очередь, а события за flush_interval
+    склеиваются в дайджесты не длиннее лимита сообщения Telegram.
+    Повторы после 429 делает OutboundScheduler сессии бота, здесь дайджест отправляется один раз
+    """
+
+    def __init__(self, chat_id: int, queue_size: int = 1000,
+                 flush_interval: float = 3.0, min_interval: float = 3.0):
+        self.chat_id = chat_id
+        self.flush_interval = flush_interval
+        # Telegram пропускает около 20 сообщений в минуту в одну группу
+        self.min_interval = min_interval
+        self.dropped = 0
+        self.dropped_total = 0
+        self._queue: asyncio.Queue[str] = asyncio.Queue(maxsize=queue_size)
+        self._wakeup = asyncio.Event()
+        self._stopping = asyncio.Event()
+        self._next_send_at = 0.0
+        self._bot: Bot | None = None
+        self._task: asyncio.Task | None = None
+
+    @property
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def start(self, bot: Bot):
+        self._bot = bot
+        self._stopping.clear()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Отправить всё накопленное и остановиться"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    def log(self, text: str):
+        try:
+            self._queue.put_nowait(text)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            self.dropped_total += 1
+            return
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            await self._wakeup.wait()
+            if not self._stopping.is_set():
+                # Даём событиям накопиться, чтобы отправить их одним сообщением
+                try:
+                    await asyncio.wait_for(self._stopping.wait(), timeout=self.flush_interval)
+                except asyncio.TimeoutError:
+                    pass
+            self._wakeup.clear()
+            await self._flush()
+            if self._stopping.is_set():
+                return
+
+    async def _flush(self):
+        entries = []
+        while not self._queue.empty():
+            entries.append(self._queue.get_nowait())
+        if self.dropped:
+            entries.append(f"⚠️ Пропущено событий из-за переполнения очереди: {self.dropped}")
+            self.dropped = 0
+        for digest in build_digests(entries):
+            await self._send(digest)
+        if entries:
+            logging.info(f"✅ Лог отправлен в админ-канал: событий={len(entries)}")
+
+    async def _send(self, text: str):
+        delay = self._next_send_at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self._next_send_at = time.monotonic() + self.min_interval
+        for parse_mode in ("HTML", None):
+            try:
+                await self._bot.send_message(self.chat_id, text, parse_mode=parse_mode)
+                return
+            except TelegramRetryAfter as e:
+                # Планировщик исходящих уже исчерпал свои повторы: следующий дайджест ждёт retry_after
+                self._next_send_at = time.monotonic() + e.retry_after
+                logging.error(f"❌ Лог не отправлен: лимит Telegram для админ-канала, ждём {e.retry_after} с")
+                return
+            except TelegramBadRequest as e:
+                if parse_mode is None:
+                    logging.error(f"❌ Ошибка при отправке лога: {e}")
+                    return
+                # Обрезанный дайджест мог сломать разметку — отправляем как обычный текст
+            except Exception as e:
+                logging.error(f"❌ Ошибка при отправке лога: {e}")
+                return
+
+
+def build_digests(entries: list[str], limit: int = MESSAGE_LIMIT) -> list[str]:
+    """Склеить события в сообщения не длиннее limit символов"""
+    digests = []
+    current = ""
+    for entry in entries:
+        if len(entry) > limit:
+            entry = entry[:limit - 1] + "…"
+        if current and len(current) + len(SEPARATOR) + len(entry) > limit:
+            digests.append(current)
+            current = ""
+        current = f"{current}{SEPARATOR}{entry}" if current else entry
+    if current:
+        digests.append(current)
+    return digests
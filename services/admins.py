@@ -0,0 +1,113 @@
+import asyncio
+import logging
+import time
+from typing import NamedTuple
+
+from aiogram import Bot
+from aiogram.types import ChatMember
+
+ADMIN_STATUSES = ("creator", "administrator")
+
+
+class AdminRoster:
+    """
+    Кэш администраторов по чатам: список грузится одним get_chat_administrators,
+    живёт ttl секунд и сразу обновляется по событиям chat_member
+    """
+
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._admins: dict[int, set[int]] = {}
+        self._loaded_at: dict[int, float] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._admins)
+
+    def _is_fresh(self, chat_id: int) -> bool:
+        loaded_at = self._loaded_at.get(chat_id)
+        return loaded_at is not None and time.monotonic() - loaded_at < self.ttl
+
+    async def get(self, bot: Bot, chat_id: int) -> set[int]:
+        if self._is_fresh(chat_id):
+            self.hits += 1
+            return self._admins[chat_id]
+        # Один запрос к API на чат, даже если проверку ждут десятки сообщений
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            if not self._is_fresh(chat_id):
+                self.misses += 1
+                members = await bot.get_chat_administrators(chat_id)
+                self._admins[chat_id] = {member.user.id for member in members}
+                self._loaded_at[chat_id] = time.monotonic()
+                logging.info(f"👮 Загружен список админов: chat={chat_id}, admins={len(members)}")
+        return self._admins[chat_id]
+
+    async def is_admin(self, bot: Bot, chat_id: int, user_id: int) -> bool:
+        return user_id in await self.get(bot, chat_id)
+
+    def update(self, chat_id: int, user_id: int, status: str):
+        """Применить изменение статуса участника; незагруженные чаты не трогаем"""
+        admins = self._admins.get(chat_id)
+        if admins is None:
+            return
+        if status in ADMIN_STATUSES:
+            admins.add(user_id)
+        else:
+            admins.discard(user_id)
+
+    def invalidate(self, chat_id: int):
+        self._admins.pop(chat_id, None)
+        self._loaded_at.pop(chat_id, None)
+
+
+class BotRights(NamedTuple):
+    can_restrict_members: bool
+    can_delete_messages: bool
+
+
+def rights_from_member(member: ChatMember) -> BotRights:
+    if member.status == "creator":
+        return BotRights(True, True)
+    return BotRights(
+        bool(getattr(member, "can_restrict_members", False)),
+        bool(getattr(member, "can_delete_messages", False)),
+    )
+
+
+class BotPermissions:
+    """
+    Права самого бота по чатам: запрашиваются при первом обращении,
+    дальше обновляются только событиями my_chat_member
+    """
+
+    def __init__(self):
+        self._rights: dict[int, BotRights] = {}
+        self._locks: dict[int, asyncio.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._rights)
+
+    async def get(self, bot: Bot, chat_id: int) -> BotRights:
+        rights = self._rights.get(chat_id)
+        if rights is not None:
+            self.hits += 1
+            return rights
+        lock = self._locks.setdefault(chat_id, asyncio.Lock())
+        async with lock:
+            if chat_id not in self._rights:
+                self.misses += 1
+                member = await bot.get_chat_member(chat_id, bot.id)
+                self._rights[chat_id] = rights_from_member(member)
+                logging.info(f"🔎 Загружены права бота: chat={chat_id}, {self._rights[chat_id]}")
+        return self._rights[chat_id]
+
+    def update(self, chat_id: int, member: ChatMember):
+        self._rights[chat_id] = rights_from_member(member)
+
+    def invalidate(self, chat_id: int):
+        self._rights.pop(chat_id, None)
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import os
+from typing import NamedTuple
+
+from config.settings import load_bad_words
+from services.matcher import WordMatcher, source_hash
+
+
+class DictionaryState(NamedTuple):
+    words: frozenset[str]
+    digest: bytes
+    matcher: WordMatcher
+
+
+def compile_words(words: frozenset[str], cache_path: str | None) -> DictionaryState:
+    """Автомат из кэш-файла, если он собран из того же словаря, иначе сборка и запись кэша"""
+    digest = source_hash(words)
+    matcher = WordMatcher.load(cache_path, digest) if cache_path else None
+    if matcher is None:
+        matcher = WordMatcher(words)
+        if cache_path:
+            try:
+                matcher.save(cache_path, digest)
+            except OSError as e:
+                logging.warning(f"Не удалось сохранить кэш словаря {cache_path}: {e}")
+    return DictionaryState(words, digest, matcher)
+
+
+class BadWordDictionary:
+    """
+    Словарь запрещённых слов с горячей перезагрузкой: файл перечитывается
+    при изменении или по команде, новый автомат подменяет старый одним присваиванием
+    """
+
+    def __init__(self, path: str, cache_path: str | None = None):
+        self.path = path
+        self.cache_path = cache_path
+        self._state: DictionaryState | None = None
+        self._stat: tuple[float, int] | None = None
+        self._reload_lock = asyncio.Lock()
+
+    def __len__(self) -> int:
+        return len(self.state.words)
+
+    @property
+    def state(self) -> DictionaryState:
+        # Без явной загрузки при старте словарь подгружается при первом обращении
+        if self._state is None:
+            self.load()
+        return self._state
+
+    @property
+    def matcher(self) -> WordMatcher:
+        return self.state.matcher
+
+    def _file_stat(self) -> tuple[float, int]:
+        stat = os.stat(self.path)
+        return stat.st_mtime, stat.st_size
+
+    def _prepare(self) -> tuple[tuple[float, int], DictionaryState | None]:
+        stat = self._file_stat()
+        words = frozenset(load_bad_words(self.path))
+        if self._state is not None and words == self._state.words:
+            return stat, None
+        return stat, compile_words(words, self.cache_path)
+
+    def _apply(self, stat: tuple[float, int], state: DictionaryState | None) -> bool:
+        self._stat = stat
+        if state is None:
+            return False
+        self._state = state
+        logging.info(f"📖 Словарь загружен: {self.path}, слов={len(state.words)}")
+        return True
+
+    def load(self) -> bool:
+        """Синхронная загрузка — при старте, уже после настройки логов"""
+        return self._apply(*self._prepare())
+
+    async def reload(self) -> bool:
+        """Перечитать файл; True, если словарь изменился. Сборка идёт в отдельном потоке"""
+        async with self._reload_lock:
+            return self._apply(*await asyncio.to_thread(self._prepare))
+
+    async def watch(self, interval: float):
+        """Проверять файл каждые interval секунд и перезагружать при изменении"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if self._file_stat() != self._stat:
+                    await self.reload()
+            except Exception as e:
+                logging.error(f"Ошибка перезагрузки словаря: {e}")
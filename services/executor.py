@@ -0,0 +1,121 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Hashable
+
+from aiogram import BaseMiddleware, Router
+from aiogram.dispatcher.middlewares.error import ErrorsMiddleware
+from aiogram.types import Update
+
+Handler = Callable[[Update, dict[str, Any]], Awaitable[Any]]
+
+
+class UpdateExecutor(BaseMiddleware):
+    """
+    Исполнитель апдейтов (outer middleware на dp.update).
+    Апдейты одного пользователя в одном чате обрабатываются строго по очереди,
+    всего одновременно — не больше concurrency обработчиков, из них не больше
+    chat_concurrency на один чат, а при max_pending необработанных апдейтов
+    приём новых (поллинг или воркер вебхука) приостанавливается.
+    Исключения обработчиков уходят в наблюдатель errors роутера (диспетчера):
+    его собственный ErrorsMiddleware к этому моменту уже вернул управление
+    """
+
+    def __init__(self, concurrency: int, max_pending: int, chat_concurrency: int | None = None,
+                 router: Router | None = None):
+        self.concurrency = concurrency
+        self.max_pending = max_pending
+        self.chat_concurrency = chat_concurrency or concurrency
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._errors = ErrorsMiddleware(router) if router is not None else None
+        # chat_id -> [семафор чата, число дорожек этого чата]
+        self._chats: dict[int, list] = {}
+        self._lanes: dict[Hashable, deque[tuple[Handler, Update, dict[str, Any]]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+        self._pending = 0
+        self._capacity = asyncio.Event()
+        self._capacity.set()
+        self._idle = asyncio.Event()
+        self._idle.set()
+
+    @property
+    def depth(self) -> int:
+        return self._pending
+
+    async def __call__(self, handler: Handler, event: Update, data: dict[str, Any]) -> Any:
+        # Обратное давление: пока очередь глубокая, следующий апдейт не принимаем
+        while self._pending >= self.max_pending:
+            self._capacity.clear()
+            await self._capacity.wait()
+
+        chat = data.get("event_chat")
+        user = data.get("event_from_user")
+        key = (chat.id if chat else None, user.id if user else None)
+        if key == (None, None):
+            key = event.update_id
+
+        self._pending += 1
+        self._idle.clear()
+        lane = self._lanes.get(key)
+        if lane is not None:
+            lane.append((handler, event, data))
+            return None
+        self._lanes[key] = deque([(handler, event, data)])
+        task = asyncio.create_task(self._drain(key))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return None
+
+    def _chat_slot(self, key: Hashable) -> asyncio.Semaphore | None:
+        if not isinstance(key, tuple) or key[0] is None:
+            return None
+        slot = self._chats.get(key[0])
+        if slot is None:
+            slot = self._chats[key[0]] = [asyncio.Semaphore(self.chat_concurrency), 0]
+        slot[1] += 1
+        return slot[0]
+
+    def _release_chat_slot(self, key: Hashable):
+        slot = self._chats.get(key[0]) if isinstance(key, tuple) else None
+        if slot is not None:
+            slot[1] -= 1
+            if not slot[1]:
+                del self._chats[key[0]]
+
+    async def _run(self, chat_slot: asyncio.Semaphore | None, handler: Handler, event: Update,
+                   data: dict[str, Any]):
+        # Сначала место в чате, потом общее: ожидая очереди своего чата, дорожка не занимает
+        # общий слот, и рейд в одном чате не останавливает модерацию остальных
+        if chat_slot is not None:
+            await chat_slot.acquire()
+        try:
+            async with self._semaphore:
+                try:
+                    if self._errors is not None:
+                        await self._errors(handler, event, data)
+                    else:
+                        await handler(event, data)
+                except Exception:
+                    logging.exception(f"Ошибка обработки апдейта {event.update_id}")
+        finally:
+            if chat_slot is not None:
+                chat_slot.release()
+
+    async def _drain(self, key: Hashable):
+        lane = self._lanes[key]
+        chat_slot = self._chat_slot(key)
+        while lane:
+            handler, event, data = lane.popleft()
+            await self._run(chat_slot, handler, event, data)
+            self._pending -= 1
+            # Возобновляем приём, когда очередь разгрузилась хотя бы наполовину
+            if self._pending <= self.max_pending // 2:
+                self._capacity.set()
+        del self._lanes[key]
+        self._release_chat_slot(key)
+        if not self._pending:
+            self._idle.set()
+
+    async def join(self):
+        """Дождаться обработки всех принятых апдейтов"""
+        await self._idle.wait()
@@ -0,0 +1,106 @@
+import asyncio
+import heapq
+import json
+import logging
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from aiogram import Bot
+
+JobHandler = Callable[..., Awaitable[None]]
+
+
+class JobScheduler:
+    """
+    Отложенные задачи (удаление предупреждений, истечение банов).
+    В памяти — куча по времени запуска, копия каждой задачи лежит в таблице
+    scheduled_jobs, поэтому после перезапуска бота задачи не теряются
+    """
+
+    def __init__(self, db, batch_size: int = 100):
+        self.db = db
+        self.batch_size = batch_size
+        self._handlers: dict[str, JobHandler] = {}
+        self._heap: list[tuple[float, str, str, int, dict]] = []
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        self._task: asyncio.Task | None = None
+        self._bot: Bot | None = None
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def handler(self, kind: str):
+        """Регистрация обработчика задач: async def handler(bot, chat_id, **payload)"""
+        def decorator(func: JobHandler) -> JobHandler:
+            self._handlers[kind] = func
+            return func
+        return decorator
+
+    def schedule(self, kind: str, delay: float, chat_id: int, **payload):
+        run_at = time.time() + delay
+        job_id = uuid.uuid4().hex
+        self._push(run_at, job_id, kind, chat_id, payload)
+        self.db.add_job(job_id, chat_id, run_at, kind, json.dumps(payload))
+
+    def _push(self, run_at: float, job_id: str, kind: str, chat_id: int, payload: dict):
+        is_earliest = not self._heap or run_at < self._heap[0][0]
+        heapq.heappush(self._heap, (run_at, job_id, kind, chat_id, payload))
+        if is_earliest:
+            self._wakeup.set()
+
+    async def start(self, bot: Bot, shard: tuple[int, int] | None = None):
+        """shard=(index, count) — загрузить только задачи чатов этого воркера"""
+        self._bot = bot
+        self._stopping = False
+        for job_id, chat_id, run_at, kind, payload in await self.db.load_jobs():
+            if shard is not None and chat_id % shard[1] != shard[0]:
+                continue
+            self._push(run_at, job_id, kind, chat_id, json.loads(payload))
+        logging.info(f"⏰ Планировщик запущен, задач в очереди: {len(self._heap)}")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дождаться текущей пачки и остановиться; невыполненные задачи остаются в БД"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping:
+            self._wakeup.clear()
+            now = time.time()
+            if self._heap and self._heap[0][0] <= now:
+                await self._run_due(now)
+                continue
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _run_due(self, now: float):
+        batch = []
+        while self._heap and self._heap[0][0] <= now and len(batch) < self.batch_size:
+            batch.append(heapq.heappop(self._heap))
+        results = await asyncio.gather(
+            *(self._execute(kind, chat_id, payload) for _, _, kind, chat_id, payload in batch),
+            return_exceptions=True,
+        )
+        for (_, job_id, kind, _, _), result in zip(batch, results):
+            if isinstance(result, Exception):
+                logging.warning(f"Задача {kind} ({job_id}) завершилась ошибкой: {result}")
+        # Неудачные задачи тоже удаляем: повтор удаления или бана ничего не исправит
+        self.db.delete_jobs([job_id for _, job_id, _, _, _ in batch])
+
+    async def _execute(self, kind: str, chat_id: int, payload: dict):
+        handler = self._handlers.get(kind)
+        if handler is None:
+            raise LookupError(f"нет обработчика для задачи {kind}")
+        await handler(self._bot, chat_id, **payload)
@@ -0,0 +1,161 @@
+import atexit
+import copy
+import json
+import logging
+import queue
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+TEXT_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+
+
+class JsonFormatter(logging.Formatter):
+    """Одна запись — одна строка JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "module": record.module,
+            "func": record.funcName,
+            "msg": record.getMessage(),
+        }
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class TextFormatter(logging.Formatter):
+    def __init__(self):
+        super().__init__(TEXT_FORMAT)
+
+    def format(self, record: logging.LogRecord) -> str:
+        text = super().format(record)
+        suppressed = getattr(record, "suppressed", 0)
+        return f"{text} [пропущено похожих: {suppressed}]" if suppressed else text
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Прореживание частых событий до постановки в очередь.
+    Категория — «модуль.функция» или «модуль» (из record.module и record.funcName),
+    для неё задаётся (каждая N-я запись, не больше M записей в секунду).
+    Предупреждения и ошибки проходят всегда; число отброшенных записей
+    приписывается к следующей выведенной записи той же категории
+    """
+
+    def __init__(self, rules: dict[str, tuple[int, float]]):
+        super().__init__()
+        self.rules = rules
+        # категория -> [счётчик для выборки, токены, время пополнения, отброшено]
+        self._state: dict[str, list] = {}
+
+    def _rule(self, record: logging.LogRecord) -> tuple[str, tuple[int, float]] | None:
+        category = f"{record.module}.{record.funcName}"
+        rule = self.rules.get(category)
+        if rule is not None:
+            return category, rule
+        rule = self.rules.get(record.module)
+        if rule is not None:
+            return record.module, rule
+        return None
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        found = self._rule(record)
+        if found is None:
+            return True
+        category, (every, per_second) = found
+        state = self._state.get(category)
+        now = time.monotonic()
+        if state is None:
+            state = self._state[category] = [0, per_second, now, 0]
+        state[0] += 1
+        if every > 1 and state[0] % every != 1:
+            state[3] += 1
+            return False
+        state[1] = min(per_second, state[1] + (now - state[2]) * per_second)
+        state[2] = now
+        if state[1] < 1:
+            state[3] += 1
+            return False
+        state[1] -= 1
+        if state[3]:
+            record.suppressed, state[3] = state[3], 0
+        return True
+
+
+class BoundedQueueHandler(QueueHandler):
+    """При переполненной очереди запись отбрасывается, а не блокирует цикл событий"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # В отличие от QueueHandler.prepare, трейсбек не вклеивается в текст, а остаётся отдельным полем
+        record = copy.copy(record)
+        record.msg = record.message = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def setup_logging(level: str = "INFO", json_output: bool = True, queue_size: int = 10_000,
+                  sampling: dict[str, tuple[int, float]] | None = None) -> QueueListener:
+    """
+    Корневой логгер пишет только в очередь; форматирование и вывод
+    выполняет фоновый поток QueueListener
+    """
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(JsonFormatter() if json_output else TextFormatter())
+
+    handler = BoundedQueueHandler(queue.Queue(maxsize=queue_size))
+    if sampling:
+        handler.addFilter(SamplingFilter(sampling))
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(handler)
+    root.setLevel(level)
+
+    listener = QueueListener(handler.queue, output, respect_handler_level=True)
+    listener.start()
+    # Дописать очередь при выходе из процесса
+    atexit.register(listener.stop)
+    return listener
+
+
+def set_level(level: str) -> bool:
+    """Сменить уровень корневого логгера на лету; False — неизвестный уровень"""
+    level = level.upper()
+    # Для известного имени getLevelName возвращает число, для неизвестного — строку «Level …»
+    if not isinstance(logging.getLevelName(level), int):
+        return False
+    logging.getLogger().setLevel(level)
+    return True
+
+
+def queue_handler() -> BoundedQueueHandler | None:
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, BoundedQueueHandler):
+            return handler
+    return None
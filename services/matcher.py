@@ -0,0 +1,211 @@
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+from array import array
+from typing import Iterable, Iterator, NamedTuple
+
+from services.normalizer import HOMOGLYPHS, SEPARATORS, normalize
+
+# Формат файла скомпилированного автомата: заголовок + массивы uint32 + слова в UTF-8
+CACHE_MAGIC = b"BWMA"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sI32s6I")
+
+
+class WordMatch(NamedTuple):
+    word: str
+    start: int
+    end: int
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == "_"
+
+
+def _is_boundary(text: str, pos: int) -> bool:
+    """Аналог \\b из re: граница между словесным и несловесным символом"""
+    left = pos > 0 and _is_word_char(text[pos - 1])
+    right = pos < len(text) and _is_word_char(text[pos])
+    return left != right
+
+
+def source_hash(words: Iterable[str]) -> bytes:
+    """Хэш словаря вместе с правилами нормализации: от них зависит автомат"""
+    digest = hashlib.sha256()
+    digest.update(f"{CACHE_VERSION}|{sorted(HOMOGLYPHS.items())}|{sorted(SEPARATORS)}".encode())
+    for word in sorted(words):
+        digest.update(word.encode("utf-8") + b"\n")
+    return digest.digest()
+
+
+class WordMatcher:
+    """
+    Автомат Ахо-Корасик: поиск всех запрещённых слов за один проход по тексту.
+    Слова словаря и входной текст проходят одну и ту же нормализацию,
+    поэтому обфусцированные варианты не нужно добавлять в словарь
+    """
+
+    def __init__(self, words: Iterable[str]):
+        self._goto: list[dict[str, int]] = [{}]
+        self._fail: list[int] = [0]
+        self._out: list[tuple[int, ...]] = [()]
+        self._words: list[str] = []
+        self._lengths: list[int] = []
+
+        seen = set()
+        for word in words:
+            word = word.strip().lower()
+            pattern = normalize(word).text
+            if pattern and pattern not in seen:
+                seen.add(pattern)
+                self._add_word(word, pattern)
+        self._build_links()
+
+    def __len__(self) -> int:
+        return len(self._words)
+
+    def _add_word(self, word: str, pattern: str):
+        state = 0
+        for ch in pattern:
+            next_state = self._goto[state].get(ch)
+            if next_state is None:
+                next_state = len(self._goto)
+                self._goto[state][ch] = next_state
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+            state = next_state
+        self._out[state] += (len(self._words),)
+        self._words.append(word)
+        self._lengths.append(len(pattern))
+
+    def _build_links(self):
+        """Суффиксные ссылки строятся обходом в ширину, выходы наследуются по ним"""
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, child in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[child] = self._goto[fallback].get(ch, 0)
+                self._out[child] += self._out[self._fail[child]]
+                queue.append(child)
+
+    def finditer(self, text: str) -> Iterator[WordMatch]:
+        """
+        Все вхождения слов целиком (с границами слова), в порядке конца вхождения.
+        Смещения указывают на исходный текст, а не на нормализованный
+        """
+        normalized = normalize(text)
+        folded = normalized.text
+
+        goto, fail, out, lengths = self._goto, self._fail, self._out, self._lengths
+        state = 0
+        for pos, ch in enumerate(folded):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if not out[state]:
+                continue
+            end = pos + 1
+            for index in out[state]:
+                start = end - lengths[index]
+                if _is_boundary(folded, start) and _is_boundary(folded, end):
+                    yield WordMatch(self._words[index], *normalized.span(start, end))
+
+    def find_all(self, text: str) -> list[WordMatch]:
+        return list(self.finditer(text))
+
+    def search(self, text: str) -> WordMatch | None:
+        return next(self.finditer(text), None)
+
+    # ==================== CACHE FILE ====================
+
+    def save(self, path: str, digest: bytes):
+        """Записать автомат в файл (атомарно, через временный файл)"""
+        edge_start, edge_char, edge_target = array("I", [0]), array("I"), array("I")
+        for transitions in self._goto:
+            for ch, target in transitions.items():
+                edge_char.append(ord(ch))
+                edge_target.append(target)
+            edge_start.append(len(edge_char))
+        out_start, out_words = array("I", [0]), array("I")
+        for outputs in self._out:
+            out_words.extend(outputs)
+            out_start.append(len(out_words))
+        words_blob = "\n".join(self._words).encode("utf-8")
+
+        header = CACHE_HEADER.pack(
+            CACHE_MAGIC, CACHE_VERSION, digest,
+            len(self._goto), len(edge_char), len(self._words), len(out_words), len(words_blob), 0,
+        )
+        directory = os.path.dirname(path) or "."
+        os.makedirs(directory, exist_ok=True)
+        # Своё имя временного файла у каждого процесса: воркеры вебхука не пишут в один файл
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(header)
+                for block in (edge_start, edge_char, edge_target, array("I", self._fail),
+                              out_start, out_words, array("I", self._lengths)):
+                    f.write(block.tobytes())
+                f.write(words_blob)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    @classmethod
+    def load(cls, path: str, digest: bytes) -> "WordMatcher | None":
+        """
+        Прочитать автомат из файла через mmap без повторной компиляции словаря.
+        None — файла нет, он другой версии, собран из другого словаря или повреждён
+        """
+        try:
+            with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                return cls._from_buffer(mm, digest)
+        except (OSError, ValueError, IndexError, struct.error):
+            return None
+
+    @classmethod
+    def _from_buffer(cls, buffer: mmap.mmap, digest: bytes) -> "WordMatcher | None":
+        if len(buffer) < CACHE_HEADER.size:
+            return None
+        magic, version, file_digest, states, edges, words, outs, blob, _ = CACHE_HEADER.unpack_from(buffer)
+        if magic != CACHE_MAGIC or version != CACHE_VERSION or file_digest != digest:
+            return None
+        # Обрезанный или дописанный файл не совпадёт по размеру с заголовком
+        integers = 3 * states + 2 + 2 * edges + outs + words
+        if not states or len(buffer) != CACHE_HEADER.size + integers * 4 + blob:
+            return None
+        offset = CACHE_HEADER.size
+
+        def take(count: int) -> list[int]:
+            # Срез mmap — копия в bytes, так что на закрытии файла не остаётся ссылок на буфер
+            nonlocal offset
+            values = array("I")
+            values.frombytes(buffer[offset:offset + count * 4])
+            offset += count * 4
+            return values.tolist()
+
+        edge_start, edge_char, edge_target = take(states + 1), take(edges), take(edges)
+        fail, out_start, out_words, lengths = take(states), take(states + 1), take(outs), take(words)
+        word_list = buffer[offset:offset + blob].decode("utf-8").split("\n") if words else []
+        # Смещения и ссылки на состояния и слова должны оставаться в пределах своих таблиц
+        if (edge_start[0] != 0 or edge_start[-1] != edges or out_start[0] != 0 or out_start[-1] != outs
+                or max(edge_target, default=0) >= states or max(fail) >= states
+                or max(out_words, default=0) >= words or len(word_list) != words):
+            return None
+
+        matcher = cls.__new__(cls)
+        matcher._goto = [
+            {chr(edge_char[i]): edge_target[i] for i in range(edge_start[state], edge_start[state + 1])}
+            for state in range(states)
+        ]
+        matcher._fail = fail
+        matcher._out = [tuple(out_words[out_start[state]:out_start[state + 1]]) for state in range(states)]
+        matcher._words = word_list
+        matcher._lengths = lengths
+        return matcher
@@ -0,0 +1,235 @@
+import functools
+import logging
+import time
+from bisect import bisect_left
+from typing import Any, Awaitable, Callable
+
+from aiogram import BaseMiddleware, Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.methods import TelegramMethod
+from aiogram.methods.base import TelegramType
+from aiohttp import web
+
+# Границы бакетов гистограмм в секундах: от полумиллисекунды (поиск слов) до секунд (Bot API)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Labels, values: Labels, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1):
+        self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for values, value in self._values.items():
+            lines.append(f"{self.name}{_format_labels(self.labels, values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram:
+    """
+    Гистограмма в формате Prometheus. observe() — поиск бакета бисекцией и пара сложений,
+    накопленные суммы по бакетам считаются только при выдаче метрик
+    """
+
+    def __init__(self, name: str, help: str, labels: Labels = (), buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label_values -> [счётчики по бакетам (последний — +Inf), сумма, количество]
+        self._series: dict[Labels, list] = {}
+
+    def observe(self, value: float, *label_values: str):
+        series = self._series.get(label_values)
+        if series is None:
+            series = self._series[label_values] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for values, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labels, values, f'le="{_format_value(bound)}"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labels, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+class CallbackMetric:
+    """
+    Значение читается из объекта в момент запроса /metrics — глубины очередей,
+    счётчики кэшей: на горячем пути ничего не считается.
+    func возвращает число или {значения меток: число}
+    """
+
+    def __init__(self, name: str, help: str, kind: str, func: Callable[[], Any], labels: Labels = ()):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.func = func
+        self.labels = labels
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        values = self.func()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            lines.append(f"{self.name}{_format_labels(self.labels, label_values)} {_format_value(value)}")
+        return lines
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: dict[str, Counter | Histogram | CallbackMetric] = {}
+
+    def _register(self, metric):
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labels: Labels = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Labels = (), buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def gauge(self, name: str, help: str, func: Callable[[], Any], labels: Labels = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, "gauge", func, labels))
+
+    def counter_func(self, name: str, help: str, func: Callable[[], Any], labels: Labels = ()) -> CallbackMetric:
+        return self._register(CallbackMetric(name, help, "counter", func, labels))
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics.values():
+            try:
+                lines.extend(metric.render())
+            except Exception as e:
+                logging.warning(f"📈 Не удалось собрать метрику {metric.name}: {e}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+HANDLER_SECONDS = registry.histogram(
+    "bot_handler_seconds", "Время работы обработчика апдейта", ("handler",)
+)
+HANDLER_ERRORS = registry.counter(
+    "bot_handler_errors_total", "Исключения в обработчиках", ("handler", "error")
+)
+MATCHER_SECONDS = registry.histogram(
+    "bot_matcher_scan_seconds", "Время поиска запрещённых слов в одном сообщении"
+)
+SPAM_DETECTED = registry.counter(
+    "bot_spam_detected_total", "Сообщения, признанные флудом или повтором", ("kind",)
+)
+DB_SECONDS = registry.histogram(
+    "bot_db_seconds", "Время выполнения методов AsyncDatabase", ("method",)
+)
+API_SECONDS = registry.histogram(
+    "bot_api_request_seconds", "Время запроса к Bot API (каждая попытка отдельно)", ("method",)
+)
+API_ERRORS = registry.counter(
+    "bot_api_errors_total", "Ошибки запросов к Bot API", ("method", "error")
+)
+
+
+def timed(histogram: Histogram):
+    """Декоратор корутины: время вызова попадает в histogram с меткой — именем функции"""
+    def decorator(func):
+        label = func.__name__
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - started, label)
+        return wrapper
+    return decorator
+
+
+class HandlerMetrics(BaseMiddleware):
+    """Inner middleware: время и ошибки каждого обработчика по имени его функции"""
+
+    async def __call__(self, handler: Callable[[Any, dict[str, Any]], Awaitable[Any]], event: Any,
+                       data: dict[str, Any]) -> Any:
+        handler_object = data.get("handler")
+        name = handler_object.callback.__name__ if handler_object is not None else "unknown"
+        started = time.perf_counter()
+        try:
+            return await handler(event, data)
+        except Exception as e:
+            HANDLER_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            HANDLER_SECONDS.observe(time.perf_counter() - started, name)
+
+
+class ApiMetrics(BaseRequestMiddleware):
+    """Middleware сессии бота: число, время и ошибки запросов к Bot API по методам"""
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        name = type(method).__name__
+        started = time.perf_counter()
+        try:
+            return await make_request(bot, method)
+        except Exception as e:
+            API_ERRORS.inc(name, type(e).__name__)
+            raise
+        finally:
+            API_SECONDS.observe(time.perf_counter() - started, name)
+
+
+async def serve_metrics(host: str, port: int, metrics: MetricsRegistry = registry) -> web.AppRunner:
+    """HTTP-сервер с единственным GET /metrics в текстовом формате Prometheus"""
+    async def handle(request: web.Request) -> web.Response:
+        return web.Response(body=metrics.render().encode("utf-8"), headers={"Content-Type": CONTENT_TYPE})
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logging.info(f"📈 Метрики доступны на http://{host}:{port}/metrics")
+    return runner
@@ -0,0 +1,91 @@
+from typing import NamedTuple
+
+# Похожие по начертанию латинские буквы, цифры и символы → кириллица
+HOMOGLYPHS = {
+    "a": "а", "b": "в", "c": "с", "e": "е", "h": "н", "k": "к", "m": "м",
+    "n": "п", "o": "о", "p": "р", "r": "г", "t": "т", "u": "и", "x": "х", "y": "у",
+    "0": "о", "3": "з", "4": "ч", "6": "б", "@": "а",
+    "ё": "е", "й": "и",
+}
+
+# Символы, которыми разбивают слово: «б.л.я», «с*к*а»
+SEPARATORS = frozenset(".,-_*'\"`~|/\\:;+=^•·")
+
+
+def _build_table() -> dict[str, str]:
+    """Таблица перевода строится один раз: регистр и гомоглифы за один поиск по словарю"""
+    table = {}
+    alphabet = "абвгдеёжзийклмнопрстуфхцчшщъыьэюя" + "abcdefghijklmnopqrstuvwxyz"
+    for ch in alphabet:
+        table[ch] = ch
+        table[ch.upper()] = ch
+    for src, dst in HOMOGLYPHS.items():
+        table[src] = dst
+        table[src.upper()] = dst
+    return table
+
+
+_TABLE = _build_table()
+
+
+def _fold(ch: str) -> str:
+    mapped = _TABLE.get(ch)
+    if mapped is None:
+        # lower() может вернуть несколько символов — берём первый, чтобы не сбить смещения
+        mapped = ch.lower()[:1] or ch
+    return mapped
+
+
+class NormalizedText(NamedTuple):
+    text: str
+    # offsets[i] — позиция i-го символа нормализованного текста в исходном;
+    # offsets[len(text)] == длина исходного текста
+    offsets: list[int]
+
+    def span(self, start: int, end: int) -> tuple[int, int]:
+        """Перевод диапазона нормализованного текста в диапазон исходного"""
+        return self.offsets[start], self.offsets[end]
+
+
+def normalize(text: str) -> NormalizedText:
+    """
+    Приведение текста к каноническому виду за один проход:
+    нижний регистр и гомоглифы, схлопывание повторов, удаление разделителей внутри слова
+    """
+    chars: list[str] = []
+    offsets: list[int] = []
+    segment = 0  # длина текущей серии букв после последнего разделителя
+    length = len(text)
+    pos = 0
+    while pos < length:
+        ch = text[pos]
+        if ch in SEPARATORS:
+            end = pos + 1
+            while end < length and text[end] in SEPARATORS:
+                end += 1
+            # Разделитель выкидываем, только если одиночные буквы стоят с обеих сторон:
+            # «б.л.я» → «бля», но «привет.пока» и «я,бля» остаются двумя словами
+            if segment == 1 and end < length and _fold(text[end]).isalnum():
+                next_is_single = end + 1 == length or not _fold(text[end + 1]).isalnum()
+                if next_is_single:
+                    # Счёт начинается заново: одиночной должна быть каждая следующая буква
+                    segment = 0
+                    pos = end
+                    continue
+            segment = 0
+            for index in range(pos, end):
+                if not chars or chars[-1] != text[index]:
+                    chars.append(text[index])
+                    offsets.append(index)
+            pos = end
+            continue
+
+        mapped = _fold(ch)
+        if not chars or chars[-1] != mapped:
+            chars.append(mapped)
+            offsets.append(pos)
+            segment = segment + 1 if mapped.isalnum() else 0
+        pos += 1
+
+    offsets.append(length)
+    return NormalizedText("".join(chars), offsets)
@@ -0,0 +1,229 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+
+from aiogram import Bot
+from aiogram.client.session.middlewares.base import BaseRequestMiddleware, NextRequestMiddlewareType
+from aiogram.exceptions import TelegramRetryAfter
+from aiogram.methods import (
+    BanChatMember, DeleteMessage, DeleteMessages, RestrictChatMember, TelegramMethod, UnbanChatMember
+)
+from aiogram.methods.base import TelegramType
+
+# Классы приоритета: чем меньше, тем раньше уходит запрос
+PRIORITY_MODERATION = 0
+PRIORITY_REPLY = 1
+PRIORITY_LOG = 2
+
+MODERATION_METHODS = (DeleteMessage, DeleteMessages, BanChatMember, UnbanChatMember, RestrictChatMember)
+DELETE_BATCH_LIMIT = 100
+MAX_CHAT_BUCKETS = 10_000
+# Сообщения в чат (send_*, forward, copy) считаются по своему, более строгому лимиту
+SEND_METHOD_PREFIXES = ("Send", "Forward", "Copy")
+
+BucketKey = tuple[int, bool]
+
+
+def is_send(method: TelegramMethod) -> bool:
+    return type(method).__name__.startswith(SEND_METHOD_PREFIXES)
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def wait_time(self, now: float) -> float:
+        """Сколько ждать до появления целого токена"""
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return max(self.updated - now, 0.0) + (1 - self.tokens) / self.rate
+
+    def is_full(self, now: float) -> bool:
+        self._refill(now)
+        return self.tokens >= self.capacity
+
+    def take(self):
+        self.tokens -= 1
+
+    def pause(self, now: float, seconds: float):
+        """После 429 токены не копятся, пока не истечёт retry_after"""
+        self.tokens = 0
+        self.updated = max(self.updated, now + seconds)
+
+
+class OutboundScheduler(BaseRequestMiddleware):
+    """
+    Планировщик исходящих запросов к Bot API, подключается к сессии бота.
+    Запросы, адресованные чатам, проходят через глобальный и початовый токен-бакеты
+    в порядке приоритета: у чата два бакета — для отправки сообщений (send_rate)
+    и для остальных методов, удалений и банов (chat_rate). Удаления одного чата
+    склеиваются в delete_messages, а ответы 429 (TelegramRetryAfter) повторяются автоматически
+    """
+
+    def __init__(self, global_rate: float, chat_rate: float, chat_burst: float,
+                 send_rate: float | None = None, send_burst: float | None = None,
+                 log_chat_id: int | None = None, max_retries: int = 3):
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.send_rate = send_rate or chat_rate
+        self.send_burst = send_burst or chat_burst
+        self.log_chat_id = log_chat_id
+        self.max_retries = max_retries
+        self._global = TokenBucket(global_rate, global_rate)
+        self._chats: dict[BucketKey, TokenBucket] = {}
+        self._waiters: list[tuple[int, int, BucketKey, asyncio.Future]] = []
+        self._seq = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._grant_task: asyncio.Task | None = None
+        self._pending_deletes: dict[int, list[tuple[DeleteMessage, asyncio.Future]]] = {}
+        self._tasks: set[asyncio.Task] = set()
+
+    def set_global_rate(self, rate: float):
+        """Доля общего лимита API, например для одного из нескольких процессов"""
+        self._global = TokenBucket(rate, rate)
+
+    @property
+    def depth(self) -> int:
+        return len(self._waiters) + sum(len(batch) for batch in self._pending_deletes.values())
+
+    async def __call__(
+        self,
+        make_request: NextRequestMiddlewareType[TelegramType],
+        bot: Bot,
+        method: TelegramMethod[TelegramType],
+    ):
+        chat_id = getattr(method, "chat_id", None)
+        # getUpdates, getMe и чтения (get_chat_member и т.п.) не троттлим
+        if not isinstance(chat_id, int) or type(method).__name__.startswith("Get"):
+            return await make_request(bot, method)
+        if isinstance(method, DeleteMessage):
+            return await self._queue_delete(make_request, bot, method)
+        return await self._request(make_request, bot, method, chat_id, self._priority(method, chat_id))
+
+    def _priority(self, method: TelegramMethod, chat_id: int) -> int:
+        if isinstance(method, MODERATION_METHODS):
+            return PRIORITY_MODERATION
+        if chat_id == self.log_chat_id:
+            return PRIORITY_LOG
+        return PRIORITY_REPLY
+
+    # ==================== TOKENS ====================
+
+    def _chat_bucket(self, key: BucketKey) -> TokenBucket:
+        bucket = self._chats.get(key)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                # Полностью восстановившиеся бакеты ничего не помнят — их можно забыть
+                now = time.monotonic()
+                for idle in [key for key, value in self._chats.items() if value.is_full(now)]:
+                    del self._chats[idle]
+            if key[1]:
+                bucket = TokenBucket(self.send_rate, self.send_burst)
+            else:
+                bucket = TokenBucket(self.chat_rate, self.chat_burst)
+            self._chats[key] = bucket
+        return bucket
+
+    async def _acquire(self, key: BucketKey, priority: int):
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._seq), key, future))
+        self._wakeup.set()
+        if self._grant_task is None or self._grant_task.done():
+            self._grant_task = asyncio.create_task(self._grant_loop())
+        await future
+
+    async def _grant_loop(self):
+        while self._waiters:
+            now = time.monotonic()
+            delay = self._global.wait_time(now)
+            if delay == 0:
+                delay = None
+                for item in sorted(self._waiters):
+                    _, _, key, future = item
+                    if future.done():
+                        self._waiters.remove(item)
+                        continue
+                    chat_delay = self._chat_bucket(key).wait_time(now)
+                    if chat_delay == 0:
+                        # Самый приоритетный запрос, чей чат не упёрся в лимит
+                        self._global.take()
+                        self._chats[key].take()
+                        self._waiters.remove(item)
+                        future.set_result(None)
+                        delay = 0
+                        break
+                    delay = chat_delay if delay is None else min(delay, chat_delay)
+                heapq.heapify(self._waiters)
+                if delay == 0 or not self._waiters:
+                    continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+
+    # ==================== REQUESTS ====================
+
+    async def _request(self, make_request, bot: Bot, method: TelegramMethod, chat_id: int,
+                       priority: int, have_token: bool = False):
+        key = (chat_id, is_send(method))
+        for attempt in range(self.max_retries + 1):
+            if not have_token:
+                await self._acquire(key, priority)
+            have_token = False
+            try:
+                return await make_request(bot, method)
+            except TelegramRetryAfter as e:
+                if attempt == self.max_retries:
+                    raise
+                logging.warning(
+                    f"⏳ Flood control: {type(method).__name__} в чате {chat_id}, повтор через {e.retry_after} с"
+                )
+                self._chat_bucket(key).pause(time.monotonic(), e.retry_after)
+
+    async def _queue_delete(self, make_request, bot: Bot, method: DeleteMessage) -> bool:
+        chat_id = method.chat_id
+        future = asyncio.get_running_loop().create_future()
+        batch = self._pending_deletes.setdefault(chat_id, [])
+        batch.append((method, future))
+        if len(batch) == 1:
+            task = asyncio.create_task(self._flush_deletes(make_request, bot, chat_id))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+        return await future
+
+    async def _flush_deletes(self, make_request, bot: Bot, chat_id: int):
+        # Пока ждём токен, в пачку успевают попасть другие удаления этого чата
+        await self._acquire((chat_id, False), PRIORITY_MODERATION)
+        batch = self._pending_deletes.pop(chat_id, [])
+        for start in range(0, len(batch), DELETE_BATCH_LIMIT):
+            chunk = batch[start:start + DELETE_BATCH_LIMIT]
+            if len(chunk) == 1:
+                method = chunk[0][0]
+            else:
+                method = DeleteMessages(chat_id=chat_id, message_ids=[item.message_id for item, _ in chunk])
+            try:
+                result = await self._request(
+                    make_request, bot, method, chat_id, PRIORITY_MODERATION, have_token=start == 0
+                )
+            except Exception as e:
+                for _, future in chunk:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            if len(chunk) > 1:
+                logging.info(f"🗑 Удалено пачкой: chat={chat_id}, сообщений={len(chunk)}")
+            for _, future in chunk:
+                if not future.done():
+                    future.set_result(result)
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+from typing import NamedTuple
+
+from services.dictionary import BadWordDictionary
+from services.matcher import WordMatcher, source_hash
+from services.normalizer import normalize
+
+
+@functools.lru_cache(maxsize=16384)
+def word_pattern(word: str) -> str:
+    """Под каким видом слово попадает в автомат: «хуи» и «хуй», «хуйло» и «хуило» — одно и то же"""
+    return normalize(word.strip().lower()).text
+
+
+def effective_words(base: frozenset[str], profile: "ChatProfile") -> frozenset[str]:
+    """Общий словарь с поправками чата; разрешённые слова сравниваются по нормализованному виду"""
+    removed = {word_pattern(word) for word in profile.removed}
+    return frozenset(word for word in base | profile.added if word_pattern(word) not in removed)
+
+
+class ChatProfile(NamedTuple):
+    chat_id: int
+    max_violations: int
+    ban_duration: int
+    added: frozenset[str] = frozenset()
+    removed: frozenset[str] = frozenset()
+
+    @property
+    def is_custom_dictionary(self) -> bool:
+        return bool(self.added or self.removed)
+
+
+class MatcherRegistry:
+    """
+    Общие автоматы для чатов с одинаковым итоговым словарём.
+    Ключ — хэш содержимого словаря, автомат живёт, пока на него ссылается хоть один чат
+    """
+
+    def __init__(self):
+        self._matchers: dict[bytes, WordMatcher] = {}
+        self._refs: dict[bytes, int] = {}
+        self._locks: dict[bytes, asyncio.Lock] = {}
+
+    def __len__(self) -> int:
+        return len(self._matchers)
+
+    async def acquire(self, words: frozenset[str]) -> tuple[bytes, WordMatcher]:
+        digest = source_hash(words)
+        # Пока автомат собирается, остальные чаты с тем же словарём ждут его, а не собирают свой
+        lock = self._locks.setdefault(digest, asyncio.Lock())
+        async with lock:
+            if digest not in self._matchers:
+                self._matchers[digest] = await asyncio.to_thread(WordMatcher, words)
+                self._refs[digest] = 0
+                logging.info(f"📖 Собран словарь чата: слов={len(words)}, всего автоматов={len(self._matchers)}")
+        self._locks.pop(digest, None)
+        self._refs[digest] += 1
+        return digest, self._matchers[digest]
+
+    def release(self, digest: bytes):
+        self._refs[digest] -= 1
+        if self._refs[digest] <= 0:
+            del self._refs[digest]
+            del self._matchers[digest]
+
+
+class ChatProfiles:
+    """
+    Настройки модерации по чатам: лимит нарушений, длительность бана
+    и поправки к общему словарю (добавленные и разрешённые слова)
+    """
+
+    def __init__(self, db, dictionary: BadWordDictionary, max_violations: int, ban_duration: int):
+        self.db = db
+        self.dictionary = dictionary
+        self.default_max_violations = max_violations
+        self.default_ban_duration = ban_duration
+        self.registry = MatcherRegistry()
+        self._profiles: dict[int, ChatProfile] = {}
+        # chat_id -> (хэш общего словаря, профиль, хэш словаря чата, автомат)
+        self._resolved: dict[int, tuple[bytes, ChatProfile, bytes, WordMatcher]] = {}
+
+    async def get(self, chat_id: int) -> ChatProfile:
+        profile = self._profiles.get(chat_id)
+        if profile is None:
+            row, words = await self.db.load_chat_profile(chat_id)
+            max_violations, ban_duration = row or (None, None)
+            profile = self._profiles.setdefault(chat_id, ChatProfile(
+                chat_id,
+                max_violations if max_violations is not None else self.default_max_violations,
+                ban_duration if ban_duration is not None else self.default_ban_duration,
+                frozenset(word for word, allowed in words if not allowed),
+                frozenset(word for word, allowed in words if allowed),
+            ))
+        return profile
+
+    def word_count(self, profile: ChatProfile) -> int:
+        words = self.dictionary.state.words
+        if not profile.is_custom_dictionary:
+            return len(words)
+        return len(effective_words(words, profile))
+
+    async def matcher(self, chat_id: int) -> WordMatcher:
+        profile = await self.get(chat_id)
+        if not profile.is_custom_dictionary:
+            return self.dictionary.matcher
+        base = self.dictionary.state
+        resolved = self._resolved.get(chat_id)
+        if resolved is not None and resolved[0] == base.digest and resolved[1] is profile:
+            return resolved[3]
+        # Словарь чата ещё не собран, изменился общий словарь или поправки чата
+        words = effective_words(base.words, profile)
+        digest, matcher = await self.registry.acquire(words)
+        previous = self._resolved.get(chat_id)
+        self._resolved[chat_id] = (base.digest, profile, digest, matcher)
+        if previous is not None:
+            self.registry.release(previous[2])
+        return matcher
+
+    def _update(self, profile: ChatProfile, save_limits: bool = False):
+        self._profiles[profile.chat_id] = profile
+        if save_limits:
+            self.db.save_chat_profile(profile.chat_id, profile.max_violations, profile.ban_duration)
+        resolved = self._resolved.pop(profile.chat_id, None)
+        if resolved is not None:
+            self.registry.release(resolved[2])
+
+    async def set_max_violations(self, chat_id: int, value: int):
+        profile = await self.get(chat_id)
+        self._update(profile._replace(max_violations=value), save_limits=True)
+
+    async def set_ban_duration(self, chat_id: int, value: int):
+        profile = await self.get(chat_id)
+        self._update(profile._replace(ban_duration=value), save_limits=True)
+
+    async def ban_word(self, chat_id: int, word: str):
+        """Запретить слово в чате (или отменить его разрешение)"""
+        profile = await self.get(chat_id)
+        pattern = word_pattern(word)
+        allowed = {entry for entry in profile.removed if word_pattern(entry) == pattern}
+        for entry in allowed:
+            self.db.delete_chat_word(chat_id, entry)
+        profile = profile._replace(removed=profile.removed - allowed)
+        if not any(word_pattern(entry) == pattern for entry in self.dictionary.state.words):
+            profile = profile._replace(added=profile.added | {word})
+            self.db.save_chat_word(chat_id, word, allowed=False)
+        self._update(profile)
+
+    async def allow_word(self, chat_id: int, word: str) -> bool:
+        """
+        Разрешить в чате слово (с учётом нормализации: вместе со всеми его написаниями).
+        False — такого слова нет ни в общем словаре, ни в добавленных чатом
+        """
+        profile = await self.get(chat_id)
+        pattern = word_pattern(word)
+        added = {entry for entry in profile.added if word_pattern(entry) == pattern}
+        for entry in added:
+            self.db.delete_chat_word(chat_id, entry)
+        profile = profile._replace(added=profile.added - added)
+        in_base = any(word_pattern(entry) == pattern for entry in self.dictionary.state.words)
+        if in_base:
+            profile = profile._replace(removed=profile.removed | {word})
+            self.db.save_chat_word(chat_id, word, allowed=True)
+        if not added and not in_base:
+            return False
+        self._update(profile)
+        return True
@@ -0,0 +1,114 @@
+import asyncio
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+
+# Архивируемые таблицы: таблица -> колонка с временем записи (UTC, формат CURRENT_TIMESTAMP)
+ARCHIVED_TABLES = {
+    "violations": "timestamp",
+    "bans": "banned_at",
+}
+
+
+def write_archive(path: str, columns: list[str], rows: list[tuple]):
+    """Дописать строки в gzip-архив JSON Lines (каждый вызов — отдельный gzip-член файла)"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with gzip.open(path, "at", encoding="utf-8") as f:
+        for row in rows:
+            f.write(json.dumps(dict(zip(columns, row)), ensure_ascii=False, default=str) + "\n")
+
+
+class RetentionService:
+    """
+    Фоновое обслуживание БД: строки старше срока хранения переносятся
+    в сжатые архивы и удаляются, истёкшие баны убираются из active_bans,
+    а в простое база понемногу сжимается (incremental vacuum) и WAL сбрасывается
+    """
+
+    def __init__(self, db, archive_dir: str, retention_days: dict[str, int],
+                 interval: float = 3600, batch_size: int = 1000,
+                 idle_after: float = 5.0, vacuum_pages: int = 500, check_interval: float = 60):
+        self.db = db
+        self.archive_dir = archive_dir
+        self.retention_days = retention_days
+        self.interval = interval
+        self.batch_size = batch_size
+        self.idle_after = idle_after
+        self.vacuum_pages = vacuum_pages
+        self.check_interval = check_interval
+        self.archived = 0
+        self._last_archive: float | None = None
+        self._compacted = False
+        self._stopping = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    def start(self):
+        self._stopping.clear()
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Дождаться текущего шага и остановиться"""
+        if self._task is None:
+            return
+        self._stopping.set()
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while not self._stopping.is_set():
+            try:
+                if self._last_archive is None or time.monotonic() - self._last_archive >= self.interval:
+                    await self.run_retention()
+                    self._last_archive = time.monotonic()
+                    self._compacted = False
+                if not self._compacted and self.db.idle_for >= self.idle_after:
+                    await self._compact_step()
+            except Exception as e:
+                logging.error(f"❌ Ошибка обслуживания БД: {e}")
+            try:
+                await asyncio.wait_for(self._stopping.wait(), timeout=self.check_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    # ==================== RETENTION ====================
+
+    async def run_retention(self):
+        for table, days in self.retention_days.items():
+            if days > 0:
+                await self._archive_table(table, days)
+        pruned = await self.db.prune_active_bans()
+        if pruned:
+            logging.info(f"🧹 Удалено истёкших банов из active_bans: {pruned}")
+
+    async def _archive_table(self, table: str, days: int):
+        column = ARCHIVED_TABLES[table]
+        cutoff = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d %H:%M:%S")
+        path = os.path.join(
+            self.archive_dir, f"{table}-{datetime.now(timezone.utc):%Y%m%d-%H%M%S}.jsonl.gz"
+        )
+        total = 0
+        while not self._stopping.is_set():
+            columns, rows = await self.db.fetch_older_than(table, column, cutoff, self.batch_size)
+            if not rows:
+                break
+            # Сначала архив на диске, потом удаление: при сбое строки окажутся в архиве дважды, но не пропадут
+            await asyncio.to_thread(write_archive, path, columns, rows)
+            await self.db.delete_ids(table, [row[columns.index("id")] for row in rows])
+            total += len(rows)
+            # Между пачками отдаём базу обработчикам сообщений
+            await asyncio.sleep(0)
+        if total:
+            self.archived += total
+            logging.info(f"🗄 Заархивировано строк {table}: {total} → {path}")
+
+    # ==================== COMPACTION ====================
+
+    async def _compact_step(self):
+        free_pages, wal_pages = await self.db.compact(self.vacuum_pages)
+        # Пока остаются свободные страницы, продолжаем на следующих проверках простоя
+        self._compacted = free_pages == 0
+        logging.info(f"🧽 Обслуживание БД: свободных страниц {free_pages}, WAL сброшен ({wal_pages} стр.)")
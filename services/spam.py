@@ -0,0 +1,240 @@
+from collections import OrderedDict, deque
+from typing import NamedTuple
+
+from services.normalizer import normalize
+
+MASK = (1 << 61) - 1
+
+
+class SpamVerdict(NamedTuple):
+    kind: str  # "flood" или "duplicate"
+    count: int  # сообщений в окне (флуд) или похожих сообщений (повторы)
+    # Более ранние копии того же сообщения, ещё не удалённые: ((user_id, message_id), ...)
+    earlier: tuple[tuple[int, int], ...] = ()
+    # Первое срабатывание волны флуда: нарушение засчитывается один раз, остальное просто удаляется
+    first: bool = True
+
+
+# ==================== FLOOD ====================
+
+class RateRing:
+    """Счётчик сообщений за последние len(slots) секунд: кольцо посекундных ячеек"""
+
+    __slots__ = ("slots", "last", "total")
+
+    def __init__(self, size: int):
+        self.slots = [0] * size
+        self.last = 0
+        self.total = 0
+
+    def hit(self, second: int) -> int:
+        size = len(self.slots)
+        if second > self.last:
+            # Обнуляем ячейки, через которые перешагнули (не больше size штук)
+            for tick in range(self.last + 1, min(second, self.last + size) + 1):
+                index = tick % size
+                self.total -= self.slots[index]
+                self.slots[index] = 0
+            self.last = second
+        self.slots[second % size] += 1
+        self.total += 1
+        return self.total
+
+
+class FloodCounter:
+    """Частота сообщений по (chat_id, user_id); неактивные счётчики вытесняются"""
+
+    def __init__(self, window: int, max_keys: int = 100_000):
+        self.window = window
+        self.max_keys = max_keys
+        self._rings: OrderedDict[tuple[int, int], RateRing] = OrderedDict()
+
+    def hit(self, key: tuple[int, int], now: float) -> int:
+        second = int(now)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = RateRing(self.window)
+            ring.last = second
+        else:
+            self._rings.move_to_end(key)
+        count = ring.hit(second)
+        # Самые давние счётчики в начале: удаляем, пока они старше окна
+        while self._rings:
+            oldest_key, oldest = next(iter(self._rings.items()))
+            if oldest.last > second - self.window and len(self._rings) <= self.max_keys:
+                break
+            del self._rings[oldest_key]
+        return count
+
+    def __len__(self) -> int:
+        return len(self._rings)
+
+
+# ==================== NEAR-DUPLICATES ====================
+
+def shingles(text: str, size: int) -> set[str]:
+    folded = "".join(normalize(text).text.split())
+    if len(folded) <= size:
+        return {folded} if folded else set()
+    return {folded[i:i + size] for i in range(len(folded) - size + 1)}
+
+
+def minhash(items: set[str], slots: int) -> tuple[int, ...]:
+    """
+    MinHash одной хэш-функцией (one permutation hashing): хэш шингла выбирает ячейку,
+    в ячейке остаётся минимум. O(число шинглов) вместо O(шинглы × slots).
+    Пустые ячейки заполняются значением ближайшей непустой справа
+    """
+    signature = [MASK] * slots
+    for item in items:
+        value = hash(item) & MASK
+        index = value % slots
+        value //= slots
+        if value < signature[index]:
+            signature[index] = value
+    filled = [i for i, value in enumerate(signature) if value != MASK]
+    if filled and len(filled) < slots:
+        for i in range(slots):
+            if signature[i] == MASK:
+                donor = next((j for j in filled if j > i), filled[0])
+                signature[i] = signature[donor] ^ (i * 0x9E3779B97F4A7C15 & MASK)
+    return tuple(signature)
+
+
+def similarity(left: tuple[int, ...], right: tuple[int, ...]) -> float:
+    """Оценка коэффициента Жаккара по совпадающим ячейкам"""
+    return sum(1 for a, b in zip(left, right) if a == b) / len(left)
+
+
+class Entry:
+    __slots__ = ("time", "user_id", "message_id", "signature", "keys", "flagged")
+
+    def __init__(self, time: float, user_id: int, message_id: int, signature: tuple[int, ...], keys: list[int]):
+        self.time = time
+        self.user_id = user_id
+        self.message_id = message_id
+        self.signature = signature
+        self.keys = keys
+        self.flagged = False
+
+
+class DuplicateIndex:
+    """
+    LSH-индекс недавних сообщений одного чата: сигнатура режется на bands полос,
+    сообщения с совпавшей полосой — кандидаты в похожие.
+    Записи живут window секунд и удаляются из индекса в порядке поступления
+    """
+
+    def __init__(self, bands: int, rows: int, window: float, max_entries: int):
+        self.bands = bands
+        self.rows = rows
+        self.window = window
+        self.max_entries = max_entries
+        self._entries: deque[Entry] = deque()
+        self._buckets: dict[int, deque[Entry]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, signature: tuple[int, ...]) -> list[int]:
+        rows = self.rows
+        return [hash((band, signature[band * rows:(band + 1) * rows])) for band in range(self.bands)]
+
+    def expire(self, now: float):
+        entries = self._entries
+        while entries and (entries[0].time <= now - self.window or len(entries) > self.max_entries):
+            entry = entries.popleft()
+            for key in entry.keys:
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    # Записи истекают в порядке поступления, поэтому в каждой полосе она первая
+                    if bucket and bucket[0] is entry:
+                        bucket.popleft()
+                    else:
+                        bucket.remove(entry)
+                    if not bucket:
+                        del self._buckets[key]
+
+    def add(self, now: float, user_id: int, message_id: int, signature: tuple[int, ...],
+            threshold: float, max_candidates: int) -> tuple[Entry, list[Entry]]:
+        """Добавить сообщение; вернуть его запись и похожие на него недавние сообщения"""
+        self.expire(now)
+        keys = self._band_keys(signature)
+        similar, seen = [], set()
+        for key in keys:
+            for candidate in self._buckets.get(key, ()):
+                if id(candidate) in seen:
+                    continue
+                seen.add(id(candidate))
+                if similarity(signature, candidate.signature) >= threshold:
+                    similar.append(candidate)
+                if len(seen) >= max_candidates:
+                    break
+        entry = Entry(now, user_id, message_id, signature, keys)
+        self._entries.append(entry)
+        for key in keys:
+            self._buckets.setdefault(key, deque()).append(entry)
+        return entry, similar
+
+
+class SpamDetector:
+    """
+    Антиспам по чатам: флуд (слишком много сообщений пользователя за окно)
+    и волны почти одинаковых сообщений, в том числе с разных аккаунтов
+    """
+
+    def __init__(self, flood_messages: int, flood_window: int, duplicate_count: int, duplicate_window: float,
+                 min_length: int = 30, shingle_size: int = 5, bands: int = 8, rows: int = 4,
+                 threshold: float = 0.8, max_entries: int = 2000, max_candidates: int = 64):
+        self.flood_messages = flood_messages
+        self.duplicate_count = duplicate_count
+        self.duplicate_window = duplicate_window
+        self.min_length = min_length
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.rows = rows
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.max_candidates = max_candidates
+        self.flood = FloodCounter(flood_window)
+        self._chats: dict[int, DuplicateIndex] = {}
+        self._checks = 0
+
+    def check(self, chat_id: int, user_id: int, message_id: int, text: str, now: float) -> SpamVerdict | None:
+        count = self.flood.hit((chat_id, user_id), now)
+        if count > self.flood_messages:
+            return SpamVerdict("flood", count, first=count == self.flood_messages + 1)
+        if len(text) < self.min_length:
+            return None
+
+        items = shingles(text, self.shingle_size)
+        if len(items) < 2:
+            return None
+        index = self._chats.get(chat_id)
+        if index is None:
+            index = self._chats[chat_id] = DuplicateIndex(
+                self.bands, self.rows, self.duplicate_window, self.max_entries
+            )
+        entry, similar = index.add(now, user_id, message_id, minhash(items, self.bands * self.rows),
+                                   self.threshold, self.max_candidates)
+        self._sweep(now)
+        if len(similar) + 1 < self.duplicate_count:
+            return None
+        entry.flagged = True
+        earlier = []
+        for candidate in similar:
+            if not candidate.flagged:
+                candidate.flagged = True
+                earlier.append((candidate.user_id, candidate.message_id))
+        return SpamVerdict("duplicate", len(similar) + 1, tuple(earlier))
+
+    def _sweep(self, now: float):
+        """Изредка убираем индексы чатов, где давно никто не писал"""
+        self._checks += 1
+        if self._checks % 1000:
+            return
+        for chat_id in list(self._chats):
+            index = self._chats[chat_id]
+            index.expire(now)
+            if not len(index):
+                del self._chats[chat_id]
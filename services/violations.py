@@ -0,0 +1,163 @@
+import math
+from collections import OrderedDict
+
+CounterKey = tuple[int, int]
+# Нарушения по интервалам времени: ((номер бакета, нарушений, время), ...) по возрастанию номера.
+# Время (unix, секунды) подобрано так, что count * 0.5 ** (возраст / half_life) равно
+# сумме весов нарушений бакета, поэтому затухание считается от настоящего времени нарушений
+Buckets = tuple[tuple[int, int, int], ...]
+# Счёт дотягивается до лимита, если отстаёт от него меньше чем на SCORE_EPSILON: пока идёт серия,
+# ранние нарушения уже чуть затухли, и три нарушения за час (полураспад — неделя) дают ≈2.994, а не 3
+SCORE_EPSILON = 0.01
+
+
+class DecayPolicy:
+    """
+    Затухающий счёт нарушений. Нарушения копятся в бакетах по bucket_seconds,
+    вес бакета падает вдвое каждые half_life секунд, бакеты старше max_buckets отбрасываются.
+    Счёт — сумма по бакетам, O(max_buckets) без обращения к истории violations
+    """
+
+    def __init__(self, bucket_seconds: float, half_life: float, max_buckets: int):
+        self.bucket_seconds = bucket_seconds
+        self.half_life = half_life
+        self.max_buckets = max_buckets
+
+    def bucket(self, timestamp: float) -> int:
+        return int(timestamp // self.bucket_seconds)
+
+    def add(self, buckets: Buckets, now: float, amount: int = 1) -> Buckets:
+        current = self.bucket(now)
+        oldest = current - self.max_buckets + 1
+        kept = [item for item in buckets if item[0] >= oldest]
+        if kept and kept[-1][0] == current:
+            _, count, at = kept[-1]
+            weight = count * self.weight(at, now) + amount
+            # Время, при котором count + amount нарушений весят столько же, сколько по отдельности
+            at = now - self.half_life * math.log2((count + amount) / weight)
+            kept[-1] = (current, count + amount, round(at))
+        else:
+            kept.append((current, amount, round(now)))
+        return tuple(kept)
+
+    def weight(self, at: float, now: float) -> float:
+        return 0.5 ** (max(0.0, now - at) / self.half_life)
+
+    def score(self, buckets: Buckets, now: float) -> float:
+        oldest = self.bucket(now) - self.max_buckets + 1
+        total = 0.0
+        for bucket, count, at in buckets:
+            if bucket >= oldest:
+                total += count * self.weight(at, now)
+        return total
+
+    def total(self, buckets: Buckets, now: float) -> int:
+        """Нарушений в окне без учёта затухания"""
+        oldest = self.bucket(now) - self.max_buckets + 1
+        return sum(count for bucket, count, _ in buckets if bucket >= oldest)
+
+
+def encode_buckets(buckets: Buckets) -> str:
+    return ",".join(f"{bucket}:{count}:{at}" for bucket, count, at in buckets)
+
+
+def decode_buckets(text: str | None, bucket_seconds: float) -> Buckets:
+    if not text:
+        return ()
+    buckets = []
+    for item in text.split(","):
+        values = tuple(map(int, item.split(":")))
+        if len(values) == 2:
+            # Запись без времени: возраст, как и раньше, от конца бакета
+            values += (int((values[0] + 1) * bucket_seconds),)
+        buckets.append(values)
+    return tuple(buckets)
+
+
+def format_score(score: float) -> str:
+    """2.0 → «2», 2.43 → «2.4», 2.95 → «2.9»: «3» показывается, только когда лимит 3 достигнут"""
+    return f"{math.floor((score + SCORE_EPSILON) * 10) / 10:g}"
+
+
+def reaches_limit(score: float, limit: int) -> bool:
+    """Счёт без округления, с допуском SCORE_EPSILON на затухание между нарушениями подряд"""
+    return score + SCORE_EPSILON >= limit
+
+
+class ViolationCounterCache:
+    """
+    LRU-кэш бакетов нарушений (chat_id, user_id) -> Buckets.
+    «Грязные» записи (ещё не сброшенные в БД) не вытесняются, пока их не пометят чистыми
+    """
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._data: OrderedDict[CounterKey, Buckets] = OrderedDict()
+        self._dirty: set[CounterKey] = set()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: CounterKey) -> Buckets | None:
+        buckets = self._data.get(key)
+        if buckets is None:
+            return None
+        self.hits += 1
+        self._data.move_to_end(key)
+        return buckets
+
+    def set(self, key: CounterKey, buckets: Buckets):
+        """Новое значение, ещё не записанное в БД"""
+        self._data[key] = buckets
+        self._data.move_to_end(key)
+        self._dirty.add(key)
+        self._evict()
+
+    def setdefault(self, key: CounterKey, buckets: Buckets) -> Buckets:
+        """Значение, загруженное из БД (промах); не перетирает более свежее в кэше"""
+        self.misses += 1
+        current = self._data.get(key)
+        if current is not None:
+            return current
+        self._data[key] = buckets
+        self._evict()
+        return buckets
+
+    def dirty_snapshot(self) -> dict[CounterKey, Buckets]:
+        return {key: self._data[key] for key in self._dirty}
+
+    def mark_clean(self, snapshot: dict[CounterKey, Buckets]):
+        """Снять пометку с записей, которые не менялись после снимка"""
+        for key, buckets in snapshot.items():
+            if self._data.get(key) == buckets:
+                self._dirty.discard(key)
+        self._evict()
+
+    def _evict(self):
+        excess = len(self._data) - self.max_size
+        if excess <= 0:
+            return
+        victims = []
+        for key in self._data:
+            if key not in self._dirty:
+                victims.append(key)
+                if len(victims) == excess:
+                    break
+        for key in victims:
+            del self._data[key]
+        self.evictions += len(victims)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "max_size": self.max_size,
+            "dirty": len(self._dirty),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,133 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from contextlib import suppress
+from typing import Any, Awaitable, Callable
+
+from aiogram import Bot, Dispatcher
+from aiohttp import web
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+UpdateSource = Callable[[], Awaitable[dict[str, Any] | None]]
+
+
+def shard_for(update: dict[str, Any], workers: int) -> int:
+    """
+    Номер воркера для апдейта: все события одного чата попадают в один процесс,
+    поэтому порядок внутри чата сохраняется, а кэши по чатам не расходятся
+    """
+    for key, event in update.items():
+        if not isinstance(event, dict):
+            continue
+        chat = event.get("chat") or (event.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"] % workers
+        if "from" in event:
+            return event["from"]["id"] % workers
+    return update.get("update_id", 0) % workers
+
+
+async def consume_updates(source: UpdateSource, bot: Bot, dp: Dispatcher):
+    """Обработка апдейтов из очереди по одному, пока не придёт None"""
+    while True:
+        update = await source()
+        if update is None:
+            return
+        try:
+            await dp.feed_raw_update(bot, update)
+        except Exception:
+            # Ошибка уже залогирована диспетчером, следующий апдейт обрабатываем как обычно
+            pass
+
+
+async def _wait_for_signal():
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        with suppress(NotImplementedError):
+            loop.add_signal_handler(sig, stop.set)
+    await stop.wait()
+
+
+async def serve_webhook(bot: Bot, dp: Dispatcher, dispatch: Callable[[dict[str, Any]], Awaitable[None]], *,
+                        host: str, port: int, url: str, path: str, secret: str | None):
+    """
+    HTTP-приёмник вебхука: проверяет секрет, отдаёт апдейт в dispatch и отвечает 200.
+    dispatch ждёт места в очереди обработчика, поэтому под нагрузкой ответ задерживается
+    и Telegram сам сбавляет темп доставки, а память процесса не растёт
+    """
+    async def handle(request: web.Request) -> web.Response:
+        if secret and request.headers.get(SECRET_HEADER) != secret:
+            return web.Response(status=401)
+        await dispatch(await request.json())
+        return web.Response()
+
+    app = web.Application()
+    app.router.add_post(path, handle)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    await bot.set_webhook(
+        url.rstrip("/") + path,
+        secret_token=secret,
+        allowed_updates=dp.resolve_used_update_types(),
+    )
+    logging.info(f"🌐 Вебхук слушает {host}:{port}{path}")
+    try:
+        await _wait_for_signal()
+    finally:
+        await runner.cleanup()
+
+
+async def run_in_process(bot: Bot, dp: Dispatcher, *, queue_size: int, **options):
+    """Вебхук и обработка в одном процессе"""
+    queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue(queue_size)
+    consumer = asyncio.create_task(consume_updates(queue.get, bot, dp))
+    try:
+        await serve_webhook(bot, dp, queue.put, **options)
+    finally:
+        await queue.put(None)
+        await consumer
+
+
+def run_sharded(bot: Bot, dp: Dispatcher, worker: Callable[[int, int, Any], None],
+                workers: int, *, queue_size: int, **options):
+    """
+    Вебхук в главном процессе, обработка — в workers процессах, шардированных по chat_id.
+    worker(index, workers, queue) — точка входа процесса-обработчика
+    """
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue(queue_size) for _ in range(workers)]
+    processes = [
+        context.Process(target=worker, args=(index, workers, queue), name=f"worker-{index}")
+        for index, queue in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+
+    async def dispatch(update: dict[str, Any]):
+        # Блокирующий put полной очереди ждёт в потоке, не останавливая приём остальных шардов
+        await asyncio.to_thread(queues[shard_for(update, workers)].put, update)
+
+    async def front():
+        try:
+            await serve_webhook(bot, dp, dispatch, **options)
+        finally:
+            await bot.session.close()
+
+    try:
+        asyncio.run(front())
+    finally:
+        for queue in queues:
+            queue.put(None)
+        for process in processes:
+            process.join()
+
+
+def queue_source(queue) -> UpdateSource:
+    """Источник апдейтов воркера: блокирующий multiprocessing.Queue читается в отдельном потоке"""
+    async def source() -> dict[str, Any] | None:
+        return await asyncio.get_running_loop().run_in_executor(None, queue.get)
+    return source
@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+from aiogram.exceptions import TelegramBadRequest, TelegramRetryAfter
+from aiogram.methods import SendMessage
+
+from services.admin_log import SEPARATOR, AdminLogDispatcher, build_digests
+
+
+def test_entries_are_joined_up_to_limit():
+    entries = ["a" * 4, "b" * 4, "c" * 4]
+    assert build_digests(entries, limit=10) == [f"aaaa{SEPARATOR}bbbb", "cccc"]
+    assert build_digests(entries, limit=100) == [SEPARATOR.join(entries)]
+    assert build_digests([]) == []
+
+
+def test_long_entry_is_truncated():
+    digests = build_digests(["x" * 20, "short"], limit=10)
+    assert digests == ["x" * 9 + "…", "short"]
+    assert all(len(digest) <= 10 for digest in digests)
+
+
+class StubBot:
+    def __init__(self, errors):
+        self.errors = list(errors)
+        self.sent = []
+
+    async def send_message(self, chat_id, text, parse_mode=None):
+        self.sent.append(parse_mode)
+        if self.errors:
+            raise self.errors.pop(0)
+
+
+def send(errors) -> tuple[list, AdminLogDispatcher]:
+    dispatcher = AdminLogDispatcher(-1, min_interval=0)
+    dispatcher._bot = bot = StubBot(errors)
+    asyncio.run(dispatcher._send("<b>лог</b>"))
+    return bot.sent, dispatcher
+
+
+def test_retry_after_is_not_retried_again():
+    # 429 повторяет OutboundScheduler; сюда ошибка доходит, только когда его попытки исчерпаны
+    sent, dispatcher = send([TelegramRetryAfter(SendMessage(chat_id=-1, text="x"), "Too Many Requests", 30)])
+    assert sent == ["HTML"]
+    assert dispatcher._next_send_at - time.monotonic() > 25
+
+
+def test_broken_markup_falls_back_to_plain_text():
+    sent, _ = send([TelegramBadRequest(SendMessage(chat_id=-1, text="x"), "can't parse entities")])
+    assert sent == ["HTML", None]
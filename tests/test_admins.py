@@ -0,0 +1,77 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.admins import AdminRoster, BotPermissions, BotRights
+
+CHAT = -100
+
+
+class StubBot:
+    """Минимальный бот: считает запросы к API прав и администраторов"""
+
+    id = 1
+
+    def __init__(self, admins, member):
+        self.admins = admins
+        self.member = member
+        self.calls = 0
+
+    async def get_chat_administrators(self, chat_id):
+        self.calls += 1
+        return [SimpleNamespace(user=SimpleNamespace(id=user_id)) for user_id in self.admins]
+
+    async def get_chat_member(self, chat_id, user_id):
+        self.calls += 1
+        return self.member
+
+
+def test_roster_loads_once_and_follows_member_updates():
+    bot = StubBot([10, 11], None)
+    roster = AdminRoster(ttl=3600)
+
+    async def scenario():
+        first = await asyncio.gather(*(roster.is_admin(bot, CHAT, 10) for _ in range(5)))
+        roster.update(CHAT, 12, "administrator")
+        roster.update(CHAT, 10, "left")
+        # Незагруженный чат событием не заполняется
+        roster.update(CHAT - 1, 12, "administrator")
+        return first, await roster.get(bot, CHAT)
+
+    first, admins = asyncio.run(scenario())
+    assert first == [True] * 5
+    assert admins == {11, 12}
+    assert bot.calls == 1
+    assert len(roster) == 1
+
+
+def test_roster_reloads_after_invalidate_and_ttl():
+    bot = StubBot([10], None)
+    roster = AdminRoster(ttl=3600)
+    asyncio.run(roster.get(bot, CHAT))
+    bot.admins = [11]
+    roster.invalidate(CHAT)
+    assert asyncio.run(roster.get(bot, CHAT)) == {11}
+
+    expired = AdminRoster(ttl=0)
+    asyncio.run(expired.get(bot, CHAT))
+    asyncio.run(expired.get(bot, CHAT))
+    assert bot.calls == 4
+    assert (expired.hits, expired.misses) == (0, 2)
+
+
+def test_bot_permissions_follow_my_chat_member():
+    member = SimpleNamespace(status="administrator", can_restrict_members=True, can_delete_messages=False)
+    bot = StubBot([], member)
+    permissions = BotPermissions()
+    assert asyncio.run(permissions.get(bot, CHAT)) == BotRights(True, False)
+    assert asyncio.run(permissions.get(bot, CHAT)) == BotRights(True, False)
+    assert bot.calls == 1
+
+    permissions.update(CHAT, SimpleNamespace(status="member"))
+    assert asyncio.run(permissions.get(bot, CHAT)) == BotRights(False, False)
+    permissions.update(CHAT, SimpleNamespace(status="creator"))
+    assert asyncio.run(permissions.get(bot, CHAT)) == BotRights(True, True)
+
+    permissions.invalidate(CHAT)
+    assert asyncio.run(permissions.get(bot, CHAT)) == BotRights(True, False)
+    assert bot.calls == 2
@@ -0,0 +1,117 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from handlers.moderation import AsyncDatabase
+
+CHAT, USER = -100, 42
+
+
+@pytest.fixture
+def run_db(tmp_path):
+    """Запуск сценария на свежей базе; очередь записи сбрасывается только явно или при закрытии"""
+    def run(scenario, path=str(tmp_path / "moderation.db")):
+        async def main():
+            db = AsyncDatabase(path, flush_interval=3600)
+            await db.init_db()
+            try:
+                return await scenario(db)
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run
+
+
+def test_ban_is_visible_before_flush_and_after_restart(run_db):
+    async def ban(db):
+        await db.add_ban(CHAT, USER, 1, "test", duration=3600)
+        await db.add_ban(CHAT, USER + 1, 1, "test")
+        return await db.is_banned(CHAT, USER), await db.is_banned(CHAT, USER + 2)
+
+    async def check(db):
+        return await db.is_banned(CHAT, USER), await db.is_banned(CHAT, USER + 1)
+
+    assert run_db(ban) == (True, False)
+    assert run_db(check) == (True, True)
+
+
+def test_unban_and_expiry(run_db):
+    async def scenario(db):
+        await db.add_ban(CHAT, USER, 1, "test", duration=3600)
+        db.remove_ban(CHAT, USER)
+        unbanned = await db.is_banned(CHAT, USER)
+        # Задача истечения бана после ручного разбана ничего не снимает
+        expired_after_unban = await db.expire_ban(CHAT, USER)
+
+        await db.add_ban(CHAT, USER, 1, "test", duration=1)
+        await db.flush()
+        # Срок бана истёк — сдвигаем его в прошлое, не дожидаясь
+        await db.conn.execute("UPDATE active_bans SET ban_until = ?", (time.time() - 1,))
+        expired = await db.expire_ban(CHAT, USER)
+        return unbanned, expired_after_unban, expired, await db.is_banned(CHAT, USER)
+
+    assert run_db(scenario) == (False, 0, 1, False)
+
+
+def test_violations_history_includes_pending_writes(run_db):
+    async def scenario(db):
+        await db.add_violation(CHAT, USER, "user", "User", "old")
+        await db.flush()
+        await db.add_violation(CHAT, USER, "user", "User", "new")
+        before_reset = [text for text, _ in await db.get_violations(CHAT, USER)]
+        await db.reset_violations(CHAT, USER)
+        await db.add_violation(CHAT, USER, "user", "User", "after reset")
+        after_reset = [text for text, _ in await db.get_violations(CHAT, USER)]
+        return before_reset, after_reset, await db.get_violation_count(CHAT, USER)
+
+    assert run_db(scenario) == (["new", "old"], ["after reset"], 1)
+
+
+def test_chat_stats_come_from_rollups(run_db):
+    async def scenario(db):
+        await db.add_violation(CHAT, USER, "user", "User", "сука", word="сука")
+        await db.add_violation(CHAT, USER, "user", "User", "сука опять", word="сука")
+        await db.add_violation(CHAT, USER + 1, "other", "Other", "флуд", word="flood")
+        await db.add_violation(CHAT - 1, USER, "user", "User", "другой чат", word="бля")
+        await db.add_ban(CHAT, USER, 1, "test")
+        return await db.get_chat_stats(CHAT, days=7, top=10)
+
+    stats = run_db(scenario)
+    assert [row[1:] for row in stats.daily] == [(3, 1)]
+    assert [(row[0], row[3]) for row in stats.offenders] == [(USER, 2), (USER + 1, 1)]
+    assert stats.words == [("сука", 2), ("flood", 1)]
+
+
+def test_iter_violations_streams_in_chunks(run_db):
+    async def scenario(db):
+        for i in range(5):
+            await db.add_violation(CHAT, USER - i % 2, "user", "User", f"text {i}")
+        await db.add_violation(CHAT - 1, USER, "user", "User", "другой чат")
+        return [(columns, rows) async for columns, rows in db.iter_violations(CHAT, chunk=2)]
+
+    chunks = run_db(scenario)
+    assert [len(rows) for _, rows in chunks] == [2, 2, 1]
+    assert chunks[0][0] == ["id", "user_id", "username", "full_name", "violation_text", "timestamp"]
+    rows = [row for _, chunk in chunks for row in chunk]
+    assert [row[1] for row in rows] == [USER - 1] * 2 + [USER] * 3
+    assert [row[4] for row in rows] == ["text 1", "text 3", "text 0", "text 2", "text 4"]
+
+
+def test_incremental_vacuum_is_opt_in_for_existing_database(run_db, tmp_path):
+    legacy = str(tmp_path / "legacy.db")
+    with sqlite3.connect(legacy) as conn:
+        conn.execute("CREATE TABLE bans (id INTEGER PRIMARY KEY, chat_id, user_id, banned_by, reason, banned_at, ban_until)")
+
+    async def auto_vacuum(db):
+        async with db.conn.execute("PRAGMA auto_vacuum") as cursor:
+            return (await cursor.fetchone())[0]
+
+    async def convert(db):
+        before = await auto_vacuum(db)
+        return before, await db.enable_incremental_vacuum(), await db.enable_incremental_vacuum(), await auto_vacuum(db)
+
+    # Новая база сразу создаётся в режиме incremental, существующая без настройки не трогается
+    assert run_db(auto_vacuum) == 2
+    assert run_db(convert, path=legacy) == (0, True, False, 2)
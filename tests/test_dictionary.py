@@ -0,0 +1,63 @@
+import asyncio
+import os
+
+import pytest
+
+from services.dictionary import BadWordDictionary
+from services.matcher import WordMatcher, source_hash
+
+WORDS = ["бля", "блядь", "сука", "хуй"]
+
+
+def test_cache_file_round_trip(tmp_path):
+    matcher = WordMatcher(WORDS)
+    path = str(tmp_path / "words.matcher")
+    digest = source_hash(WORDS)
+    matcher.save(path, digest)
+    loaded = WordMatcher.load(path, digest)
+    assert loaded is not None
+    assert loaded.find_all("б.л.я и сука") == matcher.find_all("б.л.я и сука")
+
+
+def test_cache_file_from_other_dictionary_is_ignored(tmp_path):
+    path = str(tmp_path / "words.matcher")
+    WordMatcher(WORDS).save(path, source_hash(WORDS))
+    assert WordMatcher.load(path, source_hash(WORDS + ["хуйло"])) is None
+    assert WordMatcher.load(str(tmp_path / "missing.matcher"), source_hash(WORDS)) is None
+
+
+@pytest.mark.parametrize("damage", [
+    lambda data: data[:len(data) // 2],
+    lambda data: data[:-1],
+    lambda data: data + b"\0",
+    lambda data: data[:-2] + b"\xff\xfe",
+    lambda data: b"",
+])
+def test_damaged_cache_file_is_ignored(tmp_path, damage):
+    path = tmp_path / "words.matcher"
+    digest = source_hash(WORDS)
+    WordMatcher(WORDS).save(str(path), digest)
+    path.write_bytes(damage(path.read_bytes()))
+    assert WordMatcher.load(str(path), digest) is None
+
+
+def test_save_leaves_no_temporary_files(tmp_path):
+    path = tmp_path / "words.matcher"
+    WordMatcher(WORDS).save(str(path), source_hash(WORDS))
+    WordMatcher(WORDS).save(str(path), source_hash(WORDS))
+    assert os.listdir(tmp_path) == ["words.matcher"]
+
+
+def test_reload_picks_up_file_changes(tmp_path):
+    words_path = tmp_path / "bad_words.txt"
+    words_path.write_text("сука\n", encoding="utf-8")
+    dictionary = BadWordDictionary(str(words_path), str(tmp_path / "cache" / "words.matcher"))
+    assert dictionary.load()
+    assert os.path.exists(tmp_path / "cache" / "words.matcher")
+    assert dictionary.matcher.search("бля") is None
+
+    words_path.write_text("сука\nбля\n", encoding="utf-8")
+    assert asyncio.run(dictionary.reload())
+    assert dictionary.matcher.search("б.л.я").word == "бля"
+    # Файл не менялся — автомат не пересобирается
+    assert not asyncio.run(dictionary.reload())
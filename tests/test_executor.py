@@ -0,0 +1,95 @@
+import asyncio
+from types import SimpleNamespace
+
+from aiogram import Router
+from aiogram.types import ErrorEvent, Update
+
+from services.executor import UpdateExecutor
+
+
+def event_data(update_id, chat_id, user_id):
+    event = SimpleNamespace(update_id=update_id)
+    data = {"event_chat": SimpleNamespace(id=chat_id), "event_from_user": SimpleNamespace(id=user_id)}
+    return event, data
+
+
+def test_lane_keeps_order_and_lanes_run_concurrently():
+    log = []
+
+    async def handler(event, data):
+        log.append(("start", event.update_id))
+        await asyncio.sleep(0.01)
+        log.append(("end", event.update_id))
+
+    async def scenario():
+        executor = UpdateExecutor(concurrency=10, max_pending=100)
+        await executor(handler, *event_data(1, -1, 1))
+        await executor(handler, *event_data(2, -1, 1))
+        await executor(handler, *event_data(3, -1, 2))
+        await executor.join()
+        return executor.depth
+
+    assert asyncio.run(scenario()) == 0
+    # Апдейты одного пользователя не перекрываются, другой пользователь не ждёт
+    assert log.index(("end", 1)) < log.index(("start", 2))
+    assert log.index(("start", 3)) < log.index(("end", 1))
+
+
+def test_backpressure_blocks_intake_until_queue_drains():
+    async def scenario():
+        gate = asyncio.Event()
+
+        async def handler(event, data):
+            await gate.wait()
+
+        executor = UpdateExecutor(concurrency=10, max_pending=2)
+        await executor(handler, *event_data(1, -1, 1))
+        await executor(handler, *event_data(2, -1, 2))
+        third = asyncio.create_task(executor(handler, *event_data(3, -1, 3)))
+        await asyncio.sleep(0.01)
+        blocked = not third.done()
+        gate.set()
+        await third
+        await executor.join()
+        return blocked
+
+    assert asyncio.run(scenario())
+
+
+def test_handler_error_does_not_stop_lane():
+    handled = []
+
+    async def handler(event, data):
+        if event.update_id == 1:
+            raise RuntimeError("boom")
+        handled.append(event.update_id)
+
+    async def scenario():
+        executor = UpdateExecutor(concurrency=1, max_pending=10)
+        await executor(handler, *event_data(1, -1, 1))
+        await executor(handler, *event_data(2, -1, 1))
+        await executor.join()
+
+    asyncio.run(scenario())
+    assert handled == [2]
+
+
+def test_handler_error_reaches_errors_observer():
+    router = Router()
+    errors = []
+
+    @router.errors()
+    async def on_error(event: ErrorEvent):
+        errors.append((event.update.update_id, str(event.exception)))
+
+    async def handler(event, data):
+        raise RuntimeError("boom")
+
+    async def scenario():
+        executor = UpdateExecutor(concurrency=1, max_pending=10, router=router)
+        data = {"event_chat": SimpleNamespace(id=-1), "event_from_user": SimpleNamespace(id=1)}
+        await executor(handler, Update(update_id=5), data)
+        await executor.join()
+
+    asyncio.run(scenario())
+    assert errors == [(5, "boom")]
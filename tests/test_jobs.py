@@ -0,0 +1,75 @@
+import asyncio
+import time
+
+from handlers.moderation import AsyncDatabase
+from services.jobs import JobScheduler
+
+CHAT = -100
+
+
+def test_jobs_fire_and_survive_restart(tmp_path):
+    path = str(tmp_path / "moderation.db")
+    fired = []
+
+    def scheduler(db):
+        jobs = JobScheduler(db)
+
+        @jobs.handler("delete")
+        async def delete(bot, chat_id, message_id):
+            fired.append((bot, chat_id, message_id))
+        return jobs
+
+    async def first_run():
+        db = AsyncDatabase(path)
+        await db.init_db()
+        jobs = scheduler(db)
+        await jobs.start("bot")
+        jobs.schedule("delete", 0, CHAT, message_id=1)
+        jobs.schedule("delete", 3600, CHAT, message_id=2)
+        for _ in range(100):
+            if fired:
+                break
+            await asyncio.sleep(0.01)
+        await jobs.stop()
+        depth = jobs.depth
+        await db.close()
+        return depth
+
+    async def second_run():
+        db = AsyncDatabase(path)
+        await db.init_db()
+        # Переносим оставшуюся задачу в прошлое, чтобы не ждать час
+        await db.conn.execute("UPDATE scheduled_jobs SET run_at = ?", (time.time() - 1,))
+        await db.conn.commit()
+        jobs = scheduler(db)
+        await jobs.start("bot")
+        for _ in range(100):
+            if len(fired) == 2:
+                break
+            await asyncio.sleep(0.01)
+        await jobs.stop()
+        remaining = await db.load_jobs()
+        await db.close()
+        return remaining
+
+    assert asyncio.run(first_run()) == 1
+    assert fired == [("bot", CHAT, 1)]
+    assert asyncio.run(second_run()) == []
+    assert fired == [("bot", CHAT, 1), ("bot", CHAT, 2)]
+
+
+def test_shard_loads_only_its_chats(tmp_path):
+    async def scenario():
+        db = AsyncDatabase(str(tmp_path / "moderation.db"))
+        await db.init_db()
+        jobs = JobScheduler(db)
+        for chat_id in range(4):
+            jobs.schedule("delete", 3600, chat_id, message_id=chat_id)
+        await db.flush()
+        shard = JobScheduler(db)
+        await shard.start(None, shard=(1, 2))
+        await shard.stop()
+        await db.close()
+        return shard.depth
+
+    assert asyncio.run(scenario()) == 2
@@ -0,0 +1,37 @@
+import logging
+
+from services.logs import SamplingFilter, set_level
+
+
+def make_record(level=logging.INFO, module="filter", func="check_message"):
+    return logging.LogRecord("root", level, f"{module}.py", 1, "msg", None, None, func=func)
+
+
+def test_every_nth_record_passes_with_suppressed_count():
+    sampling = SamplingFilter({"filter.check_message": (3, 1000)})
+    records = [make_record() for _ in range(7)]
+    passed = [sampling.filter(record) for record in records]
+    assert passed == [True, False, False, True, False, False, True]
+    assert getattr(records[3], "suppressed", 0) == 2
+    assert getattr(records[0], "suppressed", 0) == 0
+
+
+def test_rate_limit_and_unsampled_categories():
+    sampling = SamplingFilter({"filter": (1, 2)})
+    passed = [sampling.filter(make_record(func="other")) for _ in range(5)]
+    assert passed.count(True) == 2
+    # Предупреждения и чужие модули не прореживаются
+    assert sampling.filter(make_record(level=logging.WARNING))
+    assert all(sampling.filter(make_record(module="admin")) for _ in range(5))
+
+
+def test_set_level_accepts_only_known_levels():
+    root = logging.getLogger()
+    previous = root.level
+    try:
+        assert set_level("debug")
+        assert root.level == logging.DEBUG
+        assert not set_level("verbose")
+        assert root.level == logging.DEBUG
+    finally:
+        root.setLevel(previous)
@@ -0,0 +1,44 @@
+import pytest
+
+from services.matcher import WordMatcher
+
+WORDS = ["бля", "блядь", "сука", "хуй"]
+
+
+@pytest.fixture(scope="module")
+def matcher() -> WordMatcher:
+    return WordMatcher(WORDS)
+
+
+@pytest.mark.parametrize("text, word", [
+    ("сука", "сука"),
+    ("ну ты сука!", "сука"),
+    ("ХУЙ", "хуй"),
+    ("(бля)", "бля"),
+])
+def test_search_finds_whole_words(matcher, text, word):
+    match = matcher.search(text)
+    assert match is not None
+    assert match.word == word
+
+
+@pytest.mark.parametrize("text", [
+    "",
+    "употреблять",
+    "сукно и скука",
+    "с праздником!",
+])
+def test_search_ignores_clean_text(matcher, text):
+    assert matcher.search(text) is None
+
+
+def test_find_all_reports_every_match_with_offsets(matcher):
+    text = "Эй, сука и блядь, бля"
+    matches = matcher.find_all(text)
+    assert sorted(m.word for m in matches) == ["бля", "блядь", "сука"]
+    assert all(text[m.start:m.end].lower() == m.word for m in matches)
+
+
+def test_longer_word_does_not_hide_its_prefix_at_boundary(matcher):
+    assert [m.word for m in matcher.find_all("блядь")] == ["блядь"]
+    assert [m.word for m in matcher.find_all("бля")] == ["бля"]
@@ -0,0 +1,31 @@
+from services.metrics import MetricsRegistry
+
+
+def test_render_prometheus_text():
+    metrics = MetricsRegistry()
+    counter = metrics.counter("test_total", "Счётчик", ("kind",))
+    counter.inc("flood")
+    counter.inc("flood", amount=2)
+    histogram = metrics.histogram("test_seconds", "Время", buckets=(0.1, 1.0))
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+    metrics.gauge("test_depth", "Глубина", lambda: {"admin_log": 3}, ("queue",))
+    lines = metrics.render().splitlines()
+
+    assert "# TYPE test_total counter" in lines
+    assert 'test_total{kind="flood"} 3' in lines
+    # Бакеты накопительные
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_count 3" in lines
+    assert "test_seconds_sum 5.55" in lines
+    assert 'test_depth{queue="admin_log"} 3' in lines
+
+
+def test_broken_callback_does_not_break_render():
+    metrics = MetricsRegistry()
+    metrics.gauge("broken", "Ошибка", lambda: 1 / 0)
+    metrics.counter("ok_total", "Счётчик").inc()
+    assert metrics.render().splitlines()[-1] == "ok_total 1"
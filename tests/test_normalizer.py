@@ -0,0 +1,65 @@
+import pytest
+
+from services.matcher import WordMatcher
+from services.normalizer import normalize
+
+WORDS = ["бля", "блядь", "сука", "хуй"]
+
+
+@pytest.fixture(scope="module")
+def matcher() -> WordMatcher:
+    return WordMatcher(WORDS)
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("6лядь", "блядь"),
+    ("cука", "сука"),
+    ("СУКА", "сука"),
+    ("сууууука", "сука"),
+    ("б.л.я", "бля"),
+    ("с*у*к*а", "сука"),
+    ("б..л--я", "бля"),
+    ("привет.пока", "привет.пока"),
+    ("я,бля", "я,бля"),
+])
+def test_normalize(text, expected):
+    assert normalize(text).text == expected
+
+
+def test_offsets_point_to_original():
+    text = "ну с.у.к.а!"
+    normalized = normalize(text)
+    start = normalized.text.index("сука")
+    assert normalized.span(start, start + 4) == (3, 10)
+    assert normalized.offsets[-1] == len(text)
+
+
+@pytest.mark.parametrize("text, word", [
+    ("6лядь", "блядь"),
+    ("ну ты cука", "сука"),
+    ("сууууука", "сука"),
+    ("б.л.я", "бля"),
+    ("с*у*к*а", "сука"),
+    # Одиночное слово рядом с разделителем не склеивается с соседним
+    ("я,бля", "бля"),
+    ("а.сука", "сука"),
+    ("и-сука", "сука"),
+    ("ну и,сука", "сука"),
+    ("сука,я", "сука"),
+    ("блядь,а", "блядь"),
+])
+def test_obfuscated_words_are_found(matcher, text, word):
+    match = matcher.search(text)
+    assert match is not None
+    assert match.word == word
+
+
+def test_matches_map_back_to_original_text(matcher):
+    text = "Эй, С.У.К.А и 6лядь"
+    matches = matcher.find_all(text)
+    assert [m.word for m in matches] == ["сука", "блядь"]
+    assert [text[m.start:m.end] for m in matches] == ["С.У.К.А", "6лядь"]
+
+
+def test_spellings_of_one_pattern_are_compiled_once():
+    assert len(WordMatcher(["хуй", "хуи", " ХУЙ "])) == 1
@@ -0,0 +1,68 @@
+import asyncio
+import time
+
+import pytest
+from aiogram.methods import BanChatMember, SendMessage
+
+from services.outbound import OutboundScheduler, TokenBucket, is_send
+
+
+@pytest.fixture
+def bucket() -> TokenBucket:
+    bucket = TokenBucket(rate=1, capacity=5)
+    bucket.updated = 100.0
+    return bucket
+
+
+def test_burst_then_rate(bucket):
+    for _ in range(5):
+        assert bucket.wait_time(100.0) == 0
+        bucket.take()
+    assert bucket.wait_time(100.0) == pytest.approx(1.0)
+    assert bucket.wait_time(100.5) == pytest.approx(0.5)
+    assert bucket.wait_time(101.0) == 0
+
+
+def test_refill_is_capped(bucket):
+    bucket.take()
+    assert not bucket.is_full(100.0)
+    assert bucket.is_full(1000.0)
+    assert bucket.tokens == 5
+
+
+def test_pause_blocks_until_retry_after(bucket):
+    bucket.pause(100.0, 3)
+    assert bucket.wait_time(100.0) == pytest.approx(4.0)
+    assert bucket.wait_time(103.0) == pytest.approx(1.0)
+    assert bucket.wait_time(104.0) == 0
+
+
+def test_sends_and_deletes_use_separate_chat_limits():
+    async def scenario():
+        outbound = OutboundScheduler(global_rate=100, chat_rate=100, chat_burst=5, send_rate=2, send_burst=1)
+        sent = []
+
+        async def make_request(bot, method):
+            sent.append((type(method).__name__, time.monotonic()))
+            return True
+
+        started = time.monotonic()
+        await asyncio.gather(
+            outbound(make_request, None, SendMessage(chat_id=-1, text="1")),
+            outbound(make_request, None, SendMessage(chat_id=-1, text="2")),
+            *(outbound(make_request, None, BanChatMember(chat_id=-1, user_id=user)) for user in range(3)),
+        )
+        return [(name, at - started) for name, at in sent]
+
+    sent = asyncio.run(scenario())
+    bans = [at for name, at in sent if name == "BanChatMember"]
+    messages = [at for name, at in sent if name == "SendMessage"]
+    # Баны не ждут лимита сообщений, второе сообщение ждёт токен send_rate
+    assert len(bans) == 3 and max(bans) < 0.25
+    assert messages[0] < 0.25
+    assert messages[1] == pytest.approx(0.5, abs=0.2)
+
+
+def test_send_methods_are_detected_by_name():
+    assert is_send(SendMessage(chat_id=-1, text="x"))
+    assert not is_send(BanChatMember(chat_id=-1, user_id=1))
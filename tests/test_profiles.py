@@ -0,0 +1,64 @@
+import asyncio
+
+import pytest
+
+from handlers.moderation import AsyncDatabase
+from services.dictionary import BadWordDictionary
+from services.profiles import ChatProfile, ChatProfiles, effective_words, word_pattern
+
+
+@pytest.fixture
+def run_profiles(tmp_path):
+    """Сценарий с профилями чатов поверх свежей базы и словаря из двух слов"""
+    words_path = tmp_path / "bad_words.txt"
+    words_path.write_text("хуй\nсука\n", encoding="utf-8")
+
+    def run(scenario):
+        async def main():
+            db = AsyncDatabase(str(tmp_path / "moderation.db"))
+            await db.init_db()
+            dictionary = BadWordDictionary(str(words_path))
+            dictionary.load()
+            try:
+                return await scenario(ChatProfiles(db, dictionary, 3, 3600))
+            finally:
+                await db.close()
+        return asyncio.run(main())
+    return run
+
+
+def test_word_pattern_uses_normalized_form():
+    assert word_pattern("хуи") == word_pattern("хуй")
+    assert word_pattern(" Сука ") == word_pattern("cука")
+
+
+def test_allowed_word_removes_all_spellings_of_pattern():
+    base = frozenset(["хуй", "хуйло", "сука"])
+    profile = ChatProfile(-1, 3, 0, added=frozenset(["бля"]), removed=frozenset(["хуи", "хуило"]))
+    assert effective_words(base, profile) == {"сука", "бля"}
+
+
+def test_default_profile_keeps_base_dictionary():
+    base = frozenset(["хуй", "сука"])
+    profile = ChatProfile(-1, 3, 0)
+    assert not profile.is_custom_dictionary
+    assert effective_words(base, profile) == base
+
+
+def test_chat_dictionary_changes(run_profiles):
+    async def scenario(profiles):
+        default = await profiles.matcher(-1)
+        assert await profiles.allow_word(-1, "хуи")
+        assert not await profiles.allow_word(-1, "привет")
+        allowed = await profiles.matcher(-1)
+        await profiles.ban_word(-2, "бля")
+        await profiles.ban_word(-3, "бля")
+        return default, allowed, await profiles.matcher(-2), await profiles.matcher(-3)
+
+    default, allowed, second, third = run_profiles(scenario)
+    assert default.search("хуй").word == "хуй"
+    assert allowed.search("хуй") is None
+    assert allowed.search("сука").word == "сука"
+    # Чаты с одинаковыми поправками пользуются одним автоматом
+    assert second is third
+    assert second.search("б.л.я").word == "бля"
@@ -0,0 +1,55 @@
+import pytest
+
+from services.spam import FloodCounter, SpamDetector, minhash, shingles, similarity
+
+GREETING = "С праздником Рождества Христова!"
+RAID = "Заходите в наш канал, там лучшие скидки t.me/example"
+
+
+@pytest.fixture
+def detector() -> SpamDetector:
+    return SpamDetector(flood_messages=6, flood_window=5, duplicate_count=10, duplicate_window=30)
+
+
+def test_flood_counts_messages_in_window():
+    flood = FloodCounter(5)
+    assert [flood.hit((1, 1), 100 + i * 0.1) for i in range(3)] == [1, 2, 3]
+    assert flood.hit((1, 2), 100) == 1
+    # Через окно счётчик начинается заново
+    assert flood.hit((1, 1), 106) == 1
+
+
+def test_flood_verdict_is_first_only_once(detector):
+    verdicts = [detector.check(-1, 1, i, "привет", 100) for i in range(8)]
+    assert verdicts[:6] == [None] * 6
+    assert [(v.kind, v.first) for v in verdicts[6:]] == [("flood", True), ("flood", False)]
+
+
+def test_minhash_similarity():
+    slots = 32
+    same = minhash(shingles(RAID, 5), slots)
+    assert similarity(same, minhash(shingles(RAID.upper(), 5), slots)) == 1
+    assert similarity(same, minhash(shingles("Совсем другой текст про погоду и урожай", 5), slots)) < 0.3
+
+
+def test_greetings_from_several_users_are_not_spam(detector):
+    assert [detector.check(-1, user, user, GREETING, 100 + 20 * user) for user in range(3)] == [None] * 3
+    assert [detector.check(-1, user, 10 + user, GREETING, 200 + user) for user in range(9)] == [None] * 9
+
+
+def test_raid_flags_earlier_copies_once(detector):
+    verdicts = [detector.check(-1, user, 100 + user, RAID, 100 + user * 0.5) for user in range(12)]
+    assert verdicts[:9] == [None] * 9
+    wave = verdicts[9]
+    assert (wave.kind, wave.count) == ("duplicate", 10)
+    assert wave.earlier == tuple((user, 100 + user) for user in range(9))
+    assert [v.earlier for v in verdicts[10:]] == [(), ()]
+
+
+def test_copies_outside_window_do_not_add_up(detector):
+    verdicts = [detector.check(-1, user, user, RAID, 100 + user * 5) for user in range(12)]
+    assert verdicts == [None] * 12
+
+
+def test_short_messages_are_not_checked_for_duplicates(detector):
+    assert all(detector.check(-1, user, user, "аминь", 100) is None for user in range(20))
@@ -0,0 +1,102 @@
+import pytest
+
+from services.violations import (
+    DecayPolicy, ViolationCounterCache, decode_buckets, encode_buckets, format_score, reaches_limit,
+)
+
+DAY = 86400
+
+
+@pytest.fixture
+def policy() -> DecayPolicy:
+    return DecayPolicy(DAY, 7 * DAY, 30)
+
+
+def test_fresh_violations_count_fully(policy):
+    now = 100 * DAY + 10
+    buckets = policy.add(policy.add(policy.add((), now), now), now)
+    assert buckets == ((100, 3, now),)
+    assert policy.score(buckets, now) == 3
+    assert reaches_limit(policy.score(buckets, now), 3)
+
+
+def test_score_halves_every_half_life(policy):
+    buckets = policy.add((), 100 * DAY)
+    assert policy.score(buckets, 107 * DAY) == pytest.approx(0.5)
+    assert policy.score(buckets, 114 * DAY) == pytest.approx(0.25)
+    # Без затухания нарушение всё ещё в окне
+    assert policy.total(buckets, 114 * DAY) == 1
+
+
+def test_age_is_measured_from_violation_time_not_bucket_end(policy):
+    early, late = 100 * DAY, 101 * DAY - 1
+    buckets = policy.add(policy.add((), early), late)
+    now = 108 * DAY
+    expected = 0.5 ** ((now - early) / (7 * DAY)) + 0.5 ** ((now - late) / (7 * DAY))
+    assert policy.score(buckets, now) == pytest.approx(expected, rel=1e-5)
+    assert policy.score(policy.add((), early), now) < policy.score(policy.add((), late), now)
+
+
+def test_old_buckets_fall_out_of_window(policy):
+    buckets = policy.add((), 100 * DAY)
+    later = 100 * DAY + 30 * DAY
+    assert policy.score(buckets, later) == 0
+    assert policy.total(buckets, later) == 0
+    assert policy.add(buckets, later) == ((130, 1, later),)
+
+
+def test_limit_threshold():
+    assert reaches_limit(3, 3)
+    assert reaches_limit(2.995, 3)
+    assert not reaches_limit(2.95, 3)
+    assert not reaches_limit(2.9, 3)
+    # Показанный счёт не округляется до лимита, пока лимит не достигнут
+    assert format_score(2.95) == "2.9"
+    assert format_score(2.995) == "3"
+    assert format_score(2.0) == "2"
+    assert format_score(2.43) == "2.4"
+
+
+def test_series_of_violations_reaches_limit_but_spread_one_does_not(policy):
+    start = 100 * DAY
+    series = ()
+    for minutes in (0, 30, 60):
+        series = policy.add(series, start + minutes * 60)
+    assert reaches_limit(policy.score(series, start + 3600), 3)
+
+    spread = ()
+    for hours in (0, 12, 24):
+        spread = policy.add(spread, start + hours * 3600)
+    assert not reaches_limit(policy.score(spread, start + DAY), 3)
+
+
+def test_buckets_encoding_round_trip():
+    buckets = ((100, 3, 100 * DAY + 5), (105, 1, 105 * DAY))
+    assert decode_buckets(encode_buckets(buckets), DAY) == buckets
+    assert decode_buckets(None, DAY) == ()
+    assert decode_buckets("", DAY) == ()
+    # Бакеты без времени считаются от конца бакета
+    assert decode_buckets("100:3", DAY) == ((100, 3, 101 * DAY),)
+
+
+def test_counter_cache_keeps_dirty_entries():
+    cache = ViolationCounterCache(max_size=2)
+    cache.set((1, 1), ((1, 1, DAY),))
+    cache.set((1, 2), ((1, 1, DAY),))
+    cache.set((1, 3), ((1, 1, DAY),))
+    # Несброшенные в БД счётчики не вытесняются
+    assert len(cache) == 3
+    assert cache.get((1, 1)) == ((1, 1, DAY),)
+    # После записи в БД лишние записи вытесняются, самые давние — первыми
+    cache.mark_clean(cache.dirty_snapshot())
+    assert len(cache) == 2
+    assert cache.get((1, 2)) is None
+    assert cache.get((1, 1)) == ((1, 1, DAY),)
+
+
+def test_loaded_value_does_not_overwrite_newer():
+    cache = ViolationCounterCache(max_size=10)
+    cache.set((1, 1), ((1, 3, DAY),))
+    assert cache.setdefault((1, 1), ((1, 2, DAY),)) == ((1, 3, DAY),)
+    assert cache.setdefault((1, 2), ((1, 2, DAY),)) == ((1, 2, DAY),)
+    assert cache.dirty_snapshot() == {(1, 1): ((1, 3, DAY),)}
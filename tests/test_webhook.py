@@ -0,0 +1,15 @@
+from services.webhook import shard_for
+
+
+def test_events_of_one_chat_go_to_one_worker():
+    message = {"update_id": 1, "message": {"chat": {"id": -1005}, "from": {"id": 8}}}
+    callback = {"update_id": 2, "callback_query": {"from": {"id": 8}, "message": {"chat": {"id": -1005}}}}
+    member = {"update_id": 3, "chat_member": {"chat": {"id": -1005}, "from": {"id": 9}}}
+    assert shard_for(message, 4) == shard_for(callback, 4) == shard_for(member, 4) == -1005 % 4
+
+
+def test_updates_without_chat_fall_back_to_user_and_update_id():
+    inline = {"update_id": 7, "inline_query": {"from": {"id": 6}, "query": ""}}
+    assert shard_for(inline, 4) == 6 % 4
+    assert shard_for({"update_id": 7, "poll": {"id": "1"}}, 4) == 7 % 4
+    assert shard_for({"update_id": 7}, 1) == 0